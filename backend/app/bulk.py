@@ -0,0 +1,141 @@
+import csv
+import io
+from typing import Any, Callable, Dict, List, Tuple, Type, TypeVar
+
+import duckdb
+import orjson
+import pyarrow as pa
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+from app.responses import encode_rows
+from app.timing import phase
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+CSV_MEDIA_TYPES = ("text/csv", "application/csv")
+ARROW_MEDIA_TYPES = ("application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.file")
+
+
+def _parse_json(body: bytes) -> List[Dict[str, Any]]:
+    data = orjson.loads(body)
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of objects")
+    return data
+
+
+def _parse_csv(body: bytes) -> List[Dict[str, Any]]:
+    reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+    return [dict(row) for row in reader]
+
+
+def _parse_arrow(body: bytes, media_type: str) -> List[Dict[str, Any]]:
+    if media_type == "application/vnd.apache.arrow.file":
+        table = pa.ipc.open_file(pa.py_buffer(body)).read_all()
+    else:
+        table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    return table.to_pylist()
+
+
+async def read_bulk_rows(request: Request) -> List[Dict[str, Any]]:
+    """
+    Read the rows of a bulk request body.
+
+    The format follows the Content-Type header: a JSON array (default), CSV
+    with a header row, or an Arrow IPC stream/file.
+    """
+    media_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    body = await request.body()
+
+    try:
+        if media_type in CSV_MEDIA_TYPES:
+            rows = _parse_csv(body)
+        elif media_type in ARROW_MEDIA_TYPES:
+            rows = _parse_arrow(body, media_type)
+        else:
+            rows = _parse_json(body)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse request body: {str(e)}")
+
+    if not rows:
+        raise HTTPException(status_code=400, detail="No rows provided")
+
+    return rows
+
+
+def row_error(row: int, field: str, msg: str, error_type: str) -> Dict[str, Any]:
+    """Build a per-row error in the same shape FastAPI uses for validation errors"""
+    return {"loc": ["body", row, field], "msg": msg, "type": error_type}
+
+
+def validate_rows(
+    rows: List[Dict[str, Any]],
+    model: Type[ModelT],
+) -> Tuple[List[ModelT], List[int], List[Dict[str, Any]]]:
+    """
+    Validate every row against the model, collecting errors instead of stopping at the first.
+
+    Returns the valid rows, their indexes in the request (so later checks report
+    against the right row) and the errors.
+    """
+    valid: List[ModelT] = []
+    indexes: List[int] = []
+    errors: List[Dict[str, Any]] = []
+
+    with phase("validate"):
+        for index, row in enumerate(rows):
+            try:
+                valid.append(model.model_validate(row))
+                indexes.append(index)
+            except ValidationError as e:
+                for error in e.errors(include_url=False, include_context=False, include_input=False):
+                    errors.append({
+                        "loc": ["body", index, *error["loc"]],
+                        "msg": error["msg"],
+                        "type": error["type"],
+                    })
+
+    return valid, indexes, errors
+
+
+def raise_row_errors(errors: List[Dict[str, Any]]):
+    """Reject the whole batch if any row failed"""
+    if errors:
+        errors.sort(key=lambda error: error["loc"][1])
+        raise HTTPException(status_code=422, detail=errors)
+
+
+def write_batch(
+    db: duckdb.DuckDBPyConnection,
+    relation: str,
+    incoming: pa.Table,
+    check: Callable[[duckdb.DuckDBPyConnection], List[Dict[str, Any]]],
+    write: Callable[[duckdb.DuckDBPyConnection], duckdb.DuckDBPyConnection],
+    errors: List[Dict[str, Any]],
+) -> bytes:
+    """
+    Write a validated batch on a dedicated cursor.
+
+    The valid rows are registered as `relation` and `check` returns per-row
+    errors from set-based queries against it. Those are reported together with
+    the validation `errors`, so one response lists every problem in the
+    upload; otherwise `write` runs inside one transaction and the rows it
+    returns are encoded as the response body.
+    """
+    cursor = db.cursor()
+    try:
+        cursor.register(relation, incoming)
+        raise_row_errors(errors + check(cursor))
+
+        cursor.begin()
+        try:
+            written = write(cursor)
+            body = encode_rows(written)
+            cursor.commit()
+        except Exception:
+            cursor.rollback()
+            raise
+    finally:
+        cursor.close()
+
+    return body
@@ -0,0 +1,235 @@
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import brotli
+import zstandard
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.metrics import Counter, Gauge, registry
+from app.timing import phase
+
+# Levels tuned for responses compressed on the fly: most of the size win at a fraction of the CPU
+_COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    "zstd": lambda body: zstandard.ZstdCompressor(level=3).compress(body),
+    "br": lambda body: brotli.compress(body, quality=5),
+    "gzip": lambda body: gzip.compress(body, compresslevel=6, mtime=0),
+}
+
+# Server preference when the client accepts several encodings equally
+ENCODINGS = tuple(_COMPRESSORS)
+
+# A streamed body is compressed chunk by chunk: each chunk is compressed and
+# flushed so the client can decode it as it arrives, and the stream is finished
+# after the last one
+StreamCompressor = Tuple[Callable[[bytes], bytes], Callable[[], bytes]]
+
+
+def _zstd_stream() -> StreamCompressor:
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    return (
+        lambda chunk: compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+        compressor.flush,
+    )
+
+
+def _brotli_stream() -> StreamCompressor:
+    compressor = brotli.Compressor(quality=5)
+    return lambda chunk: compressor.process(chunk) + compressor.flush(), compressor.finish
+
+
+def _gzip_stream() -> StreamCompressor:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+_STREAM_COMPRESSORS: Dict[str, Callable[[], StreamCompressor]] = {
+    "zstd": _zstd_stream,
+    "br": _brotli_stream,
+    "gzip": _gzip_stream,
+}
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# Bodies larger than this are compressed in a worker thread instead of on the event loop
+INLINE_COMPRESS_BYTES = 64 * 1024
+
+COMPRESSED_CACHE_REQUESTS = registry.register(Counter(
+    "compressed_cache_requests_total",
+    "Compressions of responses with an ETag by result (hit or miss)",
+    labels=("result",),
+))
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick the encoding to use for an Accept-Encoding header, or None for identity"""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    best = None
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+
+class CompressedCache:
+    """
+    Byte-bounded LRU of compressed bodies, keyed by URL, ETag and encoding.
+
+    A response's ETag changes with every write to what it reads, so a stored
+    body is valid for as long as its key is requested; superseded ones age out.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[str, str, str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str, str, str]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                COMPRESSED_CACHE_REQUESTS.inc("miss")
+                return None
+            self._entries.move_to_end(key)
+        COMPRESSED_CACHE_REQUESTS.inc("hit")
+        return body
+
+    def put(self, key: Tuple[str, str, str, str], body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+compressed_cache = CompressedCache()
+
+registry.register(Gauge("compressed_cache_bytes", "Bytes of compressed bodies held for reuse", lambda: compressed_cache.size))
+
+
+class CompressionMiddleware:
+    """
+    Compress response bodies with the best encoding the client accepts.
+
+    zstd, brotli and gzip are offered. Only bodies with a text or JSON content
+    type are compressed: complete ones of at least `minimum_size` bytes in one
+    go, streamed ones (such as NDJSON) chunk by chunk whatever their size.
+    Bodies of responses carrying an ETag are kept in `compressed_cache`, so a
+    repeat request for unchanged data skips compression as well as encoding.
+    Time spent compressing is reported as the compress Server-Timing phase.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        start_message = None
+        stream: Optional[StreamCompressor] = None
+
+        async def send_compressed(message):
+            nonlocal start_message, stream
+            if message["type"] == "http.response.start":
+                # Hold the headers until the body shows whether it can be compressed
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if stream is not None:
+                body = self._stream_chunk(stream, body, more_body)
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(scope=start)
+            if not self._compressible_type(headers) or (not more_body and len(body) < self.minimum_size):
+                await send(start)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            if encoding is None:
+                await send(start)
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            if more_body:
+                # The compressed length is unknown until the stream ends
+                del headers["Content-Length"]
+                stream = _STREAM_COMPRESSORS[encoding]()
+                await send(start)
+                body = self._stream_chunk(stream, body, more_body)
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+                return
+
+            body = await self._compress(scope, headers, body, encoding)
+            headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible_type(self, headers: MutableHeaders) -> bool:
+        return (
+            "content-encoding" not in headers
+            and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+        )
+
+    def _stream_chunk(self, stream: StreamCompressor, body: bytes, more_body: bool) -> bytes:
+        compress, finish = stream
+        with phase("compress"):
+            return compress(body) if more_body else compress(body) + finish()
+
+    async def _compress(self, scope, headers: MutableHeaders, body: bytes, encoding: str) -> bytes:
+        etag = headers.get("etag")
+        key = None
+        if etag is not None:
+            key = (scope["path"], scope.get("query_string", b"").decode(), etag, encoding)
+            cached = compressed_cache.get(key)
+            if cached is not None:
+                return cached
+
+        compress = _COMPRESSORS[encoding]
+        with phase("compress"):
+            if len(body) > INLINE_COMPRESS_BYTES:
+                compressed = await run_in_threadpool(compress, body)
+            else:
+                compressed = compress(body)
+
+        if key is not None:
+            compressed_cache.put(key, compressed)
+        return compressed
@@ -0,0 +1,181 @@
+from datetime import date
+from typing import Any, List, Optional, Tuple
+
+
+def property_equity_query(
+    property_id: Optional[int] = None,
+    monthly: bool = False,
+) -> Tuple[str, List[Any]]:
+    """
+    Build the per-property equity series.
+
+    Each property is evaluated on every date its valuation or mortgage changed
+    (or at each month end when `monthly`), with the latest valuation and
+    mortgage on or before that date picked by ASOF joins. Without a
+    `property_id` every property is evaluated on the union of all dates, so
+    rows can be summed per date into a portfolio total. Dates before a
+    property's first valuation are skipped.
+
+    Returns (sql, params) selecting property_id, date, valuation, mortgage,
+    equity and ltv. Monthly series run through today, which is passed as a
+    parameter so cached results and ETags change with the date.
+    """
+    series_filter = "WHERE property_id = ?" if property_id is not None else ""
+    series_params = [property_id] if property_id is not None else []
+
+    if monthly:
+        dates = f"""
+            bounds AS (
+                SELECT min(date) AS first_date, greatest(max(date), CAST(? AS DATE)) AS last_date
+                FROM changes
+            ),
+            dates AS (
+                SELECT least(last_day(month), last_date) AS date
+                FROM (
+                    SELECT unnest(generate_series(
+                        date_trunc('month', first_date), date_trunc('month', last_date), INTERVAL 1 MONTH
+                    ))::DATE AS month, last_date
+                    FROM bounds
+                )
+            )
+        """
+    else:
+        dates = "dates AS (SELECT DISTINCT date FROM changes)"
+
+    query = f"""
+        WITH changes AS (
+            SELECT date FROM property_values {series_filter}
+            UNION ALL
+            SELECT date FROM property_mortgages {series_filter}
+        ),
+        {dates},
+        points AS (
+            SELECT p.property_id, d.date
+            FROM properties p CROSS JOIN dates d
+            {"WHERE p.property_id = ?" if property_id is not None else ""}
+        )
+        SELECT
+            pt.property_id,
+            pt.date,
+            v.valuation,
+            coalesce(m.mortgage, 0) AS mortgage,
+            v.valuation - coalesce(m.mortgage, 0) AS equity,
+            coalesce(m.mortgage, 0) / nullif(v.valuation, 0) AS ltv
+        FROM points pt
+        ASOF JOIN property_values v
+            ON v.property_id = pt.property_id AND pt.date >= v.date
+        ASOF LEFT JOIN property_mortgages m
+            ON m.property_id = pt.property_id AND pt.date >= m.date
+    """
+    today_params = [date.today()] if monthly else []
+    return query, series_params * 2 + today_params + series_params
+
+
+def dashboard_summary_query(as_of: date) -> Tuple[str, List[Any]]:
+    """
+    Build the dashboard summary as one statement returning one row.
+
+    Columns are lists of structs (or a struct), so the whole summary is one
+    round trip:
+
+    - `accounts`: each account's investments, unvested (net of tax) and total
+      on the latest rolled-up day, with the change over 30 days, from
+      daily_balances
+    - `properties`: each property's latest valuation, mortgage, equity and LTV
+    - `allocation`: market value of owned holdings per ticker in the latest
+      snapshots, with each ticker's share
+    - `change`: net worth on the latest day and its change over 1 and 30 days
+
+    The networth rollup must be current (see ensure_networth_current).
+    """
+    query = """
+        WITH params AS (
+            SELECT
+                CAST(? AS DATE) AS as_of,
+                (SELECT max(period) FROM networth WHERE grain = 'day' AND period <= CAST(? AS DATE)) AS day
+        ),
+        account_totals AS (
+            SELECT
+                a.account_id,
+                a.account_name,
+                coalesce(b.investments, 0) AS investments,
+                coalesce(b.unvested, 0) AS unvested,
+                coalesce(b.investments + b.unvested, 0) AS total,
+                b.investments + b.unvested - (prev.investments + prev.unvested) AS change_30d
+            FROM accounts a
+            CROSS JOIN params
+            LEFT JOIN daily_balances b ON b.account_id = a.account_id AND b.date = params.day
+            LEFT JOIN daily_balances prev
+                ON prev.account_id = a.account_id AND prev.date = CAST(params.day - INTERVAL 30 DAY AS DATE)
+        ),
+        property_points AS (
+            SELECT p.property_id, p.name, params.as_of
+            FROM properties p CROSS JOIN params
+        ),
+        property_latest AS (
+            SELECT
+                pp.property_id,
+                pp.name,
+                v.date AS valuation_date,
+                v.valuation,
+                coalesce(m.mortgage, 0) AS mortgage,
+                v.valuation - coalesce(m.mortgage, 0) AS equity,
+                coalesce(m.mortgage, 0) / nullif(v.valuation, 0) AS ltv
+            FROM property_points pp
+            ASOF LEFT JOIN property_values v
+                ON v.property_id = pp.property_id AND pp.as_of >= v.date
+            ASOF LEFT JOIN property_mortgages m
+                ON m.property_id = pp.property_id AND pp.as_of >= m.date
+        ),
+        snapshots AS (
+            -- Each account's latest snapshot, then its Owned rows; one with none counts as 0
+            SELECT * FROM (
+                SELECT h.*, params.as_of
+                FROM holdings h CROSS JOIN params
+                WHERE h.date <= params.as_of
+                QUALIFY h.date = max(h.date) OVER (PARTITION BY h.account_id)
+            )
+            WHERE ownership = 'Owned'
+        ),
+        ticker_values AS (
+            SELECT
+                t.ticker_symbol,
+                sum(coalesce(s.number_of_shares * p.price, s.value)) AS market_value
+            FROM snapshots s
+            JOIN tickers t ON t.ticker_id = s.ticker_id
+            ASOF LEFT JOIN ticker_prices p ON p.ticker_id = s.ticker_id AND s.as_of >= p.date
+            GROUP BY t.ticker_symbol
+        ),
+        allocation AS (
+            SELECT ticker_symbol, market_value, market_value / nullif(sum(market_value) OVER (), 0) AS share
+            FROM ticker_values
+        ),
+        networth_days AS (
+            SELECT n.period, n.net_worth
+            FROM networth n CROSS JOIN params
+            WHERE n.grain = 'day'
+              AND n.period IN (
+                  params.day,
+                  CAST(params.day - INTERVAL 1 DAY AS DATE),
+                  CAST(params.day - INTERVAL 30 DAY AS DATE)
+              )
+        )
+        SELECT
+            (SELECT as_of FROM params) AS as_of,
+            (SELECT coalesce(list(account_totals ORDER BY account_id), []) FROM account_totals) AS accounts,
+            (SELECT coalesce(list(property_latest ORDER BY property_id), []) FROM property_latest) AS properties,
+            (SELECT coalesce(list(allocation ORDER BY market_value DESC), []) FROM allocation) AS allocation,
+            (
+                SELECT {
+                    'date': params.day,
+                    'net_worth': max(net_worth) FILTER (WHERE period = params.day),
+                    'change_1d': max(net_worth) FILTER (WHERE period = params.day)
+                        - max(net_worth) FILTER (WHERE period = CAST(params.day - INTERVAL 1 DAY AS DATE)),
+                    'change_30d': max(net_worth) FILTER (WHERE period = params.day)
+                        - max(net_worth) FILTER (WHERE period = CAST(params.day - INTERVAL 30 DAY AS DATE))
+                }
+                FROM params LEFT JOIN networth_days ON true
+                GROUP BY params.day
+            ) AS change
+    """
+    return query, [as_of, as_of]
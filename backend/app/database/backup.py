@@ -1,107 +1,266 @@
+import hashlib
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from datetime import datetime, date
-from typing import Any, Dict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
 import duckdb
+import orjson
+import pyarrow as pa
 
 from app.database.connection import get_db
+from app.database.networth import refresh_lock, refresh_networth
+from app.database.sync import record_reset
+from app.database.ticker_sync import create_missing_tickers
 
+MANIFEST_FILE = "manifest.json"
 
-class DateTimeEncoder(json.JSONEncoder):
-    """Custom JSON encoder for datetime objects"""
-    def default(self, obj):
-        if isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        return super().default(obj)
+# Backed-up tables, parents before the rows that reference them
+BACKUP_TABLES = [
+    {"name": "accounts", "id_field": "account_id"},
+    {"name": "tickers", "id_field": "ticker_id"},
+    {"name": "ticker_prices", "id_field": "price_id"},
+    # account_holdings is a view; its rows go back into holdings
+    {"name": "account_holdings", "table": "holdings", "id_field": "holding_id"},
+    {"name": "properties", "id_field": "property_id"},
+    {"name": "property_values", "id_field": "property_value_id"},
+    {"name": "property_mortgages", "id_field": "property_mortgage_id"}
+]
 
 
-def backup_to_json(backup_dir: str = "../data"):
-    """Backup all database tables to JSON files"""
-    Path(backup_dir).mkdir(parents=True, exist_ok=True)
+def _write_table(backup_dir: str, name: str, rows: pa.Table) -> Dict[str, Any]:
+    """Write one table's rows as a JSON file and describe it for the manifest"""
+    body = orjson.dumps(rows.to_pylist(), option=orjson.OPT_INDENT_2)
+    path = Path(backup_dir) / f"{name}.json"
+    # Replace the previous file only once the new one is complete
+    partial = path.with_name(path.name + ".partial")
+    partial.write_bytes(body)
+    os.replace(partial, path)
+    return {
+        "file": path.name,
+        "records": rows.num_rows,
+        "bytes": len(body),
+        "sha256": hashlib.sha256(body).hexdigest(),
+    }
+
+
+def backup_to_json(backup_dir: str = "../data", progress: Optional[Callable[..., None]] = None):
+    """
+    Backup all database tables to JSON files
     
-    db = get_db()
-    tables = [
-        "accounts",
-        "tickers",
-        "account_holdings",
-        "properties",
-        "property_values",
-        "property_mortgages"
-    ]
+    Every table is read into Arrow inside one transaction on a dedicated cursor, so the
+    files are a consistent snapshot and other requests keep using the shared connection
+    meanwhile. The tables are then encoded, checksummed and written in parallel, and
+    `manifest.json` recording each file's record count and SHA-256 is written last.
+    `progress` is called with the records written per table as each file completes.
+    """
+    Path(backup_dir).mkdir(parents=True, exist_ok=True)
     
     backup_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    for table in tables:
-        result = db.execute(f"SELECT * FROM {table}").fetchall()
-        columns = [desc[0] for desc in db.description]
-        
-        data = [dict(zip(columns, row)) for row in result]
-        
-        # Save to JSON file
-        filename = f"{backup_dir}/{table}.json"
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2, cls=DateTimeEncoder)
-        
-        print(f"Backed up {table} to {filename} ({len(data)} records)")
+    db = get_db().cursor()
+    try:
+        db.begin()
+        snapshot = {
+            config["name"]: db.execute(f"SELECT * FROM {config['name']}").fetch_arrow_table()
+            for config in BACKUP_TABLES
+        }
+        db.commit()
+    finally:
+        db.close()
+    
+    files = {}
+    with ThreadPoolExecutor(max_workers=len(snapshot)) as pool:
+        futures = {
+            pool.submit(_write_table, backup_dir, name, rows): name
+            for name, rows in snapshot.items()
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            files[name] = future.result()
+            if progress:
+                progress(
+                    tables={name: entry["records"] for name, entry in files.items()},
+                    completed=len(files),
+                    total=len(snapshot)
+                )
+            print(f"Backed up {name} to {backup_dir}/{files[name]['file']} ({files[name]['records']} records)")
+    
+    manifest = {
+        "timestamp": backup_timestamp,
+        "tables": {config["name"]: files[config["name"]] for config in BACKUP_TABLES},
+    }
+    with open(Path(backup_dir) / MANIFEST_FILE, 'wb') as f:
+        f.write(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
     
     print(f"\nBackup completed at {backup_timestamp}")
-    return {"status": "success", "timestamp": backup_timestamp, "tables": tables}
+    return {
+        "status": "success",
+        "timestamp": backup_timestamp,
+        "tables": {name: entry["records"] for name, entry in manifest["tables"].items()}
+    }
 
 
-def restore_from_json(backup_dir: str = "../data"):
-    """Restore database from JSON files"""
-    db = get_db()
-    
-    tables_config = [
-        {"name": "accounts", "id_field": "account_id"},
-        {"name": "tickers", "id_field": "ticker_id"},
-        {"name": "account_holdings", "id_field": "holding_id"},
-        {"name": "properties", "id_field": "property_id"},
-        {"name": "property_values", "id_field": "property_value_id"},
-        {"name": "property_mortgages", "id_field": "property_mortgage_id"}
-    ]
+def _read_backup(backup_dir: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Load every backup file, checking it against the manifest when there is one
     
-    restored_counts = {}
+    Raises ValueError before anything is restored if a file listed in the manifest is
+    missing, truncated or altered.
+    """
+    manifest = None
+    manifest_path = Path(backup_dir) / MANIFEST_FILE
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_bytes())
+    else:
+        print(f"No {MANIFEST_FILE} in {backup_dir}; restoring without integrity checks")
     
-    for table_config in tables_config:
-        table = table_config["name"]
-        id_field = table_config["id_field"]
-        filename = f"{backup_dir}/{table}.json"
+    backups = {}
+    for table_config in BACKUP_TABLES:
+        name = table_config["name"]
+        filename = f"{backup_dir}/{name}.json"
+        expected = manifest["tables"].get(name) if manifest else None
         
         if not os.path.exists(filename):
-            print(f"Skipping {table}: file not found")
+            if expected:
+                raise ValueError(f"Backup file {name}.json listed in the manifest is missing")
+            print(f"Skipping {name}: file not found")
             continue
         
-        with open(filename, 'r') as f:
-            data = json.load(f)
+        with open(filename, 'rb') as f:
+            body = f.read()
+        
+        if expected and (len(body) != expected["bytes"] or hashlib.sha256(body).hexdigest() != expected["sha256"]):
+            raise ValueError(f"Backup file {name}.json does not match its checksum in the manifest")
+        
+        data = orjson.loads(body)
         
         if not data:
-            print(f"Skipping {table}: no data")
+            print(f"Skipping {name}: no data")
             continue
         
-        # Clear existing data
-        db.execute(f"DELETE FROM {table}")
+        backups[name] = data
+    
+    return backups
+
+
+def restore_from_json(backup_dir: str = "../data", progress: Optional[Callable[..., None]] = None):
+    """
+    Restore database from JSON files
+    
+    Files are read and verified against `manifest.json` before any table is touched,
+    then the whole restore runs in one transaction on a dedicated cursor: readers see
+    the old rows until it commits and the new ones after, and any error rolls it back.
+    DuckDB cannot delete and re-insert rows that other tables reference within one
+    transaction, so each restored table is dropped and recreated from its own
+    definition instead, then loaded with one bulk insert. The sync tombstone and the
+    net worth rollup are written once the restore has committed. `progress` is called
+    with the records restored per table after each table.
+    """
+    backups = _read_backup(backup_dir)
+    
+    conn = get_db()
+    with refresh_lock:
+        cursor = conn.cursor()
+        try:
+            cursor.begin()
+            try:
+                restored_counts, restored_tables = _restore(cursor, backups, progress)
+                # Committing bumps the cache generations of every table written
+                cursor.commit()
+            except Exception:
+                cursor.rollback()
+                raise
+        finally:
+            cursor.close()
         
-        # Insert data
-        for record in data:
-            columns = list(record.keys())
-            placeholders = ', '.join(['?' for _ in columns])
-            values = [record[col] for col in columns]
-            
-            query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
-            db.execute(query, values)
+        # Restored rows keep their original updated_at, so sync clients must refetch these tables
+        record_reset(conn, restored_tables)
+        refresh_networth(conn)
+    
+    print("\nRestore completed")
+    return {"status": "success", "restored": restored_counts}
+
+
+def _definitions(db: duckdb.DuckDBPyConnection, tables: List[str], catalog: str) -> Dict[str, List[str]]:
+    """The CREATE statements of `tables` listed in `catalog` (duckdb_tables or duckdb_indexes)"""
+    definitions: Dict[str, List[str]] = {table: [] for table in tables}
+    for table, sql in db.execute(
+        f"SELECT table_name, sql FROM {catalog}() WHERE table_name IN ({', '.join('?' for _ in tables)}) AND sql IS NOT NULL",
+        tables
+    ).fetchall():
+        definitions[table].append(sql)
+    return definitions
+
+
+def _restore(
+    db: duckdb.DuckDBPyConnection,
+    backups: Dict[str, List[Dict[str, Any]]],
+    progress: Optional[Callable[..., None]]
+):
+    """Replace each backed-up table with the loaded records, inside the caller's transaction"""
+    restored_counts = {}
+    
+    # Prices reference tickers, so older backups without ticker_prices.json drop them too
+    restored_tables = {config["name"] for config in BACKUP_TABLES if config["name"] in backups}
+    if "tickers" in restored_tables and "ticker_prices" not in restored_tables:
+        print("Clearing ticker_prices: the backup has no prices for its tickers")
+        restored_tables.add("ticker_prices")
+    tables = [config.get("table", config["name"]) for config in BACKUP_TABLES if config["name"] in restored_tables]
+    
+    # Recreate the tables empty, children dropped before the rows they reference
+    definitions = _definitions(db, tables, "duckdb_tables")
+    indexes = _definitions(db, tables, "duckdb_indexes")
+    for table in reversed(tables):
+        db.execute(f"DROP TABLE {table}")
+    for table in tables:
+        db.execute(definitions[table][0])
+    
+    for table_config in BACKUP_TABLES:
+        name = table_config["name"]
+        table = table_config.get("table", name)
+        id_field = table_config["id_field"]
+        
+        if name not in backups:
+            continue
+        data = backups[name]
+        
+        # Insert data in one statement
+        db.register("restored_rows", pa.Table.from_pylist(data))
+        try:
+            if table == "holdings":
+                # Holdings are keyed by symbol in the backup; map them onto ticker ids
+                create_missing_tickers(db, "restored_rows", "ticker_symbol", datetime.now())
+                columns = [c for c in data[0] if c not in ("ticker_symbol", "ticker_id")]
+                db.execute(f"""
+                    INSERT INTO holdings ({', '.join(columns)}, ticker_id)
+                    SELECT {', '.join(f'r.{c}' for c in columns)}, t.ticker_id
+                    FROM restored_rows r
+                    JOIN tickers t ON t.ticker_symbol = r.ticker_symbol
+                """)
+            else:
+                columns = list(data[0])
+                db.execute(f"INSERT INTO {table} ({', '.join(columns)}) SELECT {', '.join(columns)} FROM restored_rows")
+        finally:
+            db.unregister("restored_rows")
         
         # Update sequence to max ID + 1
         max_id_result = db.execute(f"SELECT MAX({id_field}) FROM {table}").fetchone()
         max_id = max_id_result[0] if max_id_result[0] is not None else 0
         
-        sequence_name = f"seq_{table}" if table != "account_holdings" else "seq_holdings"
+        sequence_name = f"seq_{table}"
         db.execute(f"DROP SEQUENCE IF EXISTS {sequence_name}")
         db.execute(f"CREATE SEQUENCE {sequence_name} START {max_id + 1}")
         
-        restored_counts[table] = len(data)
-        print(f"Restored {table}: {len(data)} records")
+        restored_counts[name] = len(data)
+        if progress:
+            progress(tables=dict(restored_counts), completed=len(restored_counts), total=len(backups))
+        print(f"Restored {name}: {len(data)} records")
     
-    print("\nRestore completed")
-    return {"status": "success", "restored": restored_counts}
+    # Indexes are built once the rows are in
+    for table in tables:
+        for statement in indexes[table]:
+            db.execute(statement)
+    
+    return restored_counts, restored_tables
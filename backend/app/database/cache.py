@@ -0,0 +1,87 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Sequence, Tuple
+
+from app.metrics import Counter, Gauge, registry
+
+# Generations restart at zero with the process, so validators derived from them carry this too
+BOOT_ID = uuid.uuid4().hex[:8]
+BOOTED_AT = time.time()
+
+CACHE_REQUESTS = registry.register(Counter(
+    "query_cache_requests_total",
+    "Cached reads by result (hit or miss)",
+    labels=("result",),
+))
+
+
+class QueryCache:
+    """
+    Size-bounded LRU cache of encoded query results.
+
+    Every table has a generation counter that the connection bumps after each
+    statement writing to it (and again when a transaction commits). An entry
+    remembers the generations of the tables it read, taken before its query
+    ran, and is only served while they are unchanged, so a write can never
+    leave a stale result behind. Entries are evicted least recently used once
+    the bodies exceed `max_bytes`; 0 disables the cache.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[int, ...], bytes]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._modified: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def generations(self, tables: Sequence[str]) -> Tuple[int, ...]:
+        """Current generations of `tables`, to tag a result read now"""
+        return tuple(self._generations.get(table, 0) for table in tables)
+
+    def last_modified(self, tables: Sequence[str]) -> float:
+        """When any of `tables` was last written, or the process start if none has been since"""
+        return max((self._modified.get(table, BOOTED_AT) for table in tables), default=BOOTED_AT)
+
+    def bump(self, tables):
+        """Invalidate every cached result that read any of `tables`"""
+        now = time.time()
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                self._modified[table] = now
+
+    def get(self, key: Hashable, generations: Tuple[int, ...]) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generations:
+                CACHE_REQUESTS.inc("miss")
+                return None
+            self._entries.move_to_end(key)
+        CACHE_REQUESTS.inc("hit")
+        return entry[1]
+
+    def put(self, key: Hashable, generations: Tuple[int, ...], body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+            self._entries[key] = (generations, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+query_cache = QueryCache()
+
+registry.register(Gauge("query_cache_bytes", "Bytes of encoded results held by the query cache", lambda: query_cache.size))
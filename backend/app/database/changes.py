@@ -0,0 +1,147 @@
+import threading
+from datetime import date
+from typing import Dict, Optional
+
+import duckdb
+
+from app.database.networth import refresh_networth
+from app.jobs import jobs
+
+
+class ChangeTracker:
+    """
+    Collects the ranges API writes touch and recomputes them in the background.
+
+    Handlers record the account, ticker or property they changed together with
+    the earliest date affected. Records are coalesced per key (the earliest
+    date wins) and applied by a single "recompute" job submitted to the job
+    queue, which runs `delay` seconds after the first write and coalesces
+    further submissions while queued, so a burst of edits costs one recompute
+    of just the affected accounts. A failed recompute puts its changes back
+    and is retried after `retry_delay` seconds.
+    """
+
+    def __init__(self, delay: float = 0.25, retry_delay: float = 5.0):
+        self.delay = delay
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._accounts: Dict[int, date] = {}
+        self._tickers: Dict[int, date] = {}
+        self._properties: Optional[date] = None
+        self._idle = threading.Event()
+        self._idle.set()
+        self._conn: Optional[duckdb.DuckDBPyConnection] = None
+
+    def _record(self, changes: Dict[int, date], key: int, since: date):
+        with self._lock:
+            if key not in changes or since < changes[key]:
+                changes[key] = since
+            self._idle.clear()
+        self._submit()
+
+    def account_changed(self, account_id: int, since: date):
+        """A holding of `account_id` dated `since` was written"""
+        self._record(self._accounts, account_id, since)
+
+    def ticker_changed(self, ticker_id: int, since: date):
+        """A price of `ticker_id` dated `since` was written"""
+        self._record(self._tickers, ticker_id, since)
+
+    def property_changed(self, property_id: int, since: date):
+        """A valuation or mortgage of `property_id` dated `since` was written"""
+        with self._lock:
+            if self._properties is None or since < self._properties:
+                self._properties = since
+            self._idle.clear()
+        self._submit()
+
+    def _submit(self, delay: Optional[float] = None):
+        if self._conn is not None:
+            jobs.submit("recompute", self._apply_pending, delay=self.delay if delay is None else delay)
+
+    def pending(self) -> int:
+        """Number of keys waiting to be recomputed"""
+        with self._lock:
+            return len(self._accounts) + len(self._tickers) + (self._properties is not None)
+
+    def _drain(self):
+        with self._lock:
+            accounts, self._accounts = self._accounts, {}
+            tickers, self._tickers = self._tickers, {}
+            properties, self._properties = self._properties, None
+        return accounts, tickers, properties
+
+    def _restore(self, accounts: Dict[int, date], tickers: Dict[int, date], properties: Optional[date]):
+        """Put drained changes back after a failed recompute, merged with any recorded since"""
+        with self._lock:
+            for pending, drained in ((self._accounts, accounts), (self._tickers, tickers)):
+                for key, since in drained.items():
+                    if key not in pending or since < pending[key]:
+                        pending[key] = since
+            if properties is not None and (self._properties is None or properties < self._properties):
+                self._properties = properties
+
+    def apply(
+        self,
+        conn: duckdb.DuckDBPyConnection,
+        accounts: Dict[int, date],
+        tickers: Dict[int, date],
+        properties: Optional[date],
+    ) -> int:
+        """Recompute the balances and rollup rows covered by one batch of changes"""
+        accounts = dict(accounts)
+        if tickers:
+            # A price change affects every account that ever held the ticker
+            cursor = conn.cursor()
+            try:
+                held = cursor.execute(
+                    "SELECT DISTINCT account_id, ticker_id FROM holdings WHERE list_contains(?, ticker_id)",
+                    [list(tickers)]
+                ).fetchall()
+            finally:
+                cursor.close()
+            for account_id, ticker_id in held:
+                since = tickers[ticker_id]
+                if account_id not in accounts or since < accounts[account_id]:
+                    accounts[account_id] = since
+
+        dates = list(accounts.values()) + ([properties] if properties is not None else [])
+        if not dates:
+            return 0
+        return refresh_networth(conn, min(dates), accounts)
+
+    def _apply_pending(self) -> Dict[str, int]:
+        accounts, tickers, properties = self._drain()
+        try:
+            days = self.apply(self._conn, accounts, tickers, properties)
+        except Exception as e:
+            print(f"Recompute failed, retrying in {self.retry_delay:g}s: {e}")
+            self._restore(accounts, tickers, properties)
+            self._submit(self.retry_delay)
+            raise
+        finally:
+            with self._lock:
+                if not (self._accounts or self._tickers or self._properties):
+                    self._idle.set()
+        return {"accounts": len(accounts), "tickers": len(tickers), "days": days}
+
+    def start(self, conn: duckdb.DuckDBPyConnection):
+        """Submit recompute jobs against `conn` as changes are recorded"""
+        self._conn = conn
+        if self.pending():
+            self._submit()
+
+    def stop(self):
+        """Apply whatever is still pending; call after the job queue has stopped"""
+        if self._conn is None:
+            return
+        if self.pending():
+            self._apply_pending()
+        self._conn = None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every recorded change has been applied"""
+        return self._idle.wait(timeout)
+
+
+tracker = ChangeTracker()
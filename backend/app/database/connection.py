@@ -2,6 +2,11 @@ import duckdb
 import os
 from pathlib import Path
 from datetime import datetime
+from time import monotonic, perf_counter
+from typing import Any, Dict
+
+from app.database.instrumented import InstrumentedConnection
+from app.database.migrations import migrate
 
 
 class Database:
@@ -10,138 +15,84 @@ class Database:
         # Create data directory if it doesn't exist
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         self.conn = None
+        self.last_checkpoint = None
+        self._wal_size = 0
+        self._wal_changed_at = monotonic()
         
     def connect(self):
-        """Establish connection to DuckDB"""
-        self.conn = duckdb.connect(self.db_path)
-        self._initialize_schema()
+        """
+        Establish connection to DuckDB; every statement is timed and logged when slow
+        
+        DUCKDB_THREADS, DUCKDB_MEMORY_LIMIT and DUCKDB_TEMP_DIRECTORY tune query
+        parallelism, the memory cap and where larger-than-memory work spills; DuckDB's
+        defaults apply to any left unset.
+        """
+        settings = {
+            "threads": os.getenv("DUCKDB_THREADS"),
+            "memory_limit": os.getenv("DUCKDB_MEMORY_LIMIT"),
+            "temp_directory": os.getenv("DUCKDB_TEMP_DIRECTORY"),
+        }
+        config = {name: value for name, value in settings.items() if value}
+        self.conn = InstrumentedConnection(duckdb.connect(self.db_path, config=config))
+        migrate(self.conn)
+        # Opening the database replays and checkpoints any leftover WAL
+        self.last_checkpoint = datetime.now()
+        self._wal_size = self.wal_size()
         
     def close(self):
-        """Close the database connection"""
+        """Checkpoint so the next start has no WAL to replay, then close the connection"""
         if self.conn:
+            self.checkpoint()
             self.conn.close()
             
-    def _initialize_schema(self):
-        """Create tables if they don't exist"""
-        
-        # Accounts table
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS accounts (
-                account_id INTEGER PRIMARY KEY,
-                account_name VARCHAR(255) NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create sequence for accounts
-        self.conn.execute("""
-            CREATE SEQUENCE IF NOT EXISTS seq_accounts START 1
-        """)
-        
-        # Tickers table - symbols user wants to track
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS tickers (
-                ticker_id INTEGER PRIMARY KEY,
-                ticker_symbol VARCHAR(10) NOT NULL UNIQUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        self.conn.execute("""
-            CREATE SEQUENCE IF NOT EXISTS seq_tickers START 1
-        """)
-        
-        # Ticker prices table - historical price data
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS ticker_prices (
-                price_id INTEGER PRIMARY KEY,
-                ticker_id INTEGER NOT NULL,
-                date DATE NOT NULL,
-                price DOUBLE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (ticker_id) REFERENCES tickers(ticker_id),
-                UNIQUE(ticker_id, date)
-            )
-        """)
-        
-        self.conn.execute("""
-            CREATE SEQUENCE IF NOT EXISTS seq_ticker_prices START 1
-        """)
-        
-        # Account Holdings table
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS account_holdings (
-                holding_id INTEGER PRIMARY KEY,
-                account_id INTEGER NOT NULL,
-                date DATE NOT NULL,
-                ticker_symbol VARCHAR(10) NOT NULL,
-                number_of_shares DOUBLE NOT NULL,
-                value DOUBLE NOT NULL,
-                ownership VARCHAR(20) NOT NULL CHECK (ownership IN ('Owned', 'Unowned', 'Unvested')),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (account_id) REFERENCES accounts(account_id)
-            )
-        """)
-        
-        self.conn.execute("""
-            CREATE SEQUENCE IF NOT EXISTS seq_holdings START 1
-        """)
-        
-        # Properties table
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS properties (
-                property_id INTEGER PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        self.conn.execute("""
-            CREATE SEQUENCE IF NOT EXISTS seq_properties START 1
-        """)
-        
-        # Property Values table
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS property_values (
-                property_value_id INTEGER PRIMARY KEY,
-                property_id INTEGER NOT NULL,
-                date DATE NOT NULL,
-                valuation DOUBLE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (property_id) REFERENCES properties(property_id),
-                UNIQUE(property_id, date)
-            )
-        """)
-        
-        self.conn.execute("""
-            CREATE SEQUENCE IF NOT EXISTS seq_property_values START 1
-        """)
-        
-        # Property Mortgages table
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS property_mortgages (
-                property_mortgage_id INTEGER PRIMARY KEY,
-                property_id INTEGER NOT NULL,
-                date DATE NOT NULL,
-                mortgage DOUBLE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (property_id) REFERENCES properties(property_id),
-                UNIQUE(property_id, date)
-            )
-        """)
-        
-        self.conn.execute("""
-            CREATE SEQUENCE IF NOT EXISTS seq_property_mortgages START 1
-        """)
-        
+    def checkpoint(self) -> bool:
+        """Fold the WAL into the database file on a dedicated cursor; False if DuckDB could not checkpoint now"""
+        try:
+            cursor = self.conn.cursor()
+            try:
+                cursor.execute("CHECKPOINT")
+            finally:
+                cursor.close()
+        except duckdb.Error as e:
+            # Fails while another cursor has a transaction open; the next attempt retries
+            print(f"Checkpoint skipped: {e}")
+            return False
+        self.last_checkpoint = datetime.now()
+        self.wal_size()
+        return True
+    
+    def checkpoint_if_due(self, wal_limit: int, idle_seconds: float) -> Dict[str, Any]:
+        """Checkpoint once the WAL reaches `wal_limit` bytes or has not grown for `idle_seconds`"""
+        wal_bytes = self.wal_size()
+        due = wal_bytes >= wal_limit or (wal_bytes > 0 and monotonic() - self._wal_changed_at >= idle_seconds)
+        checkpointed = due and self.checkpoint()
+        return {"wal_bytes": wal_bytes, "checkpointed": checkpointed}
+            
+    @property
+    def wal_path(self) -> str:
+        return f"{self.db_path}.wal"
+    
+    def wal_size(self) -> int:
+        """Size of the write-ahead log in bytes, noting checkpoints DuckDB ran on its own"""
+        size = os.path.getsize(self.wal_path) if os.path.exists(self.wal_path) else 0
+        if size < self._wal_size:
+            # The log only shrinks when a checkpoint folds it into the database file
+            self.last_checkpoint = datetime.now()
+        if size != self._wal_size:
+            self._wal_changed_at = monotonic()
+        self._wal_size = size
+        return size
+    
+    def probe(self) -> float:
+        """Run a trivial query on a dedicated cursor and return its latency in milliseconds"""
+        start = perf_counter()
+        cursor = self.get_connection().cursor()
+        try:
+            cursor.execute("SELECT 1").fetchone()
+        finally:
+            cursor.close()
+        return (perf_counter() - start) * 1000
+            
     def get_connection(self):
         """Get the database connection"""
         if not self.conn:
@@ -0,0 +1,244 @@
+import re
+import threading
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Sequence
+
+import duckdb
+
+from app.database.cache import query_cache
+from app.jobs import jobs
+from app.metrics import Gauge, registry
+from app.timing import phase
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Only statements without side effects are re-run under EXPLAIN ANALYZE
+_READ_STATEMENT = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+# Tables a statement writes to; ON CONFLICT ... DO UPDATE SET is not a table
+_WRITTEN_TABLE = re.compile(
+    r"\b(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|UPDATE|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?|"
+    r"(?:DROP|ALTER)\s+(?:TABLE|VIEW)(?:\s+IF\s+EXISTS)?)\s+(?!SET\b)(\w+)",
+    re.IGNORECASE,
+)
+
+
+def normalize(query: str) -> str:
+    """Reduce a statement to its shape: literals become ?, lists of ? collapse, whitespace is squeezed"""
+    query = _STRING.sub("?", query)
+    query = _NUMBER.sub("?", query)
+    query = _PLACEHOLDER_LIST.sub("(...)", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def written_tables(query: str) -> List[str]:
+    """Tables written by a statement (none for a plain SELECT)"""
+    if query.lstrip()[:6].upper() == "SELECT":
+        return []
+    return [table.lower() for table in _WRITTEN_TABLE.findall(_STRING.sub("?", query))]
+
+
+def _literal(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _inline(query: str, params: Sequence[Any]) -> str:
+    """Substitute positional parameters as literals; DuckDB cannot prepare EXPLAIN ANALYZE with them"""
+    values = iter(params)
+    # Split on string literals so a ? inside one is left alone
+    parts = re.split(r"('(?:[^']|'')*')", query)
+    return "".join(
+        part if part.startswith("'") else re.sub(r"\?", lambda _: _literal(next(values)), part)
+        for part in parts
+    )
+
+
+def _describe(params: Any, limit: int = 500) -> str:
+    text = repr(params)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class QueryLog:
+    """
+    Per-statement execution statistics and the slow-query log.
+
+    Statements are grouped by their normalized text. One slower than
+    `slow_ms` is printed with its parameters, and the first time a read
+    statement is slow its EXPLAIN ANALYZE plan is captured by a background
+    job so the request is not held up. At most `max_statements` distinct
+    statements are tracked; the one with the least total time is dropped to
+    make room.
+    """
+
+    def __init__(self, slow_ms: float = 200.0, max_statements: int = 500):
+        self.slow_ms = slow_ms
+        self.max_statements = max_statements
+        self.open_cursors = 0
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, conn: duckdb.DuckDBPyConnection, query: str, params: Any, elapsed_ms: float, failed: bool):
+        statement = normalize(query)
+        slow = elapsed_ms >= self.slow_ms
+        with self._lock:
+            stats = self._stats.get(statement)
+            if stats is None:
+                if len(self._stats) >= self.max_statements:
+                    del self._stats[min(self._stats, key=lambda s: self._stats[s]["total_ms"])]
+                stats = self._stats[statement] = {
+                    "statement": statement,
+                    "calls": 0,
+                    "errors": 0,
+                    "slow_calls": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "plan": None,
+                }
+            stats["calls"] += 1
+            stats["errors"] += failed
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            explain = (
+                slow and not failed and stats["plan"] is None
+                and _READ_STATEMENT.match(query) and not isinstance(params, dict)
+            )
+            if slow:
+                stats["slow_calls"] += 1
+                if explain:
+                    stats["plan"] = "pending"
+
+        if slow:
+            print(f"Slow query ({elapsed_ms:.1f} ms): {statement} params={_describe(params)}")
+        if explain:
+            jobs.submit(
+                "explain",
+                lambda: self._explain(conn, statement, query, params),
+                key=f"explain:{hash(statement)}"
+            )
+
+    def _explain(self, conn: duckdb.DuckDBPyConnection, statement: str, query: str, params: Any) -> Dict[str, Any]:
+        """Re-run a slow read statement under EXPLAIN ANALYZE on a cursor of its own"""
+        try:
+            cursor = conn.cursor()
+            try:
+                rows = cursor.execute(f"EXPLAIN ANALYZE {_inline(query, params or [])}").fetchall()
+            finally:
+                cursor.close()
+            plan = "\n".join(str(row[-1]) for row in rows)
+        except Exception as e:
+            # Relations registered on the original cursor are not visible here
+            plan = f"EXPLAIN ANALYZE failed: {e}"
+        with self._lock:
+            if statement in self._stats:
+                self._stats[statement]["plan"] = plan
+        print(f"Plan for slow query: {statement}\n{plan}")
+        return {"statement": statement}
+
+    def top(self, limit: int = 20, order: str = "total_ms") -> List[Dict[str, Any]]:
+        """The `limit` statements with the highest `order` (total_ms, max_ms, calls or slow_calls)"""
+        with self._lock:
+            stats = [dict(entry) for entry in self._stats.values()]
+        for entry in stats:
+            entry["mean_ms"] = entry["total_ms"] / entry["calls"]
+        return sorted(stats, key=lambda entry: entry[order], reverse=True)[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+query_log = QueryLog()
+
+registry.register(Gauge("duckdb_open_cursors", "Cursors open on the shared connection", lambda: query_log.open_cursors))
+
+
+class InstrumentedConnection:
+    """
+    DuckDB connection (or cursor) that times every statement.
+
+    `execute` and `executemany` count towards the sql phase and are recorded
+    in `query_log`, and writes invalidate the tables they touch in
+    `query_cache`; cursors are wrapped the same way. Everything else is
+    passed through to the DuckDB object, so this stands in for it anywhere.
+    """
+
+    def __init__(
+        self,
+        conn: duckdb.DuckDBPyConnection,
+        log: QueryLog = query_log,
+        root: Optional[duckdb.DuckDBPyConnection] = None,
+    ):
+        self._conn = conn
+        self._log = log
+        # Plans are captured on the connection the cursors came from; a cursor may be closed by then
+        self._root = root
+        # Tables written inside the open transaction, invalidated again on commit
+        self._transaction_writes: Optional[set] = None
+
+    def _run(self, method, query: str, params: Any):
+        failed = True
+        start = perf_counter()
+        try:
+            with phase("sql"):
+                method(query, params) if params is not None else method(query)
+            failed = False
+        finally:
+            self._log.record(self._root or self._conn, query, params, (perf_counter() - start) * 1000, failed)
+        tables = written_tables(query)
+        if tables:
+            query_cache.bump(tables)
+            if self._transaction_writes is not None:
+                self._transaction_writes.update(tables)
+        return self
+
+    def execute(self, query: str, parameters: Optional[Sequence[Any]] = None) -> "InstrumentedConnection":
+        return self._run(self._conn.execute, query, parameters)
+
+    def executemany(self, query: str, parameters: Optional[Sequence[Any]] = None) -> "InstrumentedConnection":
+        return self._run(self._conn.executemany, query, parameters)
+
+    def begin(self):
+        self._conn.begin()
+        self._transaction_writes = set()
+        return self
+
+    def commit(self):
+        self._conn.commit()
+        self._end_transaction()
+        return self
+
+    def rollback(self):
+        self._conn.rollback()
+        self._end_transaction()
+        return self
+
+    def _end_transaction(self):
+        # Results read while the transaction was open may have been cached under the
+        # generations its own statements bumped
+        if self._transaction_writes:
+            query_cache.bump(self._transaction_writes)
+        self._transaction_writes = None
+
+    def cursor(self) -> "InstrumentedConnection":
+        cursor = InstrumentedConnection(self._conn.cursor(), self._log, root=self._root or self._conn)
+        with self._log._lock:
+            self._log.open_cursors += 1
+        return cursor
+
+    def close(self):
+        if self._root is not None:
+            with self._log._lock:
+                self._log.open_cursors -= 1
+            self._root = None
+        self._conn.close()
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn, name)
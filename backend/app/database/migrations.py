@@ -0,0 +1,274 @@
+from datetime import datetime
+from typing import List, NamedTuple
+
+import duckdb
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    statements: List[str]
+
+
+# Append new migrations at the end with the next version number; never edit
+# one that has already shipped.
+#
+# Be careful with secondary indexes: DuckDB runs an UPDATE of an indexed column
+# as a delete + insert that trips the primary key check, so only index columns
+# the API never updates. Foreign key columns are already ART-indexed.
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Initial schema", [
+        # Accounts table
+        """
+        CREATE TABLE IF NOT EXISTS accounts (
+            account_id INTEGER PRIMARY KEY,
+            account_name VARCHAR(255) NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE SEQUENCE IF NOT EXISTS seq_accounts START 1
+        """,
+        # Tickers table - symbols user wants to track
+        """
+        CREATE TABLE IF NOT EXISTS tickers (
+            ticker_id INTEGER PRIMARY KEY,
+            ticker_symbol VARCHAR(10) NOT NULL UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE SEQUENCE IF NOT EXISTS seq_tickers START 1
+        """,
+        # Ticker prices table - historical price data
+        """
+        CREATE TABLE IF NOT EXISTS ticker_prices (
+            price_id INTEGER PRIMARY KEY,
+            ticker_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            price DOUBLE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (ticker_id) REFERENCES tickers(ticker_id),
+            UNIQUE(ticker_id, date)
+        )
+        """,
+        """
+        CREATE SEQUENCE IF NOT EXISTS seq_ticker_prices START 1
+        """,
+        # Account Holdings table
+        """
+        CREATE TABLE IF NOT EXISTS account_holdings (
+            holding_id INTEGER PRIMARY KEY,
+            account_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            ticker_symbol VARCHAR(10) NOT NULL,
+            number_of_shares DOUBLE NOT NULL,
+            value DOUBLE NOT NULL,
+            ownership VARCHAR(20) NOT NULL CHECK (ownership IN ('Owned', 'Unowned', 'Unvested')),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+        )
+        """,
+        """
+        CREATE SEQUENCE IF NOT EXISTS seq_holdings START 1
+        """,
+        # Properties table
+        """
+        CREATE TABLE IF NOT EXISTS properties (
+            property_id INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE SEQUENCE IF NOT EXISTS seq_properties START 1
+        """,
+        # Property Values table
+        """
+        CREATE TABLE IF NOT EXISTS property_values (
+            property_value_id INTEGER PRIMARY KEY,
+            property_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            valuation DOUBLE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (property_id) REFERENCES properties(property_id),
+            UNIQUE(property_id, date)
+        )
+        """,
+        """
+        CREATE SEQUENCE IF NOT EXISTS seq_property_values START 1
+        """,
+        # Property Mortgages table
+        """
+        CREATE TABLE IF NOT EXISTS property_mortgages (
+            property_mortgage_id INTEGER PRIMARY KEY,
+            property_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            mortgage DOUBLE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (property_id) REFERENCES properties(property_id),
+            UNIQUE(property_id, date)
+        )
+        """,
+        """
+        CREATE SEQUENCE IF NOT EXISTS seq_property_mortgages START 1
+        """,
+    ]),
+    Migration(2, "Key holdings by ticker_id", [
+        # Every held symbol becomes a ticker, including Cash and funds
+        """
+        INSERT INTO tickers (ticker_id, ticker_symbol, created_at, updated_at)
+        SELECT nextval('seq_tickers'), ticker_symbol, now(), now()
+        FROM (SELECT DISTINCT ticker_symbol FROM account_holdings) h
+        WHERE NOT EXISTS (SELECT 1 FROM tickers t WHERE t.ticker_symbol = h.ticker_symbol)
+        """,
+        # Holdings table - positions keyed by integer ids
+        """
+        CREATE TABLE holdings (
+            holding_id INTEGER PRIMARY KEY,
+            account_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            ticker_id INTEGER NOT NULL,
+            number_of_shares DOUBLE NOT NULL,
+            value DOUBLE NOT NULL,
+            ownership VARCHAR(20) NOT NULL CHECK (ownership IN ('Owned', 'Unowned', 'Unvested')),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (account_id) REFERENCES accounts(account_id),
+            FOREIGN KEY (ticker_id) REFERENCES tickers(ticker_id)
+        )
+        """,
+        """
+        INSERT INTO holdings
+        SELECT h.holding_id, h.account_id, h.date, t.ticker_id, h.number_of_shares,
+               h.value, h.ownership, h.created_at, h.updated_at
+        FROM account_holdings h
+        JOIN tickers t ON t.ticker_symbol = h.ticker_symbol
+        """,
+        """
+        DROP TABLE account_holdings
+        """,
+        # account_holdings keeps the original columns, with the symbol looked up by ticker_id
+        """
+        CREATE VIEW account_holdings AS
+        SELECT h.holding_id, h.account_id, h.date, t.ticker_symbol, h.ticker_id,
+               h.number_of_shares, h.value, h.ownership, h.created_at, h.updated_at
+        FROM holdings h
+        JOIN tickers t ON t.ticker_id = h.ticker_id
+        """,
+    ]),
+    Migration(3, "Net worth rollup", [
+        # One row per period at day, week and month grain, rebuilt by
+        # app.database.networth. No primary key: refreshes delete and
+        # re-insert whole periods inside one transaction.
+        """
+        CREATE TABLE networth (
+            grain VARCHAR(5) NOT NULL,
+            period DATE NOT NULL,
+            as_of DATE NOT NULL,
+            investments DOUBLE NOT NULL,
+            unvested DOUBLE NOT NULL,
+            real_estate DOUBLE NOT NULL,
+            mortgages DOUBLE NOT NULL,
+            net_worth DOUBLE NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        )
+        """,
+    ]),
+    Migration(4, "Daily account balances", [
+        # Per-account balances the networth rollup is summed from; recomputed
+        # per account by app.database.networth
+        """
+        CREATE TABLE daily_balances (
+            account_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            investments DOUBLE NOT NULL,
+            unvested DOUBLE NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        )
+        """,
+        # Rebuilt from daily_balances on next use
+        """
+        DELETE FROM networth
+        """,
+    ]),
+    Migration(5, "Sync tombstones", [
+        # Rows deleted from the tables served by GET /api/sync, so clients can
+        # drop them; a NULL row_id means every row was replaced (a restore)
+        """
+        CREATE TABLE tombstones (
+            table_name VARCHAR NOT NULL,
+            row_id INTEGER,
+            deleted_at TIMESTAMP NOT NULL
+        )
+        """,
+    ]),
+    Migration(6, "Net worth and daily balance indexes", [
+        # Refreshes delete and re-insert these rows by key range and never
+        # update them, so the indexes are safe
+        """
+        CREATE INDEX idx_networth_grain_period ON networth (grain, period)
+        """,
+        """
+        CREATE INDEX idx_daily_balances_account_date ON daily_balances (account_id, date)
+        """,
+    ]),
+]
+
+
+def current_version(conn: duckdb.DuckDBPyConnection) -> int:
+    """Return the latest applied migration, or 0 for a database without a version table"""
+    exists = conn.execute(
+        "SELECT count(*) FROM duckdb_tables() WHERE table_name = 'schema_version'"
+    ).fetchone()[0]
+    if not exists:
+        return 0
+    return conn.execute("SELECT max(version) FROM schema_version").fetchone()[0] or 0
+
+
+def migrate(conn: duckdb.DuckDBPyConnection) -> List[int]:
+    """
+    Apply pending migrations, each in its own transaction.
+
+    An up-to-date database costs a single query. Returns the versions applied.
+    """
+    current = current_version(conn)
+    pending = [m for m in MIGRATIONS if m.version > current]
+    if not pending:
+        return []
+
+    if current == 0:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description VARCHAR NOT NULL,
+                applied_at TIMESTAMP NOT NULL
+            )
+        """)
+
+    applied = []
+    for migration in pending:
+        conn.begin()
+        try:
+            for statement in migration.statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                [migration.version, migration.description, datetime.now()]
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(migration.version)
+        print(f"Applied migration {migration.version}: {migration.description}")
+
+    return applied
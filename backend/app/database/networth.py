@@ -0,0 +1,226 @@
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+import duckdb
+
+GRAINS = ("day", "week", "month")
+
+# Unvested shares are counted net of tax, as in scripts/calculate_daily_balances.py
+UNVESTED_TAX_RATE = 0.30
+
+# Held while the rollup is recomputed; a restore holds it too so no refresh
+# transaction keeps an old snapshot of the rows being replaced
+refresh_lock = threading.RLock()
+
+
+def _first_date(cursor: duckdb.DuckDBPyConnection) -> Optional[date]:
+    """Earliest date any holding, valuation or mortgage covers"""
+    return cursor.execute("""
+        SELECT min(date) FROM (
+            SELECT min(date) AS date FROM holdings
+            UNION ALL SELECT min(date) FROM property_values
+            UNION ALL SELECT min(date) FROM property_mortgages
+        )
+    """).fetchone()[0]
+
+
+def _insert_balances(
+    cursor: duckdb.DuckDBPyConnection,
+    account_id: Optional[int],
+    start: date,
+    end: date,
+    now: datetime,
+):
+    """Compute daily balances of one account (or all) from `start` through `end`"""
+    account_filter = "WHERE account_id = ?" if account_id is not None else ""
+    account_params = [account_id] if account_id is not None else []
+    cursor.execute(f"""
+        INSERT INTO daily_balances
+        WITH dates AS (
+            SELECT unnest(generate_series(CAST(? AS DATE), CAST(? AS DATE), INTERVAL 1 DAY))::DATE AS date
+        ),
+        snapshot_dates AS (
+            SELECT DISTINCT account_id, date AS snapshot_date FROM holdings {account_filter}
+        ),
+        snapshots AS (
+            -- Each account's latest holdings snapshot on or before every date
+            SELECT d.date, s.account_id, s.snapshot_date
+            FROM (SELECT DISTINCT account_id FROM snapshot_dates) a
+            CROSS JOIN dates d
+            ASOF JOIN snapshot_dates s
+                ON s.account_id = a.account_id AND d.date >= s.snapshot_date
+        ),
+        valued AS (
+            SELECT
+                sn.account_id,
+                sn.date,
+                h.ownership,
+                coalesce(h.number_of_shares * tp.price, h.value) AS market_value
+            FROM snapshots sn
+            JOIN holdings h ON h.account_id = sn.account_id AND h.date = sn.snapshot_date
+            ASOF LEFT JOIN ticker_prices tp ON tp.ticker_id = h.ticker_id AND sn.date >= tp.date
+        )
+        SELECT
+            account_id,
+            date,
+            coalesce(sum(market_value) FILTER (WHERE ownership = 'Owned'), 0),
+            coalesce(sum(market_value) FILTER (WHERE ownership = 'Unvested'), 0) * (1 - ?),
+            ?
+        FROM valued
+        GROUP BY account_id, date
+        ORDER BY account_id, date
+    """, [start, end, *account_params, UNVESTED_TAX_RATE, now])
+
+
+def _insert_days(cursor: duckdb.DuckDBPyConnection, start: date, end: date, now: datetime):
+    """Sum daily balances and property equity from `start` through `end`"""
+    cursor.execute("""
+        INSERT INTO networth
+        WITH dates AS (
+            SELECT unnest(generate_series(CAST(? AS DATE), CAST(? AS DATE), INTERVAL 1 DAY))::DATE AS date
+        ),
+        investments AS (
+            SELECT date, sum(investments) AS investments, sum(unvested) AS unvested
+            FROM daily_balances
+            WHERE date >= CAST(? AS DATE)
+            GROUP BY date
+        ),
+        real_estate AS (
+            SELECT pd.date, sum(v.valuation) AS real_estate, sum(coalesce(m.mortgage, 0)) AS mortgages
+            FROM (SELECT p.property_id, d.date FROM properties p CROSS JOIN dates d) pd
+            ASOF JOIN property_values v ON v.property_id = pd.property_id AND pd.date >= v.date
+            ASOF LEFT JOIN property_mortgages m ON m.property_id = pd.property_id AND pd.date >= m.date
+            GROUP BY pd.date
+        )
+        SELECT
+            'day',
+            d.date,
+            d.date,
+            coalesce(i.investments, 0),
+            coalesce(i.unvested, 0),
+            coalesce(r.real_estate, 0),
+            coalesce(r.mortgages, 0),
+            coalesce(i.investments, 0) + coalesce(i.unvested, 0)
+                + coalesce(r.real_estate, 0) - coalesce(r.mortgages, 0),
+            ?
+        FROM dates d
+        LEFT JOIN investments i ON i.date = d.date
+        LEFT JOIN real_estate r ON r.date = d.date
+        ORDER BY d.date
+    """, [start, end, start, now])
+
+
+def _insert_periods(cursor: duckdb.DuckDBPyConnection, grain: str, start: date, now: datetime):
+    """Roll daily rows up to `grain`; a period's balances are those of its last day"""
+    cursor.execute(f"""
+        INSERT INTO networth
+        SELECT
+            '{grain}',
+            date_trunc('{grain}', period)::DATE AS bucket,
+            max(period),
+            arg_max(investments, period),
+            arg_max(unvested, period),
+            arg_max(real_estate, period),
+            arg_max(mortgages, period),
+            arg_max(net_worth, period),
+            ?
+        FROM networth
+        WHERE grain = 'day' AND period >= date_trunc('{grain}', CAST(? AS DATE))
+        GROUP BY bucket
+        ORDER BY bucket
+    """, [now, start])
+
+
+def refresh_networth(
+    conn: duckdb.DuckDBPyConnection,
+    since: Optional[date] = None,
+    accounts: Optional[Dict[int, date]] = None,
+) -> int:
+    """
+    Recompute daily balances and the rollup through today.
+
+    With no `since`, or before the rollup has been built, everything is
+    rebuilt. Otherwise the balances of each account in `accounts` are
+    recomputed from its own date (every account from `since` when `accounts`
+    is None), then rollup days from `since` and the week/month periods
+    containing them. `since` must not be later than any
+    account's date. When the rollup ends before today, every account is
+    first extended from its last day, so accounts outside `accounts` are not
+    left without balances for the new days. Returns the number of daily
+    rollup rows written.
+    """
+    now = datetime.now()
+    with refresh_lock:
+        cursor = conn.cursor()
+        try:
+            cursor.begin()
+            try:
+                first = _first_date(cursor)
+                last = cursor.execute(
+                    "SELECT max(period) FROM networth WHERE grain = 'day'"
+                ).fetchone()[0]
+                # An incremental refresh needs a complete table to patch
+                if since is None or first is None or last is None:
+                    cursor.execute("DELETE FROM daily_balances")
+                    cursor.execute("DELETE FROM networth")
+                    if first is None:
+                        cursor.commit()
+                        return 0
+                    since = first
+                    accounts = None
+
+                end = max(date.today(), since)
+                if accounts is not None and last < end:
+                    # Only the rollup's days have balances for every account
+                    extend = last + timedelta(days=1)
+                    cursor.execute("DELETE FROM daily_balances WHERE date >= ?", [extend])
+                    _insert_balances(cursor, None, max(extend, first), end, now)
+                    since = min(since, extend)
+
+                if accounts is None:
+                    cursor.execute("DELETE FROM daily_balances WHERE date >= ?", [since])
+                    _insert_balances(cursor, None, max(since, first), end, now)
+                else:
+                    for account_id, account_since in accounts.items():
+                        cursor.execute(
+                            "DELETE FROM daily_balances WHERE account_id = ? AND date >= ?",
+                            [account_id, account_since]
+                        )
+                        _insert_balances(cursor, account_id, max(account_since, first), end, now)
+
+                # Clear from `since` even when it precedes the data, so rows
+                # left over from deleted history go away
+                for grain in GRAINS:
+                    cursor.execute(
+                        f"DELETE FROM networth WHERE grain = ? AND period >= date_trunc('{grain}', CAST(? AS DATE))",
+                        [grain, since]
+                    )
+
+                start = max(since, first)
+                _insert_days(cursor, start, end, now)
+                for grain in GRAINS[1:]:
+                    _insert_periods(cursor, grain, start, now)
+
+                days = cursor.execute(
+                    "SELECT count(*) FROM networth WHERE grain = 'day' AND period >= ?", [start]
+                ).fetchone()[0]
+                cursor.commit()
+            except Exception:
+                cursor.rollback()
+                raise
+        finally:
+            cursor.close()
+
+    return days
+
+
+def ensure_networth_current(conn: duckdb.DuckDBPyConnection):
+    """Extend the rollup to today, building it on first use"""
+    last = conn.execute(
+        "SELECT max(period) FROM networth WHERE grain = 'day'"
+    ).fetchone()[0]
+    if last is None:
+        refresh_networth(conn)
+    elif last < date.today():
+        refresh_networth(conn, last)
@@ -0,0 +1,77 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import duckdb
+
+# Tables served by GET /api/sync and the id column deletions are recorded by
+SYNC_TABLES = {
+    "account_holdings": "holding_id",
+    "ticker_prices": "price_id",
+    "property_values": "property_value_id",
+}
+
+
+def record_deletion(conn: duckdb.DuckDBPyConnection, table: str, row_id: int):
+    """Leave a tombstone for a deleted row of a synced table"""
+    conn.execute(
+        "INSERT INTO tombstones (table_name, row_id, deleted_at) VALUES (?, ?, ?)",
+        [table, row_id, datetime.now()]
+    )
+
+
+def record_reset(conn: duckdb.DuckDBPyConnection, tables: Iterable[str]):
+    """Mark synced tables as wholly replaced, so clients refetch them"""
+    now = datetime.now()
+    for table in tables:
+        if table in SYNC_TABLES:
+            conn.execute(
+                "INSERT INTO tombstones (table_name, row_id, deleted_at) VALUES (?, NULL, ?)",
+                [table, now]
+            )
+
+
+def changes_since(
+    conn: duckdb.DuckDBPyConnection,
+    tables: List[str],
+    since: Optional[datetime],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Rows written and ids deleted after `since`, per table, from one snapshot.
+
+    A table is sent whole, with `reset` set, when `since` is None or the table
+    was replaced after it; the client should then discard its copy first.
+    Rows come back as column names plus value arrays to keep the payload small.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.begin()
+        changes = {}
+        for table in tables:
+            deleted: List[int] = []
+            reset = since is None
+            if not reset:
+                rows = cursor.execute(
+                    "SELECT row_id FROM tombstones WHERE table_name = ? AND deleted_at > ? ORDER BY deleted_at",
+                    [table, since]
+                ).fetchall()
+                reset = any(row_id is None for row_id, in rows)
+                deleted = [row_id for row_id, in rows]
+
+            if reset:
+                res = cursor.execute(f"SELECT * FROM {table} ORDER BY {SYNC_TABLES[table]}")
+                deleted = []
+            else:
+                res = cursor.execute(
+                    f"SELECT * FROM {table} WHERE updated_at > ? ORDER BY {SYNC_TABLES[table]}",
+                    [since]
+                )
+            changes[table] = {
+                "columns": [desc[0] for desc in res.description],
+                "rows": res.fetchall(),
+                "deleted": deleted,
+                "reset": reset,
+            }
+        cursor.commit()
+    finally:
+        cursor.close()
+    return changes
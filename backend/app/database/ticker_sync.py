@@ -0,0 +1,117 @@
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import duckdb
+import pyarrow as pa
+
+from app.database.changes import tracker
+from app.database.networth import ensure_networth_current
+from app.database.upserts import changed_since, upsert_series
+
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'scripts')
+
+
+def create_missing_tickers(
+    cursor: duckdb.DuckDBPyConnection,
+    relation: str,
+    column: str,
+    now: datetime,
+) -> int:
+    """Create a `tickers` row for every symbol in `relation`.`column` not tracked yet"""
+    created = cursor.execute(f"""
+        INSERT INTO tickers (ticker_id, ticker_symbol, created_at, updated_at)
+        SELECT nextval('seq_tickers'), symbol, ?, ?
+        FROM (SELECT DISTINCT {column} AS symbol FROM {relation}) r
+        WHERE NOT EXISTS (SELECT 1 FROM tickers t WHERE t.ticker_symbol = r.symbol)
+        RETURNING ticker_id
+    """, [now, now]).fetchall()
+    return len(created)
+
+
+def sync_ticker_prices(conn: duckdb.DuckDBPyConnection, prices: Any) -> Dict[str, int]:
+    """
+    Merge fetched prices into `ticker_prices` in one transaction.
+
+    `prices` is a pandas DataFrame or an Arrow table with `ticker`, `date` and
+    `price` columns, as produced by scripts/fetch_ticker_data.py. Tickers that
+    are not tracked yet are created, then all rows are merged on (ticker_id,
+    date), the last row winning for a repeated key, and the balances of accounts
+    holding the fetched tickers are recomputed from the earliest new or changed
+    price of each; nothing is recomputed when no price changed.
+    """
+    now = datetime.now()
+    if not isinstance(prices, pa.Table):
+        prices = pa.Table.from_pandas(prices, preserve_index=False)
+    # Number the rows here: a window over a scan has no order of its own
+    prices = prices.append_column("row_index", pa.array(range(prices.num_rows), pa.int64()))
+    cursor = conn.cursor()
+    try:
+        cursor.register("fetched_prices", prices)
+        cursor.begin()
+        try:
+            created = create_missing_tickers(cursor, "fetched_prices", "ticker", now)
+
+            cursor.execute("""
+                CREATE OR REPLACE TEMP TABLE incoming_prices AS
+                SELECT
+                    f.row_index,
+                    t.ticker_id,
+                    CAST(f.date AS DATE) AS date,
+                    CAST(f.price AS DOUBLE) AS price
+                FROM fetched_prices f
+                JOIN tickers t ON t.ticker_symbol = f.ticker
+                WHERE f.price > 0
+            """)
+            received = cursor.execute("SELECT count(*) FROM incoming_prices").fetchone()[0]
+            # Earliest new or changed price per ticker; the fetch replays history
+            # that is mostly unchanged, which needs no recompute
+            ranges = changed_since(cursor, "ticker_prices", "incoming_prices")
+            changed = upsert_series(cursor, "ticker_prices", "incoming_prices", now)
+            cursor.execute("DROP TABLE incoming_prices")
+            cursor.commit()
+        except Exception:
+            cursor.rollback()
+            raise
+    finally:
+        cursor.close()
+
+    if ranges:
+        tracker.apply(conn, {}, ranges, None)
+
+    return {"tickers_created": created, "rows_received": received, "rows_changed": changed}
+
+
+def refresh_prices(conn: duckdb.DuckDBPyConnection, data_dir: Optional[str] = None) -> Dict[str, int]:
+    """
+    Fetch the latest closing prices and merge them, in process.
+
+    Runs scripts/fetch_ticker_data.py's incremental fetch against the JSON
+    files in `data_dir` (PRICE_DATA_PATH unless given; the fetch needs yfinance,
+    pandas and pytz installed), then
+    merges the fetched prices through `sync_ticker_prices` and extends the net
+    worth rollup to today, on a cursor of its own so the job never shares the
+    connection with request threads.
+    """
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    from fetch_ticker_data import fetch_ticker_data
+
+    data_dir = data_dir or os.getenv("PRICE_DATA_PATH", "../data")
+
+    records = fetch_ticker_data(
+        input_file=os.path.join(data_dir, "account_balances.json"),
+        output_file=os.path.join(data_dir, "tickers.json"),
+        db_path=None,
+    )
+    cursor = conn.cursor()
+    try:
+        result = sync_ticker_prices(cursor, pa.Table.from_pylist(
+            records, pa.schema([("ticker", pa.string()), ("date", pa.string()), ("price", pa.float64())])
+        ))
+        ensure_networth_current(cursor)
+    finally:
+        cursor.close()
+    return result
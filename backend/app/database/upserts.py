@@ -0,0 +1,104 @@
+from datetime import date, datetime
+from typing import Dict, List, NamedTuple
+
+import duckdb
+
+
+class SeriesTable(NamedTuple):
+    """A dated series keyed by (parent_column, date)"""
+    id_column: str
+    sequence: str
+    parent_table: str
+    parent_column: str
+    value_column: str
+
+
+SERIES_TABLES: Dict[str, SeriesTable] = {
+    "ticker_prices": SeriesTable("price_id", "seq_ticker_prices", "tickers", "ticker_id", "price"),
+    "property_values": SeriesTable(
+        "property_value_id", "seq_property_values", "properties", "property_id", "valuation"
+    ),
+    "property_mortgages": SeriesTable(
+        "property_mortgage_id", "seq_property_mortgages", "properties", "property_id", "mortgage"
+    ),
+}
+
+
+def missing_parents(cursor: duckdb.DuckDBPyConnection, table: str, relation: str) -> List[int]:
+    """Row indexes in `relation` whose parent ticker/property does not exist"""
+    series = SERIES_TABLES[table]
+    result = cursor.execute(f"""
+        SELECT i.row_index FROM {relation} i
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {series.parent_table} p WHERE p.{series.parent_column} = i.{series.parent_column}
+        )
+        ORDER BY i.row_index
+    """).fetchall()
+    return [row_index for (row_index,) in result]
+
+
+def changed_since(cursor: duckdb.DuckDBPyConnection, table: str, relation: str) -> Dict[int, date]:
+    """
+    Earliest date per parent at which `relation` would add or change a row of `table`.
+
+    Run it before `upsert_series` to know which parents need recomputing; rows
+    that match what is stored are left out, as is a parent with only those.
+    """
+    series = SERIES_TABLES[table]
+    key = f"{series.parent_column}, date"
+    return dict(cursor.execute(f"""
+        SELECT i.{series.parent_column}, min(i.date)
+        FROM (
+            SELECT * FROM {relation}
+            QUALIFY row_number() OVER (PARTITION BY {key} ORDER BY row_index DESC) = 1
+        ) i
+        LEFT JOIN {table} t ON t.{series.parent_column} = i.{series.parent_column} AND t.date = i.date
+        WHERE t.{series.value_column} IS NULL OR t.{series.value_column} <> i.{series.value_column}
+        GROUP BY i.{series.parent_column}
+    """).fetchall())
+
+
+def upsert_series(
+    cursor: duckdb.DuckDBPyConnection,
+    table: str,
+    relation: str,
+    now: datetime,
+) -> int:
+    """
+    Insert or update every row of `relation` in one statement.
+
+    `relation` needs (row_index, <parent_column>, date, <value_column>). When the
+    same key appears more than once the last row wins. Rows whose value did not
+    change keep their updated_at, so replaying a window is a no-op. Returns the
+    number of rows inserted or changed.
+    """
+    series = SERIES_TABLES[table]
+    key = f"{series.parent_column}, date"
+
+    result = cursor.execute(f"""
+        INSERT INTO {table}
+        ({series.id_column}, {key}, {series.value_column}, created_at, updated_at)
+        SELECT nextval('{series.sequence}'), {key}, {series.value_column}, ?, ?
+        FROM {relation}
+        QUALIFY row_number() OVER (PARTITION BY {key} ORDER BY row_index DESC) = 1
+        ON CONFLICT ({key}) DO UPDATE
+        SET {series.value_column} = excluded.{series.value_column}, updated_at = excluded.updated_at
+        WHERE {table}.{series.value_column} <> excluded.{series.value_column}
+    """, [now, now]).fetchone()
+    return result[0] if result else 0
+
+
+def series_rows(cursor: duckdb.DuckDBPyConnection, table: str, relation: str) -> duckdb.DuckDBPyConnection:
+    """
+    Select the stored rows for every key in `relation`.
+
+    RETURNING does not include rows taken by DO UPDATE, so upserts read their
+    batch back with this.
+    """
+    series = SERIES_TABLES[table]
+    key = f"{series.parent_column}, date"
+    return cursor.execute(f"""
+        SELECT t.* FROM {table} t
+        JOIN (SELECT DISTINCT {key} FROM {relation}) i USING ({key})
+        ORDER BY t.{series.parent_column}, t.date
+    """)
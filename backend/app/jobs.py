@@ -0,0 +1,225 @@
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from app.market import MARKET_CLOSE, MARKET_TZ
+from app.metrics import JOB_SECONDS
+
+
+def next_market_close(now: Optional[datetime] = None, delay: timedelta = timedelta()) -> datetime:
+    """Next weekday close (plus `delay`) strictly after `now`"""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    day = now.date()
+    while True:
+        run_at = datetime.combine(day, MARKET_CLOSE, MARKET_TZ) + delay
+        if day.weekday() < 5 and run_at > now:
+            return run_at
+        day += timedelta(days=1)
+
+
+class Job:
+    """One submitted unit of work and its timings"""
+
+    def __init__(self, job_id: int, name: str, key: str, group: str, fn: Callable[[], Any], run_at: float):
+        self.job_id = job_id
+        self.name = name
+        self.key = key
+        self.group = group
+        self.fn = fn
+        self.run_at = run_at
+        self.status = "queued"
+        self.coalesced = 0
+        self.submitted_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        wait_ms = duration_ms = None
+        if self.started_at is not None:
+            wait_ms = (self.started_at - self.submitted_at).total_seconds() * 1000
+        if self.finished_at is not None:
+            duration_ms = (self.finished_at - self.started_at).total_seconds() * 1000
+        return {
+            "job_id": self.job_id,
+            "name": self.name,
+            "status": self.status,
+            "coalesced": self.coalesced,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "wait_ms": wait_ms,
+            "duration_ms": duration_ms,
+            "progress": dict(self.progress),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """
+    In-process job queue with recurring schedules.
+
+    Jobs are keyed (by name unless given a key). Submitting a key that is
+    already queued coalesces into the queued job instead of adding another,
+    and two jobs of the same group (the key unless given) never run at once,
+    so a burst of requests for the same work costs one run after the current
+    one. At most `workers` jobs run concurrently; finished jobs are kept for
+    inspection up to `history`. A running job can publish progress through
+    `report`.
+    """
+
+    def __init__(self, workers: int = 2, history: int = 100):
+        self.workers = workers
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._queued: List[Job] = []
+        self._running: Dict[str, Job] = {}
+        self._finished: Deque[Job] = deque(maxlen=history)
+        self._schedules: Dict[str, Dict[str, Any]] = {}
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._local = threading.local()
+
+    def submit(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        key: Optional[str] = None,
+        group: Optional[str] = None,
+        delay: float = 0.0,
+    ) -> Job:
+        """Queue `fn`, or return the queued job with the same key"""
+        key = key or name
+        group = group or key
+        with self._cond:
+            for job in self._queued:
+                if job.key == key:
+                    job.coalesced += 1
+                    return job
+            job = Job(next(self._ids), name, key, group, fn, time.monotonic() + delay)
+            self._queued.append(job)
+            self._cond.notify()
+            return job
+
+    def get(self, job_id: int) -> Optional[Job]:
+        for job in self.jobs():
+            if job.job_id == job_id:
+                return job
+        return None
+
+    def jobs(self) -> List[Job]:
+        """Queued, running and recently finished jobs, newest first"""
+        with self._cond:
+            jobs = self._queued + list(self._running.values()) + list(self._finished)
+        return sorted(jobs, key=lambda job: job.job_id, reverse=True)
+
+    def report(self, **progress: Any):
+        """Merge `progress` into the job running on this thread, if any"""
+        job = getattr(self._local, "job", None)
+        if job is not None:
+            job.progress.update(progress)
+
+    def depth(self) -> int:
+        """Number of jobs waiting to run"""
+        with self._cond:
+            return len(self._queued)
+
+    def schedule(self, name: str, fn: Callable[[], Any], next_run: Callable[[], datetime]):
+        """Submit `fn` at every time `next_run` returns, starting with the next one"""
+        with self._cond:
+            self._schedules[name] = {"fn": fn, "next_run": next_run, "at": next_run()}
+            self._cond.notify_all()
+
+    def schedules(self) -> Dict[str, datetime]:
+        with self._cond:
+            return {name: entry["at"] for name, entry in self._schedules.items()}
+
+    def start(self, workers: Optional[int] = None):
+        """Start the worker threads and the scheduler"""
+        if workers is not None:
+            self.workers = workers
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        self._threads.append(threading.Thread(target=self._tick, name="job-scheduler", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Cancel queued jobs and wait for running ones to finish"""
+        with self._cond:
+            self._stopping.set()
+            for job in self._queued:
+                job.status = "cancelled"
+                self._finished.append(job)
+            self._queued.clear()
+            self._schedules.clear()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _next_job(self) -> Optional[Job]:
+        with self._cond:
+            while not self._stopping.is_set():
+                now = time.monotonic()
+                ready = [job for job in self._queued if job.group not in self._running]
+                due = [job for job in ready if job.run_at <= now]
+                if due:
+                    job = due[0]
+                    self._queued.remove(job)
+                    self._running[job.group] = job
+                    return job
+                timeout = min((job.run_at - now for job in ready), default=None)
+                self._cond.wait(timeout)
+        return None
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            job.status = "running"
+            job.started_at = datetime.now()
+            self._local.job = job
+            try:
+                job.result = job.fn()
+                job.status = "succeeded"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+                print(f"Job {job.name} ({job.job_id}) failed: {e}")
+            finally:
+                self._local.job = None
+            job.finished_at = datetime.now()
+            JOB_SECONDS.observe((job.finished_at - job.started_at).total_seconds(), job.name, job.status)
+
+            with self._cond:
+                del self._running[job.group]
+                self._finished.append(job)
+                self._cond.notify_all()
+
+    def _tick(self):
+        while not self._stopping.is_set():
+            with self._cond:
+                now = datetime.now(MARKET_TZ)
+                for name, entry in self._schedules.items():
+                    if entry["at"] <= now:
+                        self.submit(name, entry["fn"])
+                        entry["at"] = entry["next_run"]()
+                wake = min((entry["at"] for entry in self._schedules.values()), default=None)
+            # Re-check at least every minute so clock changes are picked up
+            timeout = 60.0 if wake is None else min(max((wake - now).total_seconds(), 0), 60.0)
+            self._stopping.wait(timeout)
+
+
+jobs = JobQueue()
@@ -1,10 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
+from datetime import datetime, timedelta, timezone
 import os
 from dotenv import load_dotenv
 
+from app.compression import CompressionMiddleware, compressed_cache
 from app.database.connection import db
+from app.database.changes import tracker
+from app.database.cache import query_cache
+from app.database.instrumented import query_log
+from app.database.ticker_sync import refresh_prices
+from app.jobs import jobs, next_market_close
+from app.timing import ServerTimingMiddleware, TimedJSONResponse, observe_phase
+from app.metrics import PROMETHEUS_MEDIA_TYPE, QUERY_SECONDS, Gauge, MetricsMiddleware, registry
 from app.routers import (
     accounts,
     tickers,
@@ -13,6 +24,10 @@ from app.routers import (
     properties,
     property_values,
     property_mortgages,
+    networth,
+    dashboard,
+    jobs as jobs_router,
+    sync,
     backup
 )
 
@@ -24,10 +39,35 @@ load_dotenv()
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
     # Startup: Connect to database
+    query_log.slow_ms = float(os.getenv("SLOW_QUERY_MS", 200))
+    query_cache.max_bytes = int(float(os.getenv("QUERY_CACHE_MB", 64)) * 1024 * 1024)
+    compressed_cache.max_bytes = int(float(os.getenv("COMPRESSION_CACHE_MB", 32)) * 1024 * 1024)
     db.connect()
     print("Database connected")
+    jobs.start(int(os.getenv("JOB_WORKERS", 2)))
+    tracker.start(db.conn)
+    if os.getenv("PRICE_REFRESH_ENABLED", "true").lower() == "true":
+        # Fetch closing prices and recompute balances shortly after every market close
+        delay = timedelta(minutes=int(os.getenv("PRICE_REFRESH_DELAY_MINUTES", 15)))
+        jobs.schedule(
+            "price_refresh",
+            lambda: refresh_prices(db.conn),
+            lambda: next_market_close(delay=delay)
+        )
+    # Checkpoint when the WAL grows large or writes go quiet, so restarts replay little
+    checkpoint_interval = timedelta(seconds=int(os.getenv("CHECKPOINT_INTERVAL_SECONDS", 60)))
+    jobs.schedule(
+        "checkpoint",
+        lambda: db.checkpoint_if_due(
+            wal_limit=int(float(os.getenv("CHECKPOINT_WAL_MB", 16)) * 1024 * 1024),
+            idle_seconds=float(os.getenv("CHECKPOINT_IDLE_SECONDS", 300))
+        ),
+        lambda: datetime.now(timezone.utc) + checkpoint_interval
+    )
     yield
-    # Shutdown: Close database connection
+    # Shutdown: Let running jobs finish, apply pending recomputes, then checkpoint and close the database
+    jobs.stop()
+    tracker.stop()
     db.close()
     print("Database connection closed")
 
@@ -36,9 +76,25 @@ app = FastAPI(
     title="Investment Tracker API",
     description="API for tracking financial investments and real estate",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse
 )
 
+# Compress large responses; added first so its time shows in Server-Timing as compress
+if os.getenv("COMPRESSION_ENABLED", "true").lower() == "true":
+    app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_BYTES", 1024)))
+
+# Report per-phase timings (sql, materialize, validate, framework, encode, compress) in a Server-Timing header
+if os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true":
+    app.add_middleware(
+        ServerTimingMiddleware,
+        profiling=os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    )
+
+# Request latency histograms; statement timings feed the query histogram
+app.add_middleware(MetricsMiddleware)
+observe_phase("sql", QUERY_SECONDS.observe)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -56,6 +112,10 @@ app.include_router(holdings.router, prefix="/api")
 app.include_router(properties.router, prefix="/api")
 app.include_router(property_values.router, prefix="/api")
 app.include_router(property_mortgages.router, prefix="/api")
+app.include_router(networth.router, prefix="/api")
+app.include_router(dashboard.router, prefix="/api")
+app.include_router(jobs_router.router, prefix="/api")
+app.include_router(sync.router, prefix="/api")
 app.include_router(backup.router, prefix="/api")
 
 
@@ -75,6 +135,65 @@ def health_check():
     return {"status": "healthy"}
 
 
+# Readiness budget for the probe query; slower (or hung) databases report 503
+READY_BUDGET_MS = float(os.getenv("READY_BUDGET_MS", 250))
+
+# The probe in flight, shared by concurrent callers so a hung database ties up one thread
+_probe = None
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: a timed query on a dedicated cursor plus WAL state"""
+    global _probe
+    if _probe is None or _probe.done():
+        _probe = asyncio.get_running_loop().run_in_executor(None, db.probe)
+    
+    body = {
+        "status": "ready",
+        "latency_ms": None,
+        "budget_ms": READY_BUDGET_MS,
+        "wal_bytes": db.wal_size(),
+        "last_checkpoint": db.last_checkpoint.isoformat() if db.last_checkpoint else None,
+    }
+    try:
+        body["latency_ms"] = round(await asyncio.wait_for(asyncio.shield(_probe), READY_BUDGET_MS / 1000), 3)
+        if body["latency_ms"] > READY_BUDGET_MS:
+            body["status"] = "database latency over budget"
+    except asyncio.TimeoutError:
+        body["status"] = "database did not answer within the latency budget"
+    except Exception as e:
+        body["status"] = f"database error: {e}"
+    
+    if body["status"] != "ready":
+        return JSONResponse(body, status_code=503)
+    return body
+
+
+def _file_size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+registry.register(Gauge("job_queue_depth", "Background jobs waiting to run", jobs.depth))
+registry.register(Gauge("duckdb_database_bytes", "Size of the database file", lambda: _file_size(db.db_path)))
+registry.register(Gauge("duckdb_wal_bytes", "Size of the write-ahead log", db.wal_size))
+
+
+@app.get("/metrics")
+def metrics():
+    """Metrics in the Prometheus text format"""
+    return Response(content=registry.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+@app.get("/metrics/queries")
+def query_stats(
+    limit: int = Query(20, ge=1, le=500),
+    order: str = Query("total_ms", pattern="^(total_ms|max_ms|calls|slow_calls)$")
+):
+    """Statistics per normalized statement, with captured plans for slow reads"""
+    return query_log.top(limit, order)
+
+
 if __name__ == "__main__":
     import uvicorn
     host = os.getenv("HOST", "0.0.0.0")
@@ -0,0 +1,12 @@
+from datetime import datetime, time
+from zoneinfo import ZoneInfo
+
+# Prices settle at the US market close. The scheduler and the scripts in
+# scripts/ all use this cutoff to decide whether today's price exists yet.
+MARKET_TZ = ZoneInfo("America/Los_Angeles")
+MARKET_CLOSE = time(16, 0)
+
+
+def market_close(now: datetime) -> datetime:
+    """The close on `now`'s day; `now` must be in MARKET_TZ (a pandas Timestamp works too)"""
+    return now.replace(hour=MARKET_CLOSE.hour, minute=MARKET_CLOSE.minute, second=0, microsecond=0)
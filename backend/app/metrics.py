@@ -0,0 +1,199 @@
+import bisect
+import threading
+from time import perf_counter
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Starlette appends the charset to text responses
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4"
+
+# Seconds; covers sub-millisecond lookups up to multi-second rebuilds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Sharded:
+    """
+    Per-thread storage so recording never takes a lock.
+
+    Each thread writes to its own dict; the registration of a thread's shard
+    is the only locked step, and collection sums the shards.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [dict(shard) for shard in self._shards]
+
+
+class Counter(_Sharded):
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        shard = self._shard()
+        shard[label_values] = shard.get(label_values, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        totals: Dict[Tuple, float] = {}
+        for shard in self._snapshot():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0.0) + value
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key in sorted(totals):
+            lines.append(f"{self.name}{_labels(self.labels, key)} {totals[key]}")
+        return lines
+
+
+class Histogram(_Sharded):
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *label_values: str):
+        shard = self._shard()
+        series = shard.get(label_values)
+        if series is None:
+            # One count per bucket plus +Inf, then the running sum
+            series = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self) -> List[str]:
+        totals: Dict[Tuple, List[float]] = {}
+        for shard in self._snapshot():
+            for key, series in shard.items():
+                total = totals.setdefault(key, [0] * len(series))
+                for i, value in enumerate(list(series)):
+                    total[i] += value
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key in sorted(totals):
+            series = totals[key]
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """A value read when metrics are collected, so it costs nothing in between"""
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def collect(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.read()}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.collect())
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template, method and status",
+    labels=("method", "route", "status"),
+))
+QUERY_SECONDS = registry.register(Histogram(
+    "duckdb_query_duration_seconds",
+    "Time spent executing DuckDB statements",
+))
+JOB_SECONDS = registry.register(Histogram(
+    "job_duration_seconds",
+    "Background job run time, by name and final status",
+    labels=("name", "status"),
+    buckets=DEFAULT_BUCKETS + (30.0, 60.0, 300.0),
+))
+
+
+class MetricsMiddleware:
+    """Record every HTTP request's latency under its route template"""
+
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = 0
+        registry.register(Gauge(
+            "http_requests_in_flight", "Requests currently being handled", lambda: self.in_flight
+        ))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = ["500"]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        self.in_flight += 1
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.in_flight -= 1
+            # FastAPI records the matched route in the scope; templates keep cardinality low
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status[0],
+            )
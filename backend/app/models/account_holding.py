@@ -34,8 +34,24 @@ class AccountHoldingUpdate(BaseModel):
 
 class AccountHolding(AccountHoldingBase):
     holding_id: int
+    ticker_id: int
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class HoldingValuation(BaseModel):
+    """A holding marked to the latest price on or before the valuation date"""
+    holding_id: int
+    account_id: int
+    ticker_id: int
+    ticker_symbol: str
+    holding_date: date
+    number_of_shares: float
+    ownership: OwnershipStatus
+    value: float
+    price: Optional[float] = None
+    price_date: Optional[date] = None
+    market_value: float
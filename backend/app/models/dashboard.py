@@ -0,0 +1,46 @@
+from pydantic import BaseModel
+from typing import List, Optional
+import datetime as dt
+from datetime import date
+
+
+class AccountTotal(BaseModel):
+    account_id: int
+    account_name: str
+    investments: float
+    unvested: float
+    total: float
+    change_30d: Optional[float] = None
+
+
+class PropertyTotal(BaseModel):
+    property_id: int
+    name: str
+    valuation_date: Optional[date] = None
+    valuation: Optional[float] = None
+    mortgage: float
+    equity: Optional[float] = None
+    ltv: Optional[float] = None
+
+
+class TickerAllocation(BaseModel):
+    ticker_symbol: str
+    market_value: float
+    share: Optional[float] = None
+
+
+class NetWorthChange(BaseModel):
+    # dt.date: a default on a field named date would shadow the type in the class body
+    date: Optional[dt.date] = None
+    net_worth: Optional[float] = None
+    change_1d: Optional[float] = None
+    change_30d: Optional[float] = None
+
+
+class DashboardSummary(BaseModel):
+    """Everything the dashboard shows on first paint"""
+    as_of: date
+    accounts: List[AccountTotal]
+    properties: List[PropertyTotal]
+    allocation: List[TickerAllocation]
+    change: NetWorthChange
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from datetime import datetime
+from enum import Enum
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class Job(BaseModel):
+    """A background job; `coalesced` counts submissions folded into it while queued"""
+    job_id: int
+    name: str
+    status: JobStatus
+    coalesced: int
+    submitted_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    wait_ms: Optional[float] = None
+    duration_ms: Optional[float] = None
+    progress: Dict[str, Any] = {}
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+
+class JobSchedule(BaseModel):
+    name: str
+    next_run: datetime
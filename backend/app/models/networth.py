@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from datetime import date, datetime
+from enum import Enum
+
+
+class NetWorthGrain(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class NetWorth(BaseModel):
+    """Balances at the end of a period (`as_of` is the period's last computed day)"""
+    grain: NetWorthGrain
+    period: date
+    as_of: date
+    investments: float
+    unvested: float
+    real_estate: float
+    mortgages: float
+    net_worth: float
+    updated_at: datetime
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 
 
 class PropertyBase(BaseModel):
@@ -22,3 +22,23 @@ class Property(PropertyBase):
 
     class Config:
         from_attributes = True
+
+
+class PropertyEquity(BaseModel):
+    """Valuation, mortgage and equity of a property as of a date"""
+    property_id: int
+    date: date
+    valuation: float
+    mortgage: float
+    equity: float
+    ltv: Optional[float] = None
+
+
+class PortfolioEquity(BaseModel):
+    """Equity summed across all properties as of a date"""
+    date: date
+    valuation: float
+    mortgage: float
+    equity: float
+    ltv: Optional[float] = None
+    property_count: int
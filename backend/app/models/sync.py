@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List
+from datetime import datetime
+
+
+class SyncTable(BaseModel):
+    """Changed rows as column names plus value arrays, and ids deleted since the last sync"""
+    columns: List[str]
+    rows: List[List[Any]]
+    deleted: List[int]
+    reset: bool
+
+
+class SyncResponse(BaseModel):
+    """Pass `as_of` back as `since` on the next sync"""
+    as_of: datetime
+    tables: Dict[str, SyncTable]
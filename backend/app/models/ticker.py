@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import date, datetime
-from typing import Optional
+from typing import List, Optional
 
 
 # Ticker symbols that the user wants to track
@@ -49,3 +49,15 @@ class TickerPrice(TickerPriceBase):
 
     class Config:
         from_attributes = True
+
+
+class TickerPriceSeries(BaseModel):
+    ticker_id: int
+    ticker_symbol: str
+    prices: List[Optional[float]]
+
+
+class TickerPriceMatrix(BaseModel):
+    """Prices of several tickers aligned to one shared dates array"""
+    dates: List[date]
+    tickers: List[TickerPriceSeries]
@@ -0,0 +1,247 @@
+import io
+import time
+import zlib
+from datetime import date, datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import duckdb
+import orjson
+import pyarrow as pa
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from app.database.cache import BOOT_ID, query_cache
+from app.timing import phase
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Rows per record batch pulled from DuckDB while streaming
+STREAM_BATCH_ROWS = 2048
+
+
+def streaming_media_type(request: Request) -> Optional[str]:
+    """Return the streaming format requested through the Accept header, if any"""
+    accept = request.headers.get("accept", "")
+    if NDJSON_MEDIA_TYPE in accept:
+        return NDJSON_MEDIA_TYPE
+    if ARROW_STREAM_MEDIA_TYPE in accept:
+        return ARROW_STREAM_MEDIA_TYPE
+    return None
+
+
+def _ndjson_chunks(reader: pa.RecordBatchReader, cursor: duckdb.DuckDBPyConnection) -> Iterator[bytes]:
+    """Encode each record batch as newline-delimited JSON"""
+    try:
+        for batch in reader:
+            rows = batch.to_pylist()
+            if rows:
+                yield b"\n".join(orjson.dumps(row) for row in rows) + b"\n"
+    finally:
+        cursor.close()
+
+
+def _arrow_chunks(reader: pa.RecordBatchReader, cursor: duckdb.DuckDBPyConnection) -> Iterator[bytes]:
+    """Encode record batches as an Arrow IPC stream, flushing after every batch"""
+    sink = io.BytesIO()
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    try:
+        writer = pa.ipc.new_stream(sink, reader.schema)
+        yield drain()
+        for batch in reader:
+            writer.write_batch(batch)
+            yield drain()
+        writer.close()
+        yield drain()
+    finally:
+        cursor.close()
+
+
+def stream_query(
+    db: duckdb.DuckDBPyConnection,
+    query: str,
+    params: Optional[Sequence[Any]] = None,
+    media_type: str = NDJSON_MEDIA_TYPE,
+) -> StreamingResponse:
+    """
+    Stream a query result in chunks straight from DuckDB's record batch reader.
+
+    The query runs on its own cursor so the shared connection stays free for
+    other requests while the body is being sent.
+    """
+    cursor = db.cursor()
+    try:
+        reader = cursor.execute(query, params or []).fetch_record_batch(STREAM_BATCH_ROWS)
+    except Exception:
+        cursor.close()
+        raise
+
+    if media_type == ARROW_STREAM_MEDIA_TYPE:
+        chunks = _arrow_chunks(reader, cursor)
+    else:
+        chunks = _ndjson_chunks(reader, cursor)
+    return StreamingResponse(chunks, media_type=media_type)
+
+
+def encode_rows(res: duckdb.DuckDBPyConnection) -> bytes:
+    """
+    Encode a pending DuckDB result as a JSON array of objects.
+
+    Rows come straight from SQL with the same columns as the read models, so
+    they are handed to orjson without a Pydantic round trip.
+    """
+    columns = [desc[0] for desc in res.description]
+    with phase("materialize"):
+        result: List[tuple] = res.fetchall()
+        rows = [dict(zip(columns, row)) for row in result]
+    with phase("encode"):
+        return orjson.dumps(rows)
+
+
+def validators(tables: Sequence[str], params: Sequence[Any] = ()) -> Dict[str, str]:
+    """
+    Caching headers for a response reading `tables` with query `params`.
+
+    The weak ETag is built from the tables' generations (and the process's
+    boot id, as generations restart with it), so it changes with every write,
+    and from the parameters, so one computed by the server (such as today's
+    date) changes it too. Last-Modified is not before the start of any date
+    parameter up to today. `no-cache` makes browsers revalidate each time
+    instead of reusing a stale copy.
+    """
+    generations = "-".join(str(g) for g in query_cache.generations(tables))
+    etag = f"{BOOT_ID}-{generations}"
+    if params:
+        etag += f"-{zlib.crc32(repr(tuple(params)).encode()):08x}"
+    now = time.time()
+    modified = max([query_cache.last_modified(tables)] + [
+        min(datetime.combine(value, datetime.min.time()).timestamp(), now)
+        for value in params if type(value) is date
+    ])
+    return {
+        "ETag": f'W/"{etag}"',
+        "Last-Modified": formatdate(modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+
+def not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """Whether the client's conditional headers match `headers`, so 304 can be sent"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: W/ prefixes are ignored
+        etag = headers["ETag"].removeprefix("W/")
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(headers["Last-Modified"]) <= since
+    return False
+
+
+def _cached(
+    query: str,
+    params: Sequence[Any],
+    tables: Sequence[str],
+    run: Callable[[], Optional[bytes]],
+) -> Optional[bytes]:
+    """
+    Serve an encoded result from the query cache, running `run` on a miss.
+
+    Results are keyed by statement and parameters and tagged with the
+    generations of `tables`, which must name every table the query reads.
+    Without `tables` nothing is cached.
+    """
+    if not tables:
+        return run()
+    key = (query, tuple(params))
+    generations = query_cache.generations(tables)
+    body = query_cache.get(key, generations)
+    if body is None:
+        body = run()
+        if body is not None:
+            query_cache.put(key, generations, body)
+    return body
+
+
+def json_response(
+    db: duckdb.DuckDBPyConnection,
+    query: str,
+    params: Optional[Sequence[Any]] = None,
+    tables: Sequence[str] = (),
+) -> Response:
+    """Run a read query and return its rows through the fast JSON path, cached when `tables` are given"""
+    params = params or []
+    body = _cached(query, params, tables, lambda: encode_rows(db.execute(query, params)))
+    return Response(content=body, media_type="application/json")
+
+
+def list_response(
+    request: Request,
+    db: duckdb.DuckDBPyConnection,
+    query: str,
+    params: Optional[Sequence[Any]] = None,
+    tables: Sequence[str] = (),
+) -> Response:
+    """
+    Run a list query, streaming it when the client asked for NDJSON or Arrow.
+
+    Otherwise the rows are encoded through the fast JSON path. When `tables`
+    lists the tables the query reads, the body is served from the query cache
+    and carries an ETag and Last-Modified derived from their generations, and
+    a matching conditional request gets 304 without touching the database.
+    """
+    media_type = streaming_media_type(request)
+    if media_type:
+        return stream_query(db, query, params, media_type)
+    if not tables:
+        return json_response(db, query, params)
+
+    headers = validators(tables, params or ())
+    if not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    response = json_response(db, query, params, tables)
+    response.headers.update(headers)
+    return response
+
+
+def _encode_item(db: duckdb.DuckDBPyConnection, query: str, params: Sequence[Any]) -> Optional[bytes]:
+    res = db.execute(query, params)
+    columns = [desc[0] for desc in res.description]
+    with phase("materialize"):
+        # Drain the result: one left open keeps its transaction open, which blocks checkpoints
+        rows = res.fetchall()
+
+    if not rows:
+        return None
+
+    with phase("encode"):
+        return orjson.dumps(dict(zip(columns, rows[0])))
+
+
+def item_response(
+    db: duckdb.DuckDBPyConnection,
+    query: str,
+    params: Sequence[Any],
+    not_found: str,
+    tables: Sequence[str] = (),
+) -> Response:
+    """Return a single row through the fast JSON path, or 404 with the given detail"""
+    body = _cached(query, params, tables, lambda: _encode_item(db, query, params))
+
+    if body is None:
+        raise HTTPException(status_code=404, detail=not_found)
+
+    return Response(content=body, media_type="application/json")
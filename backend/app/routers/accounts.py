@@ -1,34 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from typing import List
 from datetime import datetime
 import duckdb
 
 from app.models.account import Account, AccountCreate, AccountUpdate
 from app.database.connection import get_db
+from app.responses import item_response, list_response
+from app.timing import TimedRoute
 
-router = APIRouter(prefix="/accounts", tags=["accounts"])
+router = APIRouter(prefix="/accounts", tags=["accounts"], route_class=TimedRoute)
 
 
 @router.get("/", response_model=List[Account])
-def get_accounts(db: duckdb.DuckDBPyConnection = Depends(get_db)):
+def get_accounts(request: Request, db: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get all accounts"""
-    result = db.execute("SELECT * FROM accounts ORDER BY account_id").fetchall()
-    columns = [desc[0] for desc in db.description]
-    return [dict(zip(columns, row)) for row in result]
+    return list_response(request, db, "SELECT * FROM accounts ORDER BY account_id", tables=["accounts"])
 
 
 @router.get("/{account_id}", response_model=Account)
 def get_account(account_id: int, db: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get a specific account by ID"""
-    result = db.execute(
-        "SELECT * FROM accounts WHERE account_id = ?", [account_id]
-    ).fetchone()
-    
-    if not result:
-        raise HTTPException(status_code=404, detail="Account not found")
-    
-    columns = [desc[0] for desc in db.description]
-    return dict(zip(columns, result))
+    return item_response(
+        db,
+        "SELECT * FROM accounts WHERE account_id = ?",
+        [account_id],
+        not_found="Account not found",
+        tables=["accounts"]
+    )
 
 
 @router.post("/", response_model=Account, status_code=201)
@@ -80,8 +78,10 @@ def update_account(
     params.append(datetime.now())
     params.append(account_id)
     
-    query = f"UPDATE accounts SET {', '.join(update_fields)} WHERE account_id = ? RETURNING *"
-    result = db.execute(query, params).fetchone()
+    query = f"UPDATE accounts SET {', '.join(update_fields)} WHERE account_id = ?"
+    # DuckDB rejects UPDATE ... RETURNING on tables linked by foreign keys, so read the row back
+    db.execute(query, params)
+    result = db.execute("SELECT * FROM accounts WHERE account_id = ?", [account_id]).fetchone()
     
     columns = [desc[0] for desc in db.description]
     return dict(zip(columns, result))
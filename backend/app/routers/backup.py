@@ -1,36 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Dict, Any
-import duckdb
+from fastapi import APIRouter, Response
 
+from app.models.job import Job
 from app.database.backup import backup_to_json, restore_from_json
-from app.database.connection import get_db
+from app.jobs import jobs
+from app.timing import TimedRoute
 
-router = APIRouter(prefix="/backup", tags=["backup"])
+router = APIRouter(prefix="/backup", tags=["backup"], route_class=TimedRoute)
 
 
-@router.post("/backup")
-def backup_database(backup_dir: str = "../data") -> Dict[str, Any]:
+def _accepted(job, response: Response):
+    """Point the client at the job's status endpoint"""
+    response.headers["Location"] = f"/api/jobs/{job.job_id}"
+    return job.to_dict()
+
+
+@router.post("/backup", response_model=Job, status_code=202)
+def backup_database(response: Response, backup_dir: str = "../data"):
     """
-    Backup all database tables to JSON files
+    Backup all database tables to JSON files in the background
+    
+    Returns the queued job; poll `/api/jobs/{job_id}` for per-table progress and the
+    result. Backups and restores run one at a time, and a repeated request for the same
+    directory returns the job already queued.
     
     - **backup_dir**: Directory where JSON backup files will be saved (default: ../data)
     """
-    try:
-        result = backup_to_json(backup_dir)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Backup failed: {str(e)}")
+    job = jobs.submit(
+        "backup",
+        lambda: backup_to_json(backup_dir, progress=jobs.report),
+        key=f"backup:{backup_dir}",
+        group="backup"
+    )
+    return _accepted(job, response)
 
 
-@router.post("/restore")
-def restore_database(backup_dir: str = "../data") -> Dict[str, Any]:
+@router.post("/restore", response_model=Job, status_code=202)
+def restore_database(response: Response, backup_dir: str = "../data"):
     """
-    Restore database from JSON files
+    Restore database from JSON files in the background
+    
+    Returns the queued job; poll `/api/jobs/{job_id}` for per-table progress and the
+    result.
     
     - **backup_dir**: Directory containing JSON backup files (default: ../data)
     """
-    try:
-        result = restore_from_json(backup_dir)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Restore failed: {str(e)}")
+    job = jobs.submit(
+        "restore",
+        lambda: restore_from_json(backup_dir, progress=jobs.report),
+        key=f"restore:{backup_dir}",
+        group="backup"
+    )
+    return _accepted(job, response)
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import Response
+from typing import Optional
+from datetime import date, datetime
+import duckdb
+
+from app.models.dashboard import DashboardSummary
+from app.database.connection import get_db
+from app.database.analytics import dashboard_summary_query
+from app.database.networth import ensure_networth_current
+from app.responses import item_response, not_modified, validators
+from app.timing import TimedRoute
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"], route_class=TimedRoute)
+
+# Tables the summary reads
+SUMMARY_TABLES = [
+    "accounts", "holdings", "tickers", "ticker_prices", "daily_balances",
+    "networth", "properties", "property_values", "property_mortgages"
+]
+
+
+@router.get("/summary", response_model=DashboardSummary)
+def get_dashboard_summary(
+    request: Request,
+    as_of: Optional[date] = None,
+    db: duckdb.DuckDBPyConnection = Depends(get_db)
+):
+    """
+    Get account totals, property equity, allocation by ticker and recent net worth change
+    
+    Computed in one query as of a date (default today) and served from the query cache
+    until one of the tables it reads is written.
+    """
+    ensure_networth_current(db)
+    
+    # The effective date is part of the ETag, so yesterday's summary is not revalidated today
+    as_of = as_of or datetime.now().date()
+    headers = validators(SUMMARY_TABLES, (as_of,))
+    if not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    
+    query, params = dashboard_summary_query(as_of)
+    response = item_response(db, query, params, not_found="Summary not available", tables=SUMMARY_TABLES)
+    response.headers.update(headers)
+    return response
@@ -1,34 +1,143 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from typing import Any, Dict, List, Optional
+from datetime import date, datetime
 import duckdb
+import pyarrow as pa
 
-from app.models.account_holding import AccountHolding, AccountHoldingCreate, AccountHoldingUpdate
+from app.models.account_holding import AccountHolding, AccountHoldingCreate, AccountHoldingUpdate, HoldingValuation
 from app.database.connection import get_db
+from app.database.changes import tracker
+from app.database.sync import record_deletion
+from app.database.ticker_sync import create_missing_tickers
+from app.bulk import read_bulk_rows, row_error, validate_rows, write_batch
+from app.responses import item_response, list_response
+from app.timing import TimedRoute
 
-router = APIRouter(prefix="/holdings", tags=["holdings"])
+router = APIRouter(prefix="/holdings", tags=["holdings"], route_class=TimedRoute)
+
+# Tables behind the account_holdings view
+HOLDINGS_TABLES = ["holdings", "tickers"]
 
 
 @router.get("/", response_model=List[AccountHolding])
-def get_holdings(db: duckdb.DuckDBPyConnection = Depends(get_db)):
-    """Get all account holdings"""
-    result = db.execute("SELECT * FROM account_holdings ORDER BY account_id, date DESC").fetchall()
-    columns = [desc[0] for desc in db.description]
-    return [dict(zip(columns, row)) for row in result]
+def get_holdings(
+    request: Request,
+    account_id: Optional[int] = None,
+    ticker_symbol: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: duckdb.DuckDBPyConnection = Depends(get_db)
+):
+    """Get account holdings, optionally filtered by account, ticker symbol and date range"""
+    conditions = []
+    params = []
+    
+    if account_id is not None:
+        conditions.append("account_id = ?")
+        params.append(account_id)
+    
+    if ticker_symbol is not None:
+        conditions.append("ticker_symbol = ?")
+        params.append(ticker_symbol)
+    
+    if start_date is not None:
+        conditions.append("date >= ?")
+        params.append(start_date)
+    
+    if end_date is not None:
+        conditions.append("date <= ?")
+        params.append(end_date)
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return list_response(
+        request,
+        db,
+        f"SELECT * FROM account_holdings {where} ORDER BY account_id, date DESC",
+        params,
+        tables=HOLDINGS_TABLES
+    )
+
+
+@router.get("/valuation", response_model=List[HoldingValuation])
+def get_holdings_valuation(
+    request: Request,
+    date: Optional[date] = None,
+    account_id: Optional[int] = None,
+    db: duckdb.DuckDBPyConnection = Depends(get_db)
+):
+    """
+    Mark holdings to market as of a date (default today)
+    
+    Each account contributes the holdings from its latest snapshot on or before the date,
+    ASOF-joined to the latest price on or before the date. Holdings without a price
+    (Cash, funds) keep their recorded value.
+    """
+    as_of = date or datetime.now().date()
+    account_filter = "AND account_id = ?" if account_id is not None else ""
+    params = [as_of] + ([account_id] if account_id is not None else [])
+    
+    query = f"""
+        WITH snapshots AS (
+            SELECT *, CAST(? AS DATE) AS as_of
+            FROM account_holdings
+            WHERE date <= as_of {account_filter}
+            QUALIFY date = max(date) OVER (PARTITION BY account_id)
+        )
+        SELECT
+            s.holding_id,
+            s.account_id,
+            s.ticker_id,
+            s.ticker_symbol,
+            s.date AS holding_date,
+            s.number_of_shares,
+            s.ownership,
+            s.value,
+            p.price,
+            p.date AS price_date,
+            coalesce(s.number_of_shares * p.price, s.value) AS market_value
+        FROM snapshots s
+        ASOF LEFT JOIN ticker_prices p
+            ON p.ticker_id = s.ticker_id AND s.as_of >= p.date
+        ORDER BY s.account_id, s.ticker_symbol
+    """
+    return list_response(request, db, query, params, tables=HOLDINGS_TABLES + ["ticker_prices"])
 
 
 @router.get("/{holding_id}", response_model=AccountHolding)
 def get_holding(holding_id: int, db: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get a specific holding by ID"""
-    result = db.execute(
-        "SELECT * FROM account_holdings WHERE holding_id = ?", [holding_id]
+    return item_response(
+        db,
+        "SELECT * FROM account_holdings WHERE holding_id = ?",
+        [holding_id],
+        not_found="Holding not found",
+        tables=HOLDINGS_TABLES
+    )
+
+
+def _resolve_ticker_id(db: duckdb.DuckDBPyConnection, ticker_symbol: str, now: datetime) -> int:
+    """Look up the ticker for a holding's symbol, creating it if it is not tracked yet"""
+    ticker = db.execute(
+        "SELECT ticker_id FROM tickers WHERE ticker_symbol = ?", [ticker_symbol]
     ).fetchone()
     
-    if not result:
-        raise HTTPException(status_code=404, detail="Holding not found")
+    if ticker:
+        return ticker[0]
     
-    columns = [desc[0] for desc in db.description]
-    return dict(zip(columns, result))
+    return db.execute("""
+        INSERT INTO tickers (ticker_id, ticker_symbol, created_at, updated_at)
+        VALUES (nextval('seq_tickers'), ?, ?, ?)
+        RETURNING ticker_id
+    """, [ticker_symbol, now, now]).fetchone()[0]
+
+
+def _read_holding(db: duckdb.DuckDBPyConnection, holding_id: int):
+    """Read a holding back through the account_holdings view"""
+    res = db.execute("SELECT * FROM account_holdings WHERE holding_id = ?", [holding_id])
+    columns = [desc[0] for desc in res.description]
+    return dict(zip(columns, res.fetchone()))
 
 
 @router.post("/", response_model=AccountHolding, status_code=201)
@@ -44,15 +153,17 @@ def create_holding(holding: AccountHoldingCreate, db: duckdb.DuckDBPyConnection
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     
+    ticker_id = _resolve_ticker_id(db, holding.ticker_symbol, now)
+    
     result = db.execute("""
-        INSERT INTO account_holdings 
-        (holding_id, account_id, date, ticker_symbol, number_of_shares, value, ownership, created_at, updated_at)
+        INSERT INTO holdings 
+        (holding_id, account_id, date, ticker_id, number_of_shares, value, ownership, created_at, updated_at)
         VALUES (nextval('seq_holdings'), ?, ?, ?, ?, ?, ?, ?, ?)
-        RETURNING *
+        RETURNING holding_id
     """, [
         holding.account_id, 
         holding.date, 
-        holding.ticker_symbol, 
+        ticker_id, 
         holding.number_of_shares,
         holding.value,
         holding.ownership.value,
@@ -60,8 +171,109 @@ def create_holding(holding: AccountHoldingCreate, db: duckdb.DuckDBPyConnection
         now
     ]).fetchone()
     
-    columns = [desc[0] for desc in db.description]
-    return dict(zip(columns, result))
+    tracker.account_changed(holding.account_id, holding.date)
+    return _read_holding(db, result[0])
+
+
+def _insert_holdings(
+    db: duckdb.DuckDBPyConnection,
+    holdings: List[AccountHoldingCreate],
+    indexes: List[int],
+    errors: List[Dict[str, Any]],
+) -> Response:
+    """Insert a validated batch of holdings in one transaction, or report every row error"""
+    now = datetime.now()
+    incoming = pa.table({
+        "row_index": pa.array(indexes, pa.int32()),
+        "account_id": pa.array([h.account_id for h in holdings], pa.int32()),
+        "date": pa.array([h.date for h in holdings], pa.date32()),
+        "ticker_symbol": pa.array([h.ticker_symbol for h in holdings], pa.string()),
+        "number_of_shares": pa.array([h.number_of_shares for h in holdings], pa.float64()),
+        "value": pa.array([h.value for h in holdings], pa.float64()),
+        "ownership": pa.array([h.ownership.value for h in holdings], pa.string()),
+    })
+
+    def check(cursor: duckdb.DuckDBPyConnection):
+        # Verify all referenced accounts exist in one pass
+        missing = cursor.execute("""
+            SELECT i.row_index FROM incoming_holdings i
+            WHERE NOT EXISTS (SELECT 1 FROM accounts a WHERE a.account_id = i.account_id)
+            ORDER BY i.row_index
+        """).fetchall()
+        return [
+            row_error(row_index, "account_id", "Account not found", "foreign_key")
+            for (row_index,) in missing
+        ]
+
+    def write(cursor: duckdb.DuckDBPyConnection):
+        create_missing_tickers(cursor, "incoming_holdings", "ticker_symbol", now)
+        inserted = cursor.execute("""
+            INSERT INTO holdings 
+            (holding_id, account_id, date, ticker_id, number_of_shares, value, ownership, created_at, updated_at)
+            SELECT nextval('seq_holdings'), i.account_id, i.date, t.ticker_id, i.number_of_shares, i.value, i.ownership, ?, ?
+            FROM incoming_holdings i
+            JOIN tickers t ON t.ticker_symbol = i.ticker_symbol
+            ORDER BY i.row_index
+            RETURNING holding_id
+        """, [now, now]).fetchall()
+        return cursor.execute(
+            "SELECT * FROM account_holdings WHERE holding_id IN (SELECT unnest(?)) ORDER BY holding_id",
+            [[holding_id for (holding_id,) in inserted]]
+        )
+
+    body = write_batch(db, "incoming_holdings", incoming, check, write, errors)
+    for h in holdings:
+        tracker.account_changed(h.account_id, h.date)
+    return Response(content=body, media_type="application/json", status_code=201)
+
+
+@router.post("/bulk", response_model=List[AccountHolding], status_code=201)
+async def create_holdings_bulk(request: Request, db: duckdb.DuckDBPyConnection = Depends(get_db)):
+    """
+    Create many account holdings in a single transaction
+    
+    Accepts a JSON array, CSV (`text/csv`) or Arrow IPC body. Every row is validated and
+    checked against `accounts` before anything is inserted; failures are reported per row.
+    """
+    rows = await read_bulk_rows(request)
+    holdings, indexes, errors = validate_rows(rows, AccountHoldingCreate)
+    return await run_in_threadpool(_insert_holdings, db, holdings, indexes, errors)
+
+
+def _rewrite_holding(db: duckdb.DuckDBPyConnection, existing: dict, changes: dict) -> int:
+    """
+    Move a holding to another account or ticker, returning its new holding_id.
+    
+    DuckDB cannot UPDATE a foreign key column in place (the primary key check fires
+    on the row's own old version), nor delete and re-insert the same key within one
+    transaction. So the moved row is inserted under a new holding_id and the old one
+    deleted, with a tombstone for sync clients, in one transaction on a dedicated
+    cursor: readers see the holding either before or after the move.
+    """
+    columns = [
+        "account_id", "date", "ticker_id", "number_of_shares",
+        "value", "ownership", "created_at", "updated_at"
+    ]
+    row = [changes.get(column, existing[column]) for column in columns]
+    
+    cursor = db.cursor()
+    try:
+        cursor.begin()
+        try:
+            holding_id = cursor.execute(f"""
+                INSERT INTO holdings (holding_id, {', '.join(columns)})
+                VALUES (nextval('seq_holdings'), {', '.join('?' for _ in columns)})
+                RETURNING holding_id
+            """, row).fetchone()[0]
+            cursor.execute("DELETE FROM holdings WHERE holding_id = ?", [existing["holding_id"]])
+            record_deletion(cursor, "account_holdings", existing["holding_id"])
+            cursor.commit()
+        except Exception:
+            cursor.rollback()
+            raise
+    finally:
+        cursor.close()
+    return holding_id
 
 
 @router.put("/{holding_id}", response_model=AccountHolding)
@@ -70,18 +282,23 @@ def update_holding(
     holding: AccountHoldingUpdate, 
     db: duckdb.DuckDBPyConnection = Depends(get_db)
 ):
-    """Update an existing account holding"""
+    """
+    Update an existing account holding
+    
+    A holding moved to another account or ticker comes back under a new holding_id.
+    """
+    now = datetime.now()
+    
     # Check if holding exists
-    existing = db.execute(
-        "SELECT * FROM account_holdings WHERE holding_id = ?", [holding_id]
-    ).fetchone()
+    res = db.execute("SELECT * FROM holdings WHERE holding_id = ?", [holding_id])
+    columns = [desc[0] for desc in res.description]
+    existing = res.fetchone()
     
     if not existing:
         raise HTTPException(status_code=404, detail="Holding not found")
     
-    # Build update query dynamically
-    update_fields = []
-    params = []
+    existing = dict(zip(columns, existing))
+    changes = {}
     
     if holding.account_id is not None:
         # Verify account exists
@@ -90,51 +307,53 @@ def update_holding(
         ).fetchone()
         if not account:
             raise HTTPException(status_code=404, detail="Account not found")
-        update_fields.append("account_id = ?")
-        params.append(holding.account_id)
+        changes["account_id"] = holding.account_id
     
     if holding.date is not None:
-        update_fields.append("date = ?")
-        params.append(holding.date)
+        changes["date"] = holding.date
     
     if holding.ticker_symbol is not None:
-        update_fields.append("ticker_symbol = ?")
-        params.append(holding.ticker_symbol)
+        changes["ticker_id"] = _resolve_ticker_id(db, holding.ticker_symbol, now)
     
     if holding.number_of_shares is not None:
-        update_fields.append("number_of_shares = ?")
-        params.append(holding.number_of_shares)
+        changes["number_of_shares"] = holding.number_of_shares
     
     if holding.value is not None:
-        update_fields.append("value = ?")
-        params.append(holding.value)
+        changes["value"] = holding.value
     
     if holding.ownership is not None:
-        update_fields.append("ownership = ?")
-        params.append(holding.ownership.value)
+        changes["ownership"] = holding.ownership.value
     
-    if not update_fields:
+    if not changes:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    update_fields.append("updated_at = ?")
-    params.append(datetime.now())
-    params.append(holding_id)
+    changes["updated_at"] = now
     
-    query = f"UPDATE account_holdings SET {', '.join(update_fields)} WHERE holding_id = ? RETURNING *"
-    result = db.execute(query, params).fetchone()
+    if any(changes.get(key, existing[key]) != existing[key] for key in ("account_id", "ticker_id")):
+        holding_id = _rewrite_holding(db, existing, changes)
+    else:
+        update_fields = [f"{column} = ?" for column in changes]
+        query = f"UPDATE holdings SET {', '.join(update_fields)} WHERE holding_id = ?"
+        # DuckDB rejects UPDATE ... RETURNING on tables linked by foreign keys, so read the row back
+        db.execute(query, [*changes.values(), holding_id])
     
-    columns = [desc[0] for desc in db.description]
-    return dict(zip(columns, result))
+    since = min(existing["date"], changes.get("date", existing["date"]))
+    tracker.account_changed(existing["account_id"], since)
+    if changes.get("account_id", existing["account_id"]) != existing["account_id"]:
+        tracker.account_changed(changes["account_id"], since)
+    return _read_holding(db, holding_id)
 
 
 @router.delete("/{holding_id}", status_code=204)
 def delete_holding(holding_id: int, db: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Delete an account holding"""
     result = db.execute(
-        "DELETE FROM account_holdings WHERE holding_id = ? RETURNING holding_id", [holding_id]
+        "DELETE FROM holdings WHERE holding_id = ? RETURNING account_id, date", [holding_id]
     ).fetchone()
     
     if not result:
         raise HTTPException(status_code=404, detail="Holding not found")
     
+    record_deletion(db, "account_holdings", holding_id)
+    tracker.account_changed(result[0], result[1])
     return None
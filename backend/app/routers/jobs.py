@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+import duckdb
+
+from app.models.job import Job, JobSchedule, JobStatus
+from app.database.connection import get_db
+from app.database.ticker_sync import refresh_prices
+from app.jobs import jobs
+from app.timing import TimedRoute
+
+router = APIRouter(prefix="/jobs", tags=["jobs"], route_class=TimedRoute)
+
+
+@router.get("/", response_model=List[Job])
+def get_jobs(status: Optional[JobStatus] = None):
+    """Get queued, running and recently finished jobs, newest first"""
+    return [
+        job.to_dict() for job in jobs.jobs()
+        if status is None or job.status == status.value
+    ]
+
+
+@router.get("/schedule", response_model=List[JobSchedule])
+def get_job_schedule():
+    """Get the next run of every recurring job"""
+    return [
+        {"name": name, "next_run": next_run}
+        for name, next_run in sorted(jobs.schedules().items())
+    ]
+
+
+@router.post("/price-refresh", response_model=Job, status_code=202)
+def submit_price_refresh(db: duckdb.DuckDBPyConnection = Depends(get_db)):
+    """
+    Queue a price fetch and balance recompute
+    
+    Reads and updates the JSON files in the server's PRICE_DATA_PATH. Returns the already
+    queued refresh if there is one. Poll `/api/jobs/{job_id}` for the outcome.
+    """
+    return jobs.submit("price_refresh", lambda: refresh_prices(db)).to_dict()
+
+
+@router.get("/{job_id}", response_model=Job)
+def get_job(job_id: int):
+    """Get a specific job by ID"""
+    job = jobs.get(job_id)
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job.to_dict()
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, Request
+from typing import List, Optional
+from datetime import date
+import duckdb
+
+from app.models.networth import NetWorth, NetWorthGrain
+from app.database.connection import get_db
+from app.database.networth import ensure_networth_current
+from app.responses import list_response
+from app.timing import TimedRoute
+
+router = APIRouter(prefix="/networth", tags=["networth"], route_class=TimedRoute)
+
+
+@router.get("/", response_model=List[NetWorth])
+def get_networth(
+    request: Request,
+    grain: NetWorthGrain = NetWorthGrain.DAY,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: duckdb.DuckDBPyConnection = Depends(get_db)
+):
+    """
+    Get total net worth over time at day, week or month grain
+    
+    Served from the pre-aggregated `networth` rollup, which writes keep up to date.
+    Investments include owned holdings and unvested shares net of tax; real estate
+    adds valuations and subtracts mortgages.
+    """
+    ensure_networth_current(db)
+    
+    conditions = ["grain = ?"]
+    params = [grain.value]
+    
+    if start_date is not None:
+        conditions.append("period >= ?")
+        params.append(start_date)
+    
+    if end_date is not None:
+        conditions.append("period <= ?")
+        params.append(end_date)
+    
+    return list_response(
+        request,
+        db,
+        f"SELECT * FROM networth WHERE {' AND '.join(conditions)} ORDER BY period",
+        params,
+        tables=["networth"]
+    )
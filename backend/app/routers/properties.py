@@ -1,34 +1,112 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import List, Optional
+from datetime import date, datetime
 import duckdb
 
-from app.models.property import Property, PropertyCreate, PropertyUpdate
+from app.models.property import Property, PropertyCreate, PropertyUpdate, PropertyEquity, PortfolioEquity
 from app.database.connection import get_db
+from app.database.analytics import property_equity_query
+from app.responses import item_response, list_response
+from app.timing import TimedRoute
 
-router = APIRouter(prefix="/properties", tags=["properties"])
+router = APIRouter(prefix="/properties", tags=["properties"], route_class=TimedRoute)
+
+# Tables read by the equity series
+EQUITY_TABLES = ["properties", "property_values", "property_mortgages"]
 
 
 @router.get("/", response_model=List[Property])
-def get_properties(db: duckdb.DuckDBPyConnection = Depends(get_db)):
+def get_properties(request: Request, db: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get all properties"""
-    result = db.execute("SELECT * FROM properties ORDER BY property_id").fetchall()
-    columns = [desc[0] for desc in db.description]
-    return [dict(zip(columns, row)) for row in result]
+    return list_response(request, db, "SELECT * FROM properties ORDER BY property_id", tables=["properties"])
 
 
-@router.get("/{property_id}", response_model=Property)
-def get_property(property_id: int, db: duckdb.DuckDBPyConnection = Depends(get_db)):
-    """Get a specific property by ID"""
-    result = db.execute(
-        "SELECT * FROM properties WHERE property_id = ?", [property_id]
+def _date_range(start_date: Optional[date], end_date: Optional[date]):
+    """WHERE clause and params limiting an equity series to a date range"""
+    conditions = []
+    params = []
+    
+    if start_date is not None:
+        conditions.append("date >= ?")
+        params.append(start_date)
+    
+    if end_date is not None:
+        conditions.append("date <= ?")
+        params.append(end_date)
+    
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+
+@router.get("/equity", response_model=List[PortfolioEquity])
+def get_portfolio_equity(
+    request: Request,
+    monthly: bool = False,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: duckdb.DuckDBPyConnection = Depends(get_db)
+):
+    """
+    Get the equity of all properties combined over time
+    
+    Every property is valued on each date any valuation or mortgage changed, or at each
+    month end with `monthly=true`. LTV is total mortgage over total valuation.
+    """
+    equity, params = property_equity_query(monthly=monthly)
+    where, range_params = _date_range(start_date, end_date)
+    query = f"""
+        SELECT
+            date,
+            sum(valuation) AS valuation,
+            sum(mortgage) AS mortgage,
+            sum(equity) AS equity,
+            sum(mortgage) / nullif(sum(valuation), 0) AS ltv,
+            count(*) AS property_count
+        FROM ({equity})
+        {where}
+        GROUP BY date
+        ORDER BY date
+    """
+    return list_response(request, db, query, params + range_params, tables=EQUITY_TABLES)
+
+
+@router.get("/{property_id}/equity", response_model=List[PropertyEquity])
+def get_property_equity(
+    request: Request,
+    property_id: int,
+    monthly: bool = False,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: duckdb.DuckDBPyConnection = Depends(get_db)
+):
+    """
+    Get a property's valuation, mortgage, equity and LTV over time
+    
+    One row per date the valuation or mortgage changed, or per month end with
+    `monthly=true`, each using the latest figures on or before that date.
+    """
+    existing = db.execute(
+        "SELECT property_id FROM properties WHERE property_id = ?", [property_id]
     ).fetchone()
     
-    if not result:
+    if not existing:
         raise HTTPException(status_code=404, detail="Property not found")
     
-    columns = [desc[0] for desc in db.description]
-    return dict(zip(columns, result))
+    equity, params = property_equity_query(property_id, monthly)
+    where, range_params = _date_range(start_date, end_date)
+    query = f"SELECT * FROM ({equity}) {where} ORDER BY date"
+    return list_response(request, db, query, params + range_params, tables=EQUITY_TABLES)
+
+
+@router.get("/{property_id}", response_model=Property)
+def get_property(property_id: int, db: duckdb.DuckDBPyConnection = Depends(get_db)):
+    """Get a specific property by ID"""
+    return item_response(
+        db,
+        "SELECT * FROM properties WHERE property_id = ?",
+        [property_id],
+        not_found="Property not found",
+        tables=["properties"]
+    )
 
 
 @router.post("/", response_model=Property, status_code=201)
@@ -64,12 +142,13 @@ def update_property(
     if property.name is None:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    result = db.execute("""
+    # DuckDB rejects UPDATE ... RETURNING on tables linked by foreign keys, so read the row back
+    db.execute("""
         UPDATE properties 
         SET name = ?, updated_at = ?
         WHERE property_id = ?
-        RETURNING *
-    """, [property.name, datetime.now(), property_id]).fetchone()
+    """, [property.name, datetime.now(), property_id])
+    result = db.execute("SELECT * FROM properties WHERE property_id = ?", [property_id]).fetchone()
     
     columns = [desc[0] for desc in db.description]
     return dict(zip(columns, result))
@@ -1,34 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from typing import Any, Dict, List
+from datetime import date, datetime
 import duckdb
+import pyarrow as pa
 
 from app.models.property_mortgage import PropertyMortgage, PropertyMortgageCreate, PropertyMortgageUpdate
 from app.database.connection import get_db
+from app.database.changes import tracker
+from app.database.upserts import changed_since, missing_parents, series_rows, upsert_series
+from app.bulk import read_bulk_rows, row_error, validate_rows, write_batch
+from app.responses import item_response, list_response
+from app.timing import TimedRoute
 
-router = APIRouter(prefix="/property-mortgages", tags=["property-mortgages"])
+router = APIRouter(prefix="/property-mortgages", tags=["property-mortgages"], route_class=TimedRoute)
 
 
 @router.get("/", response_model=List[PropertyMortgage])
-def get_property_mortgages(db: duckdb.DuckDBPyConnection = Depends(get_db)):
+def get_property_mortgages(request: Request, db: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get all property mortgages"""
-    result = db.execute("SELECT * FROM property_mortgages ORDER BY property_id, date DESC").fetchall()
-    columns = [desc[0] for desc in db.description]
-    return [dict(zip(columns, row)) for row in result]
+    return list_response(
+        request,
+        db,
+        "SELECT * FROM property_mortgages ORDER BY property_id, date DESC",
+        tables=["property_mortgages"]
+    )
 
 
 @router.get("/{property_mortgage_id}", response_model=PropertyMortgage)
 def get_property_mortgage(property_mortgage_id: int, db: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get a specific property mortgage by ID"""
-    result = db.execute(
-        "SELECT * FROM property_mortgages WHERE property_mortgage_id = ?", [property_mortgage_id]
-    ).fetchone()
-    
-    if not result:
-        raise HTTPException(status_code=404, detail="Property mortgage not found")
-    
-    columns = [desc[0] for desc in db.description]
-    return dict(zip(columns, result))
+    return item_response(
+        db,
+        "SELECT * FROM property_mortgages WHERE property_mortgage_id = ?",
+        [property_mortgage_id],
+        not_found="Property mortgage not found",
+        tables=["property_mortgages"]
+    )
 
 
 @router.post("/", response_model=PropertyMortgage, status_code=201)
@@ -47,20 +56,68 @@ def create_property_mortgage(
     if not property_exists:
         raise HTTPException(status_code=404, detail="Property not found")
     
-    try:
-        result = db.execute("""
-            INSERT INTO property_mortgages 
-            (property_mortgage_id, property_id, date, mortgage, created_at, updated_at)
-            VALUES (nextval('seq_property_mortgages'), ?, ?, ?, ?, ?)
-            RETURNING *
-        """, [property_mortgage.property_id, property_mortgage.date, property_mortgage.mortgage, now, now]).fetchone()
-        
-        columns = [desc[0] for desc in db.description]
-        return dict(zip(columns, result))
-    except Exception as e:
-        if "UNIQUE" in str(e):
-            raise HTTPException(status_code=400, detail="Property mortgage already exists for this date")
-        raise HTTPException(status_code=500, detail=str(e))
+    result = db.execute("""
+        INSERT INTO property_mortgages 
+        (property_mortgage_id, property_id, date, mortgage, created_at, updated_at)
+        VALUES (nextval('seq_property_mortgages'), ?, ?, ?, ?, ?)
+        ON CONFLICT (property_id, date) DO NOTHING
+        RETURNING *
+    """, [property_mortgage.property_id, property_mortgage.date, property_mortgage.mortgage, now, now]).fetchone()
+    
+    if not result:
+        raise HTTPException(status_code=400, detail="Property mortgage already exists for this date")
+    
+    columns = [desc[0] for desc in db.description]
+    tracker.property_changed(property_mortgage.property_id, property_mortgage.date)
+    return dict(zip(columns, result))
+
+
+def _upsert_property_mortgages(
+    db: duckdb.DuckDBPyConnection,
+    rows: List[PropertyMortgageCreate],
+    indexes: List[int],
+    errors: List[Dict[str, Any]],
+) -> Response:
+    """Insert or update a validated batch of property mortgages in one statement, or report every row error"""
+    now = datetime.now()
+    incoming = pa.table({
+        "row_index": pa.array(indexes, pa.int32()),
+        "property_id": pa.array([r.property_id for r in rows], pa.int32()),
+        "date": pa.array([r.date for r in rows], pa.date32()),
+        "mortgage": pa.array([r.mortgage for r in rows], pa.float64()),
+    })
+
+    def check(cursor: duckdb.DuckDBPyConnection):
+        return [
+            row_error(row_index, "property_id", "Property not found", "foreign_key")
+            for row_index in missing_parents(cursor, "property_mortgages", "incoming_property_mortgages")
+        ]
+
+    # Only parents with a new or changed row need recomputing
+    changed: Dict[int, date] = {}
+
+    def write(cursor: duckdb.DuckDBPyConnection):
+        changed.update(changed_since(cursor, "property_mortgages", "incoming_property_mortgages"))
+        upsert_series(cursor, "property_mortgages", "incoming_property_mortgages", now)
+        return series_rows(cursor, "property_mortgages", "incoming_property_mortgages")
+
+    body = write_batch(db, "incoming_property_mortgages", incoming, check, write, errors)
+    for property_id, since in changed.items():
+        tracker.property_changed(property_id, since)
+    return Response(content=body, media_type="application/json")
+
+
+@router.post("/upsert", response_model=List[PropertyMortgage])
+async def upsert_property_mortgages(request: Request, db: duckdb.DuckDBPyConnection = Depends(get_db)):
+    """
+    Insert or update property mortgages keyed by (property_id, date)
+    
+    Accepts a JSON array, CSV (`text/csv`) or Arrow IPC body. Existing rows are overwritten,
+    so a refresh can replay a whole window; if a key appears more than once the last row wins.
+    """
+    rows = await read_bulk_rows(request)
+    property_mortgages, indexes, errors = validate_rows(rows, PropertyMortgageCreate)
+    return await run_in_threadpool(_upsert_property_mortgages, db, property_mortgages, indexes, errors)
 
 
 @router.put("/{property_mortgage_id}", response_model=PropertyMortgage)
@@ -72,7 +129,7 @@ def update_property_mortgage(
     """Update an existing property mortgage"""
     # Check if property mortgage exists
     existing = db.execute(
-        "SELECT * FROM property_mortgages WHERE property_mortgage_id = ?", [property_mortgage_id]
+        "SELECT property_id, date FROM property_mortgages WHERE property_mortgage_id = ?", [property_mortgage_id]
     ).fetchone()
     
     if not existing:
@@ -107,15 +164,33 @@ def update_property_mortgage(
     params.append(datetime.now())
     params.append(property_mortgage_id)
     
-    query = f"UPDATE property_mortgages SET {', '.join(update_fields)} WHERE property_mortgage_id = ? RETURNING *"
+    query = f"UPDATE property_mortgages SET {', '.join(update_fields)} WHERE property_mortgage_id = ?"
+    
+    # The row keeps or takes a (property, date) that must not belong to another row
+    duplicate = db.execute(
+        "SELECT 1 FROM property_mortgages WHERE property_id = ? AND date = ? AND property_mortgage_id <> ?",
+        [property_mortgage.property_id or existing[0], property_mortgage.date or existing[1], property_mortgage_id]
+    ).fetchone()
+    if duplicate:
+        raise HTTPException(status_code=400, detail="Property mortgage already exists for this date")
     
     try:
-        result = db.execute(query, params).fetchone()
+        # DuckDB rejects UPDATE ... RETURNING on tables linked by foreign keys, so read the row back
+        db.execute(query, params)
+        since = min(existing[1], property_mortgage.date or existing[1])
+        tracker.property_changed(existing[0], since)
+        if property_mortgage.property_id is not None:
+            tracker.property_changed(property_mortgage.property_id, since)
+        result = db.execute("SELECT * FROM property_mortgages WHERE property_mortgage_id = ?", [property_mortgage_id]).fetchone()
         columns = [desc[0] for desc in db.description]
         return dict(zip(columns, result))
+    except duckdb.ConstraintException:
+        # DuckDB updates key columns as a delete plus insert, which the primary key rejects
+        raise HTTPException(
+            status_code=409,
+            detail="Property mortgage cannot be moved to another property or date; delete it and create a new one"
+        )
     except Exception as e:
-        if "UNIQUE" in str(e):
-            raise HTTPException(status_code=400, detail="Property mortgage already exists for this date")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -123,11 +198,12 @@ def update_property_mortgage(
 def delete_property_mortgage(property_mortgage_id: int, db: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Delete a property mortgage"""
     result = db.execute(
-        "DELETE FROM property_mortgages WHERE property_mortgage_id = ? RETURNING property_mortgage_id", 
+        "DELETE FROM property_mortgages WHERE property_mortgage_id = ? RETURNING property_id, date", 
         [property_mortgage_id]
     ).fetchone()
     
     if not result:
         raise HTTPException(status_code=404, detail="Property mortgage not found")
     
+    tracker.property_changed(result[0], result[1])
     return None
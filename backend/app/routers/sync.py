@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+from typing import List, Optional
+from datetime import datetime, timedelta
+import duckdb
+import orjson
+
+from app.models.sync import SyncResponse
+from app.database.connection import get_db
+from app.database.sync import SYNC_TABLES, changes_since
+from app.timing import TimedRoute
+
+router = APIRouter(prefix="/sync", tags=["sync"], route_class=TimedRoute)
+
+# Writes stamp updated_at before they commit, so the next window starts a little
+# before this one was read; re-sent rows are harmless as clients upsert by id
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+@router.get("", response_model=SyncResponse)
+def sync(
+    since: Optional[datetime] = None,
+    tables: Optional[List[str]] = Query(None),
+    db: duckdb.DuckDBPyConnection = Depends(get_db)
+):
+    """
+    Get the rows written and deleted since a previous sync
+    
+    Covers account_holdings, ticker_prices and property_values (or the `tables` given).
+    Rows with `updated_at` after `since` are returned per table as column names plus
+    value arrays, with the ids deleted since then. Without `since`, or after a restore,
+    a table is sent whole with `reset` set, and the client should replace its copy.
+    """
+    requested = tables or list(SYNC_TABLES)
+    for table in requested:
+        if table not in SYNC_TABLES:
+            raise HTTPException(status_code=400, detail=f"Unknown sync table: {table}")
+    
+    if since is not None and since.tzinfo is not None:
+        # updated_at is stored as naive local time
+        since = since.astimezone().replace(tzinfo=None)
+    
+    as_of = datetime.now() - SYNC_OVERLAP
+    changes = changes_since(db, requested, since)
+    return Response(
+        content=orjson.dumps({"as_of": as_of, "tables": changes}),
+        media_type="application/json"
+    )
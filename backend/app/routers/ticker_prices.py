@@ -1,30 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from typing import Any, Dict, List, Optional
+from datetime import date, datetime
 import duckdb
+import pyarrow as pa
 
-from app.models.ticker import TickerPrice, TickerPriceCreate, TickerPriceUpdate
+from app.models.ticker import TickerPrice, TickerPriceCreate, TickerPriceMatrix, TickerPriceUpdate
 from app.database.connection import get_db
+from app.database.changes import tracker
+from app.database.sync import record_deletion
+from app.database.upserts import changed_since, missing_parents, series_rows, upsert_series
+from app.bulk import read_bulk_rows, row_error, validate_rows, write_batch
+from app.responses import item_response, list_response, not_modified, validators
+from app.timing import TimedRoute
 
-router = APIRouter(prefix="/ticker-prices", tags=["ticker_prices"])
+router = APIRouter(prefix="/ticker-prices", tags=["ticker_prices"], route_class=TimedRoute)
 
 
 @router.get("/", response_model=List[TickerPrice])
-def get_ticker_prices(db: duckdb.DuckDBPyConnection = Depends(get_db)):
+def get_ticker_prices(request: Request, db: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get all ticker prices"""
-    res = db.execute(
-        "SELECT * FROM ticker_prices ORDER BY date DESC"
-    )
-    columns = [desc[0] for desc in res.description]
-    result = res.fetchall()
-    return [dict(zip(columns, row)) for row in result]
+    return list_response(request, db, "SELECT * FROM ticker_prices ORDER BY date DESC", tables=["ticker_prices"])
 
 
 @router.get("/ticker/{ticker_id}", response_model=List[TickerPrice])
-def get_prices_for_ticker(ticker_id: int, limit: int = 500, db: duckdb.DuckDBPyConnection = Depends(get_db)):
+def get_prices_for_ticker(
+    request: Request,
+    ticker_id: int,
+    limit: int = 500,
+    db: duckdb.DuckDBPyConnection = Depends(get_db)
+):
     """Get prices for a specific ticker (limited to most recent N records for performance)"""
     try:
-        res = db.execute(
+        return list_response(
+            request,
+            db,
             f"""
             SELECT * FROM (
               SELECT * FROM ticker_prices 
@@ -34,29 +45,108 @@ def get_prices_for_ticker(ticker_id: int, limit: int = 500, db: duckdb.DuckDBPyC
             ) sub
             ORDER BY date ASC
             """,
-            [ticker_id]
+            [ticker_id],
+            tables=["ticker_prices"]
         )
-        columns = [desc[0] for desc in res.description]
-        result = res.fetchall()
-        return [dict(zip(columns, row)) for row in result]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Tables read by the batch price matrix
+BATCH_TABLES = ["ticker_prices", "tickers"]
+
+# Largest number of tickers one batch request may ask for
+MAX_BATCH_TICKERS = 100
+
+
+@router.get("/batch", response_model=TickerPriceMatrix)
+def get_prices_for_tickers(
+    request: Request,
+    ids: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: duckdb.DuckDBPyConnection = Depends(get_db)
+):
+    """
+    Get the prices of several tickers as one aligned date x ticker matrix
+    
+    `ids` is a comma-separated list of ticker ids. The response has one `dates` array
+    (every date any of the tickers has a price in the range) and, per ticker in the
+    order requested, a `prices` array aligned to it, with null where that ticker has no
+    price on a date.
+    """
+    try:
+        ticker_ids = list(dict.fromkeys(int(i) for i in ids.split(",") if i.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of ticker ids")
+    if not ticker_ids:
+        raise HTTPException(status_code=400, detail="ids must name at least one ticker")
+    if len(ticker_ids) > MAX_BATCH_TICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_TICKERS} tickers per request")
+    
+    headers = validators(BATCH_TABLES, (tuple(ticker_ids), start, end))
+    if not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    
+    # One statement pivots the series; no row comes back if any ticker is unknown
+    response = item_response(
+        db,
+        """
+        WITH requested AS (
+            SELECT CAST(string_split(?, ',') AS INTEGER[]) AS ids
+        ),
+        requested_tickers AS (
+            SELECT t.ticker_id, t.ticker_symbol, list_position(r.ids, t.ticker_id) AS position
+            FROM tickers t, requested r
+            WHERE list_contains(r.ids, t.ticker_id)
+        ),
+        prices AS (
+            SELECT p.ticker_id, p.date, p.price
+            FROM ticker_prices p
+            JOIN requested_tickers USING (ticker_id)
+            WHERE (CAST(? AS DATE) IS NULL OR p.date >= CAST(? AS DATE))
+              AND (CAST(? AS DATE) IS NULL OR p.date <= CAST(? AS DATE))
+        ),
+        dates AS (
+            SELECT DISTINCT date FROM prices
+        ),
+        series AS (
+            SELECT
+                rt.position,
+                {
+                    'ticker_id': rt.ticker_id,
+                    'ticker_symbol': rt.ticker_symbol,
+                    'prices': coalesce(list(p.price ORDER BY d.date) FILTER (WHERE d.date IS NOT NULL), [])
+                } AS series
+            FROM requested_tickers rt
+            LEFT JOIN dates d ON true
+            LEFT JOIN prices p ON p.ticker_id = rt.ticker_id AND p.date = d.date
+            GROUP BY rt.position, rt.ticker_id, rt.ticker_symbol
+        )
+        SELECT
+            coalesce((SELECT list(date ORDER BY date) FROM dates), []) AS dates,
+            coalesce((SELECT list(series ORDER BY position) FROM series), []) AS tickers
+        FROM requested
+        WHERE (SELECT count(*) FROM requested_tickers) = len(requested.ids)
+        """,
+        [",".join(map(str, ticker_ids)), start, start, end, end],
+        not_found="Ticker not found",
+        tables=BATCH_TABLES
+    )
+    response.headers.update(headers)
+    return response
+
+
 @router.get("/{price_id}", response_model=TickerPrice)
 def get_ticker_price(price_id: int, db: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get a specific ticker price by ID"""
-    res = db.execute(
+    return item_response(
+        db,
         "SELECT * FROM ticker_prices WHERE price_id = ?",
-        [price_id]
+        [price_id],
+        not_found="Ticker price not found",
+        tables=["ticker_prices"]
     )
-    columns = [desc[0] for desc in res.description]
-    result = res.fetchone()
-    
-    if not result:
-        raise HTTPException(status_code=404, detail="Ticker price not found")
-    
-    return dict(zip(columns, result))
 
 
 @router.post("/", response_model=TickerPrice, status_code=201)
@@ -73,23 +163,138 @@ def create_ticker_price(price: TickerPriceCreate, db: duckdb.DuckDBPyConnection
     if not ticker_exists:
         raise HTTPException(status_code=404, detail="Ticker not found")
     
-    try:
-        res = db.execute("""
+    res = db.execute("""
+        INSERT INTO ticker_prices (price_id, ticker_id, date, price, created_at, updated_at)
+        VALUES (nextval('seq_ticker_prices'), ?, ?, ?, ?, ?)
+        ON CONFLICT (ticker_id, date) DO NOTHING
+        RETURNING *
+    """, [price.ticker_id, price.date, price.price, now, now])
+    
+    columns = [desc[0] for desc in res.description]
+    result = res.fetchone()
+    
+    if not result:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Price already exists for this ticker on {price.date}"
+        )
+    
+    tracker.ticker_changed(price.ticker_id, price.date)
+    return dict(zip(columns, result))
+
+
+def _price_batch(prices: List[TickerPriceCreate], indexes: List[int]) -> pa.Table:
+    return pa.table({
+        "row_index": pa.array(indexes, pa.int32()),
+        "ticker_id": pa.array([p.ticker_id for p in prices], pa.int32()),
+        "date": pa.array([p.date for p in prices], pa.date32()),
+        "price": pa.array([p.price for p in prices], pa.float64()),
+    })
+
+
+def _insert_ticker_prices(
+    db: duckdb.DuckDBPyConnection,
+    prices: List[TickerPriceCreate],
+    indexes: List[int],
+    errors: List[Dict[str, Any]],
+) -> Response:
+    """Insert a validated batch of prices in one transaction, or report every row error"""
+    now = datetime.now()
+
+    def check(cursor: duckdb.DuckDBPyConnection):
+        # Check tickers and duplicates (against the table and within the batch) in one pass
+        conflicts = cursor.execute("""
+            SELECT
+                i.row_index,
+                i.date,
+                NOT EXISTS (SELECT 1 FROM tickers t WHERE t.ticker_id = i.ticker_id) AS missing_ticker
+            FROM incoming_prices i
+            WHERE NOT EXISTS (SELECT 1 FROM tickers t WHERE t.ticker_id = i.ticker_id)
+               OR EXISTS (
+                   SELECT 1 FROM ticker_prices p WHERE p.ticker_id = i.ticker_id AND p.date = i.date
+               )
+               OR EXISTS (
+                   SELECT 1 FROM incoming_prices o
+                   WHERE o.ticker_id = i.ticker_id AND o.date = i.date AND o.row_index < i.row_index
+               )
+            ORDER BY i.row_index
+        """).fetchall()
+        return [
+            row_error(row_index, "ticker_id", "Ticker not found", "foreign_key")
+            if missing_ticker else
+            row_error(row_index, "date", f"Price already exists for this ticker on {date}", "unique")
+            for row_index, date, missing_ticker in conflicts
+        ]
+
+    def write(cursor: duckdb.DuckDBPyConnection):
+        return cursor.execute("""
             INSERT INTO ticker_prices (price_id, ticker_id, date, price, created_at, updated_at)
-            VALUES (nextval('seq_ticker_prices'), ?, ?, ?, ?, ?)
+            SELECT nextval('seq_ticker_prices'), ticker_id, date, price, ?, ?
+            FROM incoming_prices
+            ORDER BY row_index
             RETURNING *
-        """, [price.ticker_id, price.date, price.price, now, now])
-        
-        columns = [desc[0] for desc in res.description]
-        result = res.fetchone()
-        return dict(zip(columns, result))
-    except Exception as e:
-        if "UNIQUE" in str(e):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Price already exists for this ticker on {price.date}"
-            )
-        raise HTTPException(status_code=500, detail=str(e))
+        """, [now, now])
+
+    body = write_batch(db, "incoming_prices", _price_batch(prices, indexes), check, write, errors)
+    for ticker_id, since in changed.items():
+        tracker.ticker_changed(ticker_id, since)
+    return Response(content=body, media_type="application/json", status_code=201)
+
+
+@router.post("/bulk", response_model=List[TickerPrice], status_code=201)
+async def create_ticker_prices_bulk(request: Request, db: duckdb.DuckDBPyConnection = Depends(get_db)):
+    """
+    Create many ticker prices in a single transaction
+    
+    Accepts a JSON array, CSV (`text/csv`) or Arrow IPC body. Every row is validated and
+    checked against `tickers` and existing prices before anything is inserted; failures
+    are reported per row.
+    """
+    rows = await read_bulk_rows(request)
+    prices, indexes, errors = validate_rows(rows, TickerPriceCreate)
+    return await run_in_threadpool(_insert_ticker_prices, db, prices, indexes, errors)
+
+
+def _upsert_ticker_prices(
+    db: duckdb.DuckDBPyConnection,
+    prices: List[TickerPriceCreate],
+    indexes: List[int],
+    errors: List[Dict[str, Any]],
+) -> Response:
+    """Insert or update a validated batch of prices in one statement, or report every row error"""
+    now = datetime.now()
+
+    def check(cursor: duckdb.DuckDBPyConnection):
+        return [
+            row_error(row_index, "ticker_id", "Ticker not found", "foreign_key")
+            for row_index in missing_parents(cursor, "ticker_prices", "incoming_prices")
+        ]
+
+    # Only parents with a new or changed row need recomputing
+    changed: Dict[int, date] = {}
+
+    def write(cursor: duckdb.DuckDBPyConnection):
+        changed.update(changed_since(cursor, "ticker_prices", "incoming_prices"))
+        upsert_series(cursor, "ticker_prices", "incoming_prices", now)
+        return series_rows(cursor, "ticker_prices", "incoming_prices")
+
+    body = write_batch(db, "incoming_prices", _price_batch(prices, indexes), check, write, errors)
+    for ticker_id, since in changed.items():
+        tracker.ticker_changed(ticker_id, since)
+    return Response(content=body, media_type="application/json")
+
+
+@router.post("/upsert", response_model=List[TickerPrice])
+async def upsert_ticker_prices(request: Request, db: duckdb.DuckDBPyConnection = Depends(get_db)):
+    """
+    Insert or update ticker prices keyed by (ticker_id, date)
+    
+    Accepts the same bodies as `/bulk`. Existing prices are overwritten, so a refresh can
+    replay a whole window; if a key appears more than once the last row wins.
+    """
+    rows = await read_bulk_rows(request)
+    prices, indexes, errors = validate_rows(rows, TickerPriceCreate)
+    return await run_in_threadpool(_upsert_ticker_prices, db, prices, indexes, errors)
 
 
 @router.put("/{price_id}", response_model=TickerPrice)
@@ -101,7 +306,7 @@ def update_ticker_price(
     """Update a ticker price"""
     # Check if price exists
     existing = db.execute(
-        "SELECT * FROM ticker_prices WHERE price_id = ?", [price_id]
+        "SELECT ticker_id, date FROM ticker_prices WHERE price_id = ?", [price_id]
     ).fetchone()
     
     if not existing:
@@ -112,6 +317,12 @@ def update_ticker_price(
     params = []
     
     if price.ticker_id is not None:
+        # Verify ticker exists
+        ticker_exists = db.execute(
+            "SELECT ticker_id FROM tickers WHERE ticker_id = ?", [price.ticker_id]
+        ).fetchone()
+        if not ticker_exists:
+            raise HTTPException(status_code=404, detail="Ticker not found")
         update_fields.append("ticker_id = ?")
         params.append(price.ticker_id)
     
@@ -130,19 +341,34 @@ def update_ticker_price(
     params.append(datetime.now())
     params.append(price_id)
     
-    query = f"UPDATE ticker_prices SET {', '.join(update_fields)} WHERE price_id = ? RETURNING *"
+    query = f"UPDATE ticker_prices SET {', '.join(update_fields)} WHERE price_id = ?"
+    
+    # The price keeps or takes a (ticker, date) that must not belong to another price
+    duplicate = db.execute(
+        "SELECT 1 FROM ticker_prices WHERE ticker_id = ? AND date = ? AND price_id <> ?",
+        [price.ticker_id or existing[0], price.date or existing[1], price_id]
+    ).fetchone()
+    if duplicate:
+        raise HTTPException(status_code=400, detail="Price already exists for this ticker on this date")
     
     try:
-        res = db.execute(query, params)
+        # DuckDB rejects UPDATE ... RETURNING on tables linked by foreign keys, so read the row back
+        db.execute(query, params)
+        since = min(existing[1], price.date or existing[1])
+        tracker.ticker_changed(existing[0], since)
+        if price.ticker_id is not None:
+            tracker.ticker_changed(price.ticker_id, since)
+        res = db.execute("SELECT * FROM ticker_prices WHERE price_id = ?", [price_id])
         columns = [desc[0] for desc in res.description]
         result = res.fetchone()
         return dict(zip(columns, result))
+    except duckdb.ConstraintException:
+        # DuckDB updates key columns as a delete plus insert, which the primary key rejects
+        raise HTTPException(
+            status_code=409,
+            detail="Price cannot be moved to another ticker or date; delete it and create a new one"
+        )
     except Exception as e:
-        if "UNIQUE" in str(e):
-            raise HTTPException(
-                status_code=400,
-                detail="Price already exists for this ticker on this date"
-            )
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -150,10 +376,12 @@ def update_ticker_price(
 def delete_ticker_price(price_id: int, db: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Delete a ticker price"""
     result = db.execute(
-        "DELETE FROM ticker_prices WHERE price_id = ? RETURNING price_id", [price_id]
+        "DELETE FROM ticker_prices WHERE price_id = ? RETURNING ticker_id, date", [price_id]
     ).fetchone()
     
     if not result:
         raise HTTPException(status_code=404, detail="Ticker price not found")
     
+    record_deletion(db, "ticker_prices", price_id)
+    tracker.ticker_changed(result[0], result[1])
     return None
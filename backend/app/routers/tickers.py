@@ -1,36 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import List, Optional
 from datetime import datetime
 import duckdb
 
 from app.models.ticker import Ticker, TickerCreate, TickerUpdate
 from app.database.connection import get_db
+from app.responses import item_response, list_response
+from app.timing import TimedRoute
 
-router = APIRouter(prefix="/tickers", tags=["tickers"])
+router = APIRouter(prefix="/tickers", tags=["tickers"], route_class=TimedRoute)
 
 
 @router.get("/", response_model=List[Ticker])
-def get_tickers(db: duckdb.DuckDBPyConnection = Depends(get_db)):
+def get_tickers(request: Request, db: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get all ticker symbols"""
-    res = db.execute("SELECT * FROM tickers ORDER BY ticker_symbol")
-    columns = [desc[0] for desc in res.description]
-    result = res.fetchall()
-    return [dict(zip(columns, row)) for row in result]
+    return list_response(request, db, "SELECT * FROM tickers ORDER BY ticker_symbol", tables=["tickers"])
 
 
 @router.get("/{ticker_id}", response_model=Ticker)
 def get_ticker(ticker_id: int, db: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get a specific ticker symbol by ID"""
-    res = db.execute(
-        "SELECT * FROM tickers WHERE ticker_id = ?", [ticker_id]
+    return item_response(
+        db,
+        "SELECT * FROM tickers WHERE ticker_id = ?",
+        [ticker_id],
+        not_found="Ticker not found",
+        tables=["tickers"]
     )
-    columns = [desc[0] for desc in res.description]
-    result = res.fetchone()
-    
-    if not result:
-        raise HTTPException(status_code=404, detail="Ticker not found")
-    
-    return dict(zip(columns, result))
+
+
+def _symbol_taken(db: duckdb.DuckDBPyConnection, ticker_symbol: str, ticker_id: Optional[int] = None) -> bool:
+    """Whether another ticker than `ticker_id` already has `ticker_symbol`"""
+    return db.execute(
+        "SELECT 1 FROM tickers WHERE ticker_symbol = ? AND ticker_id IS DISTINCT FROM ?",
+        [ticker_symbol, ticker_id]
+    ).fetchone() is not None
+
+
+def _referenced(db: duckdb.DuckDBPyConnection, ticker_id: int) -> bool:
+    """Whether any holding or price references the ticker"""
+    return db.execute("""
+        SELECT 1 FROM holdings WHERE ticker_id = ?
+        UNION ALL
+        SELECT 1 FROM ticker_prices WHERE ticker_id = ?
+        LIMIT 1
+    """, [ticker_id, ticker_id]).fetchone() is not None
 
 
 @router.post("/", response_model=Ticker, status_code=201)
@@ -38,6 +52,9 @@ def create_ticker(ticker: TickerCreate, db: duckdb.DuckDBPyConnection = Depends(
     """Create a new ticker symbol"""
     now = datetime.now()
     
+    if _symbol_taken(db, ticker.ticker_symbol):
+        raise HTTPException(status_code=400, detail=f"Ticker {ticker.ticker_symbol} already exists")
+    
     try:
         res = db.execute("""
             INSERT INTO tickers (ticker_id, ticker_symbol, created_at, updated_at)
@@ -48,9 +65,10 @@ def create_ticker(ticker: TickerCreate, db: duckdb.DuckDBPyConnection = Depends(
         columns = [desc[0] for desc in res.description]
         result = res.fetchone()
         return dict(zip(columns, result))
+    except duckdb.ConstraintException:
+        # Created by another request since the check above
+        raise HTTPException(status_code=400, detail=f"Ticker {ticker.ticker_symbol} already exists")
     except Exception as e:
-        if "UNIQUE" in str(e):
-            raise HTTPException(status_code=400, detail=f"Ticker {ticker.ticker_symbol} already exists")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -81,29 +99,54 @@ def update_ticker(
     if not update_fields:
         raise HTTPException(status_code=400, detail="No fields to update")
     
+    if _symbol_taken(db, ticker.ticker_symbol, ticker_id):
+        raise HTTPException(status_code=400, detail=f"Ticker {ticker.ticker_symbol} already exists")
+    if _referenced(db, ticker_id):
+        raise HTTPException(
+            status_code=409,
+            detail="Ticker is referenced by holdings or prices and cannot be renamed; create a new ticker instead"
+        )
+    
     update_fields.append("updated_at = ?")
     params.append(datetime.now())
     params.append(ticker_id)
     
-    query = f"UPDATE tickers SET {', '.join(update_fields)} WHERE ticker_id = ? RETURNING *"
+    query = f"UPDATE tickers SET {', '.join(update_fields)} WHERE ticker_id = ?"
     
     try:
-        res = db.execute(query, params)
+        # DuckDB rejects UPDATE ... RETURNING on tables linked by foreign keys, so read the row back
+        db.execute(query, params)
+        res = db.execute("SELECT * FROM tickers WHERE ticker_id = ?", [ticker_id])
         columns = [desc[0] for desc in res.description]
         result = res.fetchone()
         return dict(zip(columns, result))
+    except duckdb.ConstraintException as e:
+        # DuckDB runs the UPDATE of a unique column as a delete plus insert that can fail the
+        # primary key check, and a holding or price may have been added since the checks above
+        raise HTTPException(status_code=409, detail=f"Ticker could not be renamed: {e}")
     except Exception as e:
-        if "UNIQUE" in str(e):
-            raise HTTPException(status_code=400, detail=f"Ticker {ticker.ticker_symbol} already exists")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.delete("/{ticker_id}", status_code=204)
 def delete_ticker(ticker_id: int, db: duckdb.DuckDBPyConnection = Depends(get_db)):
-    """Delete a ticker"""
-    result = db.execute(
-        "DELETE FROM tickers WHERE ticker_id = ? RETURNING ticker_id", [ticker_id]
-    ).fetchone()
+    """Delete a ticker that no holding or price references"""
+    if _referenced(db, ticker_id):
+        raise HTTPException(
+            status_code=409,
+            detail="Ticker is referenced by holdings or prices; delete those first"
+        )
+    
+    try:
+        result = db.execute(
+            "DELETE FROM tickers WHERE ticker_id = ? RETURNING ticker_id", [ticker_id]
+        ).fetchone()
+    except duckdb.ConstraintException:
+        # A holding or price was added since the check above
+        raise HTTPException(
+            status_code=409,
+            detail="Ticker is referenced by holdings or prices; delete those first"
+        )
     
     if not result:
         raise HTTPException(status_code=404, detail="Ticker not found")
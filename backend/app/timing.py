@@ -0,0 +1,248 @@
+import asyncio
+import cProfile
+import functools
+import io
+import pstats
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:  # pragma: no cover - optional dependency
+    SamplingProfiler = None
+
+# Phases reported in Server-Timing, in header order
+PHASES = ("sql", "materialize", "validate", "framework", "encode", "compress")
+
+# Time spent inside endpoint functions; kept per request to work out the
+# framework phase, not reported itself
+_ENDPOINT = "endpoint"
+
+# Milliseconds spent per phase by the current request; None outside a timed request
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("timings", default=None)
+# Reports collected for a `?profile=1` request; None when not profiling
+_profile_reports: ContextVar[Optional[List[str]]] = ContextVar("profile_reports", default=None)
+
+
+# Callbacks receiving every duration (in seconds) of a phase, timed request or not
+_observers: Dict[str, Callable[[float], None]] = {}
+
+
+def observe_phase(name: str, observer: Callable[[float], None]):
+    """Pass every duration of phase `name` to `observer`, e.g. to feed a metric"""
+    _observers[name] = observer
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Add the time spent in the block to the current request's `name` phase"""
+    timings = _timings.get()
+    observer = _observers.get(name)
+    if timings is None and observer is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = perf_counter() - start
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed * 1000
+        if observer is not None:
+            observer(elapsed)
+
+
+def server_timing(timings: Dict[str, float], total: float) -> str:
+    """Format phase timings as a Server-Timing header value"""
+    entries = [f"{name};dur={timings[name]:.2f}" for name in PHASES if name in timings]
+    entries.append(f"total;dur={total:.2f}")
+    return ", ".join(entries)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that counts rendering towards the encode phase"""
+
+    def render(self, content: Any) -> bytes:
+        with phase("encode"):
+            return super().render(content)
+
+
+def _add_endpoint(timings: Dict[str, float], start: float, encode: float):
+    """Count the time since `start` as endpoint time, less any encoding done in it"""
+    encoded = timings.get("encode", 0.0) - encode
+    timings[_ENDPOINT] = timings.get(_ENDPOINT, 0.0) + (perf_counter() - start) * 1000 - encoded
+
+
+def _profiled_call(call, values: Dict[str, Any]) -> Any:
+    """Run a sync endpoint under a profiler in its worker thread and keep the report"""
+    if SamplingProfiler is not None:
+        profiler = SamplingProfiler(interval=0.0001)
+        profiler.start()
+        try:
+            return call(**values)
+        finally:
+            profiler.stop()
+            _profile_reports.get().append(profiler.output_text(unicode=True, show_all=False))
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return call(**values)
+    finally:
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+        _profile_reports.get().append(out.getvalue())
+
+
+def _timed_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap an endpoint to time it and, for sync ones, to profile `?profile=1` requests"""
+    # include_router rebuilds every route from the wrapped endpoint
+    if getattr(endpoint, "timed", False):
+        return endpoint
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed_async(**values):
+            timings = _timings.get()
+            if timings is None:
+                return await endpoint(**values)
+            encode, start = timings.get("encode", 0.0), perf_counter()
+            try:
+                return await endpoint(**values)
+            finally:
+                _add_endpoint(timings, start, encode)
+        timed_async.timed = True
+        return timed_async
+
+    @functools.wraps(endpoint)
+    def timed(**values):
+        timings = _timings.get()
+        if timings is None:
+            return endpoint(**values)
+        encode, start = timings.get("encode", 0.0), perf_counter()
+        try:
+            if _profile_reports.get() is not None:
+                return _profiled_call(endpoint, values)
+            return endpoint(**values)
+        finally:
+            _add_endpoint(timings, start, encode)
+    timed.timed = True
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """
+    Route class that reports FastAPI's own share of a request as the framework phase.
+
+    Framework is the route's time outside the endpoint function and response
+    encoding: dependency solving, parameter and body validation, and response
+    model validation. Sync endpoints run under the profiler for `?profile=1`
+    requests. Use it as an APIRouter's `route_class`.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            timings = _timings.get()
+            if timings is None:
+                return await handler(request)
+            inside = timings.get(_ENDPOINT, 0.0) + timings.get("encode", 0.0)
+            start = perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                elapsed = (perf_counter() - start) * 1000
+                inside = timings.get(_ENDPOINT, 0.0) + timings.get("encode", 0.0) - inside
+                timings["framework"] = timings.get("framework", 0.0) + max(elapsed - inside, 0.0)
+
+        return timed_handler
+
+
+class ServerTimingMiddleware:
+    """
+    Report where each request's time went in a Server-Timing header.
+
+    Phases are sql (statement execution), materialize (fetching rows into
+    Python), validate (Pydantic validation done by the endpoints), framework
+    (FastAPI's request handling, measured by `TimedRoute`), encode (JSON) and
+    compress (response compression, when that middleware is inside this one),
+    plus the total. With
+    `profiling` enabled, `?profile=1` replaces the response with a profile of
+    the endpoint (pyinstrument when installed, otherwise cProfile). Without the
+    middleware, `phase` costs a context variable and an observer lookup.
+    """
+
+    def __init__(self, app, profiling: bool = False):
+        self.app = app
+        self.profiling = profiling
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.profiling and parse_qs(scope.get("query_string", b"").decode()).get("profile") == ["1"]:
+            await self._profile(scope, receive, send)
+            return
+
+        timings: Dict[str, float] = {}
+        token = _timings.set(timings)
+        start = perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(timings, (perf_counter() - start) * 1000))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+
+    async def _profile(self, scope, receive, send):
+        """Run the request under the profiler and answer with the report instead"""
+        timings: Dict[str, float] = {}
+        timings_token = _timings.set(timings)
+        reports: List[str] = []
+        profiling_token = _profile_reports.set(reports)
+        status = []
+        start = perf_counter()
+
+        async def discard(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            _timings.reset(timings_token)
+            _profile_reports.reset(profiling_token)
+        total = (perf_counter() - start) * 1000
+
+        report = "\n".join(reports) or "Only sync endpoints are profiled\n"
+        body = (
+            f"{scope['method']} {scope['path']} -> {status[0] if status else '?'} in {total:.2f} ms\n"
+            f"Server-Timing: {server_timing(timings, total)}\n\n{report}"
+        ).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"server-timing", server_timing(timings, total).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
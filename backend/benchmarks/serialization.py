@@ -0,0 +1,89 @@
+"""
+Per-row CPU cost of encoding read responses.
+
+Compares the previous read path (rows validated into the response model and
+rendered by the default JSON encoder) with the fast path in app.responses.
+
+Usage (from the backend directory):
+    python -m benchmarks.serialization --rows 100000
+"""
+import argparse
+import json
+import time
+from typing import Callable, List
+
+import duckdb
+from pydantic import TypeAdapter
+
+from app.models.account_holding import AccountHolding
+from app.models.ticker import TickerPrice
+from app.responses import encode_rows
+
+TABLES = {
+    "ticker_prices": (
+        TickerPrice,
+        """
+        SELECT i AS price_id, i % 50 AS ticker_id,
+               DATE '2020-01-01' + CAST(i // 50 AS INTEGER) AS date,
+               random() * 100 + 1 AS price,
+               now()::TIMESTAMP AS created_at, now()::TIMESTAMP AS updated_at
+        FROM range(?) t(i)
+        """,
+    ),
+    "account_holdings": (
+        AccountHolding,
+        """
+        SELECT i AS holding_id, i % 10 AS account_id,
+               DATE '2020-01-01' + CAST(i // 10 AS INTEGER) AS date,
+               'VTI' AS ticker_symbol, 1 AS ticker_id, random() * 100 AS number_of_shares,
+               random() * 10000 AS value, 'Owned' AS ownership,
+               now()::TIMESTAMP AS created_at, now()::TIMESTAMP AS updated_at
+        FROM range(?) t(i)
+        """,
+    ),
+}
+
+
+def validated_path(conn: duckdb.DuckDBPyConnection, query: str, adapter: TypeAdapter) -> bytes:
+    """What FastAPI does for response_model=List[...]: validate, dump, json.dumps"""
+    res = conn.execute(query)
+    columns = [desc[0] for desc in res.description]
+    rows = [dict(zip(columns, row)) for row in res.fetchall()]
+    content = adapter.dump_python(adapter.validate_python(rows), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(conn: duckdb.DuckDBPyConnection, query: str, adapter: TypeAdapter) -> bytes:
+    return encode_rows(conn.execute(query))
+
+
+def measure(fn: Callable[[], bytes], rows: int, repeat: int) -> float:
+    """Best-of-N CPU time per row in microseconds"""
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        timings.append(time.process_time() - start)
+    return min(timings) / rows * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark read response serialization")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows per table")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    conn = duckdb.connect()
+    print(f"{'table':<18} {'validated us/row':>18} {'fast us/row':>12} {'speedup':>8}")
+    for table, (model, source) in TABLES.items():
+        conn.execute(f"CREATE OR REPLACE TABLE {table} AS {source}", [args.rows])
+        query = f"SELECT * FROM {table}"
+        adapter = TypeAdapter(List[model])
+
+        before = measure(lambda: validated_path(conn, query, adapter), args.rows, args.repeat)
+        after = measure(lambda: fast_path(conn, query, adapter), args.rows, args.repeat)
+        print(f"{table:<18} {before:>18.2f} {after:>12.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import compression
+from app.compression import CompressedCache
+from app.database.cache import query_cache
+from app.database.connection import Database, db
+from app.main import app
+
+
+@pytest.fixture
+def database(tmp_path):
+    """A migrated database in its own file"""
+    database = Database(str(tmp_path / "investments.db"))
+    database.connect()
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """The app against a fresh database file, with no scheduled price refresh"""
+    monkeypatch.setenv("PRICE_REFRESH_ENABLED", "false")
+    monkeypatch.setattr(db, "db_path", str(tmp_path / "investments.db"))
+    # Generations outlive a test; cached bodies from another database must not
+    query_cache.clear()
+    monkeypatch.setattr(compression, "compressed_cache", CompressedCache())
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,84 @@
+import json
+
+import duckdb
+import pytest
+
+from app.database.backup import backup_to_json, restore_from_json
+from app.database.connection import get_db
+
+
+def _seed(client):
+    account = client.post("/api/accounts/", json={"account_name": "Brokerage"}).json()
+    ticker = client.post("/api/tickers/", json={"ticker_symbol": "VTI"}).json()
+    client.post("/api/ticker-prices/", json={"ticker_id": ticker["ticker_id"], "date": "2024-01-02", "price": 100})
+    client.post("/api/holdings/", json={
+        "account_id": account["account_id"], "date": "2024-01-02", "ticker_symbol": "VTI",
+        "number_of_shares": 10, "value": 1000, "ownership": "Owned",
+    })
+    return account, ticker
+
+
+def _prices():
+    return get_db().execute("SELECT price_id, price FROM ticker_prices ORDER BY price_id").fetchall()
+
+
+def test_restore_round_trip(client, tmp_path):
+    account, ticker = _seed(client)
+    backup_to_json(str(tmp_path))
+    client.put("/api/ticker-prices/1", json={"price": 1})
+
+    result = restore_from_json(str(tmp_path))
+
+    assert result["restored"]["ticker_prices"] == 1
+    assert _prices() == [(1, 100.0)]
+    assert len(client.get("/api/holdings/").json()) == 1
+    created = client.post("/api/ticker-prices/", json={"ticker_id": ticker["ticker_id"], "date": "2024-01-03", "price": 101})
+    assert created.json()["price_id"] == 2
+    assert get_db().execute(
+        "SELECT count(*) FROM tombstones WHERE table_name = 'ticker_prices' AND row_id IS NULL"
+    ).fetchone()[0] == 1
+
+
+def test_restore_rejects_a_file_that_fails_its_checksum(client, tmp_path):
+    _seed(client)
+    backup_to_json(str(tmp_path))
+    client.put("/api/ticker-prices/1", json={"price": 1})
+    with open(tmp_path / "ticker_prices.json", "a") as f:
+        f.write(" ")
+
+    with pytest.raises(ValueError, match="checksum"):
+        restore_from_json(str(tmp_path))
+    assert _prices() == [(1, 1.0)]
+
+
+def test_failed_restore_rolls_back(client, tmp_path):
+    _seed(client)
+    backup_to_json(str(tmp_path))
+    (tmp_path / "manifest.json").unlink()
+    holdings = json.loads((tmp_path / "account_holdings.json").read_bytes())
+    holdings[0]["account_id"] = 99
+    (tmp_path / "account_holdings.json").write_text(json.dumps(holdings))
+    client.put("/api/ticker-prices/1", json={"price": 1})
+
+    with pytest.raises(duckdb.ConstraintException):
+        restore_from_json(str(tmp_path))
+    assert _prices() == [(1, 1.0)]
+    assert len(client.get("/api/holdings/").json()) == 1
+
+
+def test_readers_keep_their_snapshot_during_a_restore(client, tmp_path):
+    _seed(client)
+    backup_to_json(str(tmp_path))
+    client.put("/api/ticker-prices/1", json={"price": 1})
+    reader = get_db().cursor()
+    try:
+        reader.begin()
+        assert reader.execute("SELECT price FROM ticker_prices").fetchall() == [(1.0,)]
+
+        restore_from_json(str(tmp_path))
+
+        assert reader.execute("SELECT price FROM ticker_prices").fetchall() == [(1.0,)]
+        reader.commit()
+    finally:
+        reader.close()
+    assert _prices() == [(1, 100.0)]
@@ -0,0 +1,41 @@
+def test_bulk_prices_report_every_row_error_and_insert_nothing(client):
+    vti = client.post("/api/tickers/", json={"ticker_symbol": "VTI"}).json()["ticker_id"]
+    client.post("/api/ticker-prices/", json={"ticker_id": vti, "date": "2024-01-01", "price": 100})
+
+    response = client.post("/api/ticker-prices/bulk", json=[
+        {"ticker_id": vti, "date": "2024-01-02", "price": 101},
+        {"ticker_id": vti, "date": "2024-01-03", "price": -1},
+        {"ticker_id": 99, "date": "2024-01-03", "price": 102},
+        {"ticker_id": vti, "date": "2024-01-01", "price": 103},
+        {"ticker_id": vti, "date": "2024-01-02", "price": 104},
+    ])
+
+    assert response.status_code == 422
+    errors = [(error["loc"][1], error["loc"][2], error["type"]) for error in response.json()["detail"]]
+    assert errors == [
+        (1, "price", "greater_than"),
+        (2, "ticker_id", "foreign_key"),
+        (3, "date", "unique"),
+        (4, "date", "unique"),
+    ]
+    assert len(client.get(f"/api/ticker-prices/ticker/{vti}").json()) == 1
+
+
+def test_bulk_holdings_insert_every_row_in_one_go(client):
+    account = client.post("/api/accounts/", json={"account_name": "Brokerage"}).json()["account_id"]
+    rows = [
+        {"account_id": account, "date": "2024-01-02", "ticker_symbol": symbol,
+         "number_of_shares": 1, "value": 10, "ownership": "Owned"}
+        for symbol in ("VTI", "AAPL", "Cash")
+    ]
+
+    response = client.post("/api/holdings/bulk", json=rows)
+    assert response.status_code == 201
+    assert sorted(h["ticker_symbol"] for h in response.json()) == ["AAPL", "Cash", "VTI"]
+
+    rows[1]["account_id"] = 99
+    rows[2]["ownership"] = "Borrowed"
+    response = client.post("/api/holdings/bulk", json=rows)
+    assert response.status_code == 422
+    assert [error["loc"][1:] for error in response.json()["detail"]] == [[1, "account_id"], [2, "ownership"]]
+    assert len(client.get("/api/holdings/").json()) == 3
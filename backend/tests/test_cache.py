@@ -0,0 +1,43 @@
+from app.database.cache import QueryCache
+from app.database.connection import get_db
+
+
+def test_bump_invalidates_results_that_read_the_table():
+    cache = QueryCache()
+    generations = cache.generations(["accounts", "holdings"])
+    cache.put("accounts", generations, b"[]")
+    assert cache.get("accounts", cache.generations(["accounts", "holdings"])) == b"[]"
+
+    cache.bump(["tickers"])
+    assert cache.get("accounts", cache.generations(["accounts", "holdings"])) == b"[]"
+    cache.bump(["holdings"])
+    assert cache.get("accounts", cache.generations(["accounts", "holdings"])) is None
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    cache = QueryCache(max_bytes=10)
+    cache.put("a", (), b"aaaa")
+    cache.put("b", (), b"bbbb")
+    cache.get("a", ())
+    cache.put("c", (), b"cccc")
+
+    assert cache.get("a", ()) == b"aaaa"
+    assert cache.get("b", ()) is None
+    assert cache.size == 8
+
+
+def test_write_in_a_transaction_is_seen_once_committed(client):
+    client.post("/api/accounts/", json={"account_name": "Brokerage"})
+    assert len(client.get("/api/accounts/").json()) == 1
+
+    cursor = get_db().cursor()
+    try:
+        cursor.begin()
+        cursor.execute("INSERT INTO accounts (account_id, account_name) VALUES (99, 'IRA')")
+        # Read (and cached) while the insert is not visible to other cursors yet
+        assert len(client.get("/api/accounts/").json()) == 1
+        cursor.commit()
+    finally:
+        cursor.close()
+
+    assert len(client.get("/api/accounts/").json()) == 2
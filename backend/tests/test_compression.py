@@ -0,0 +1,79 @@
+import asyncio
+import gzip
+
+import brotli
+import orjson
+import pytest
+import zstandard
+
+from app.compression import CompressionMiddleware, negotiate
+
+DECODERS = {
+    "gzip": gzip.decompress,
+    "br": brotli.decompress,
+    "zstd": lambda body: zstandard.ZstdDecompressor().decompressobj().decompress(body),
+}
+
+
+def _app(chunks, media_type="application/x-ndjson"):
+    """An ASGI app sending `chunks` as the response body, streamed when there are several"""
+    async def app(scope, receive, send):
+        headers = [(b"content-type", media_type.encode())]
+        if len(chunks) == 1:
+            headers.append((b"content-length", str(len(chunks[0])).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        for index, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+    return app
+
+
+def _request(app, accept_encoding):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "path": "/", "query_string": b"", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(CompressionMiddleware(app)(scope, receive, send))
+    headers = {k.decode(): v.decode() for k, v in messages[0]["headers"]}
+    return headers, [m["body"] for m in messages[1:]]
+
+
+def test_negotiate_prefers_the_best_accepted_encoding():
+    assert negotiate("gzip, deflate, br, zstd") == "zstd"
+    assert negotiate("gzip;q=1, br;q=0.5") == "gzip"
+    assert negotiate("identity") is None
+    assert negotiate("*;q=0") is None
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_complete_body_is_compressed(encoding):
+    body = orjson.dumps([{"date": f"2024-01-{day:02d}", "price": day} for day in range(1, 29)] * 10)
+
+    headers, chunks = _request(_app([body], "application/json"), encoding)
+
+    assert headers["content-encoding"] == encoding
+    assert headers["content-length"] == str(len(chunks[0]))
+    assert DECODERS[encoding](chunks[0]) == body
+
+
+def test_small_body_is_sent_as_is():
+    headers, chunks = _request(_app([b'{"ok":true}'], "application/json"), "gzip")
+
+    assert "content-encoding" not in headers
+    assert chunks == [b'{"ok":true}']
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_streamed_body_is_compressed_chunk_by_chunk(encoding):
+    lines = [b'{"row":%d}\n' % row for row in range(50)]
+
+    headers, chunks = _request(_app(lines), encoding)
+
+    assert headers["content-encoding"] == encoding
+    assert "content-length" not in headers
+    assert len(chunks) == len(lines)
+    assert DECODERS[encoding](b"".join(chunks)) == b"".join(lines)
@@ -0,0 +1,42 @@
+def test_unchanged_list_is_not_modified(client):
+    client.post("/api/accounts/", json={"account_name": "Brokerage"})
+    response = client.get("/api/accounts/")
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    assert response.headers["cache-control"] == "no-cache"
+
+    revalidated = client.get("/api/accounts/", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert revalidated.content == b""
+
+    since = client.get("/api/accounts/", headers={"If-Modified-Since": response.headers["last-modified"]})
+    assert since.status_code == 304
+
+
+def test_write_changes_the_etag(client):
+    client.post("/api/accounts/", json={"account_name": "Brokerage"})
+    etag = client.get("/api/accounts/").headers["etag"]
+
+    client.post("/api/accounts/", json={"account_name": "IRA"})
+
+    response = client.get("/api/accounts/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()) == 2
+
+
+def test_etag_depends_on_the_query_parameters(client):
+    brokerage = client.post("/api/accounts/", json={"account_name": "Brokerage"}).json()["account_id"]
+    ira = client.post("/api/accounts/", json={"account_name": "IRA"}).json()["account_id"]
+    for account in (brokerage, ira):
+        client.post("/api/holdings/", json={
+            "account_id": account, "date": "2024-01-02", "ticker_symbol": "Cash",
+            "number_of_shares": 1, "value": 1, "ownership": "Owned",
+        })
+
+    etag = client.get("/api/holdings/", params={"account_id": brokerage}).headers["etag"]
+
+    response = client.get("/api/holdings/", params={"account_id": ira}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["account_id"] == ira
@@ -0,0 +1,31 @@
+from app.responses import item_response
+
+
+def test_checkpoint_folds_the_wal(database):
+    database.conn.execute("INSERT INTO accounts (account_id, account_name) VALUES (1, 'Brokerage')")
+    assert database.wal_size() > 0
+
+    assert database.checkpoint()
+    assert database.wal_size() == 0
+
+
+def test_checkpoint_is_skipped_while_a_transaction_is_open(database):
+    cursor = database.conn.cursor()
+    try:
+        cursor.begin()
+        cursor.execute("INSERT INTO accounts (account_id, account_name) VALUES (1, 'Brokerage')")
+        assert not database.checkpoint()
+        cursor.commit()
+    finally:
+        cursor.close()
+
+    assert database.checkpoint()
+    assert database.conn.execute("SELECT count(*) FROM accounts").fetchone()[0] == 1
+
+
+def test_item_response_leaves_no_transaction_open(database):
+    database.conn.execute("INSERT INTO accounts (account_id, account_name) VALUES (1, 'Brokerage'), (2, 'IRA')")
+
+    item_response(database.conn, "SELECT * FROM accounts ORDER BY account_id", [], not_found="No accounts")
+
+    assert database.checkpoint()
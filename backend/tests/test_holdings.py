@@ -0,0 +1,47 @@
+from datetime import date
+
+from app.database.changes import tracker
+
+
+def _holding(client, account_id, symbol="VTI"):
+    return client.post("/api/holdings/", json={
+        "account_id": account_id, "date": "2024-01-02", "ticker_symbol": symbol,
+        "number_of_shares": 10, "value": 1000, "ownership": "Owned",
+    }).json()
+
+
+def test_moved_holding_is_rekeyed_with_a_tombstone(client):
+    brokerage = client.post("/api/accounts/", json={"account_name": "Brokerage"}).json()["account_id"]
+    ira = client.post("/api/accounts/", json={"account_name": "IRA"}).json()["account_id"]
+    holding = _holding(client, brokerage)
+
+    moved = client.put(f"/api/holdings/{holding['holding_id']}", json={"account_id": ira, "ticker_symbol": "AAPL"})
+
+    assert moved.status_code == 200
+    moved = moved.json()
+    assert moved["holding_id"] != holding["holding_id"]
+    assert (moved["account_id"], moved["ticker_symbol"], moved["value"]) == (ira, "AAPL", 1000)
+    assert moved["created_at"] == holding["created_at"]
+    assert client.get(f"/api/holdings/{holding['holding_id']}").status_code == 404
+    sync = client.get("/api/sync", params={"since": holding["updated_at"]}).json()
+    assert holding["holding_id"] in sync["tables"]["account_holdings"]["deleted"]
+
+
+def test_upsert_recomputes_only_changed_parents(client, monkeypatch):
+    changed = []
+    monkeypatch.setattr(tracker, "ticker_changed", lambda ticker_id, since: changed.append((ticker_id, since)))
+    vti = client.post("/api/tickers/", json={"ticker_symbol": "VTI"}).json()["ticker_id"]
+    aapl = client.post("/api/tickers/", json={"ticker_symbol": "AAPL"}).json()["ticker_id"]
+    prices = [
+        {"ticker_id": ticker_id, "date": f"2024-01-{day:02d}", "price": 100 + day}
+        for ticker_id in (vti, aapl) for day in range(1, 6)
+    ]
+    client.post("/api/ticker-prices/upsert", json=prices)
+    changed.clear()
+
+    assert client.post("/api/ticker-prices/upsert", json=prices).status_code == 200
+    assert changed == []
+
+    prices[3]["price"] = 999
+    client.post("/api/ticker-prices/upsert", json=prices)
+    assert changed == [(vti, date(2024, 1, 4))]
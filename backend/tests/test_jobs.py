@@ -0,0 +1,15 @@
+from datetime import datetime, timedelta
+
+from app.jobs import next_market_close
+from app.market import MARKET_TZ, market_close
+
+
+def test_market_close_is_on_the_same_day():
+    now = datetime(2024, 3, 4, 9, 30, tzinfo=MARKET_TZ)
+    assert market_close(now) == datetime(2024, 3, 4, 16, 0, tzinfo=MARKET_TZ)
+
+
+def test_next_market_close_skips_the_weekend():
+    friday_evening = datetime(2024, 3, 8, 17, 0, tzinfo=MARKET_TZ)
+    assert next_market_close(friday_evening) == datetime(2024, 3, 11, 16, 0, tzinfo=MARKET_TZ)
+    assert next_market_close(friday_evening, timedelta(minutes=15)) == datetime(2024, 3, 11, 16, 15, tzinfo=MARKET_TZ)
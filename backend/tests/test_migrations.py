@@ -0,0 +1,44 @@
+import duckdb
+import pytest
+
+from app.database import migrations
+from app.database.migrations import MIGRATIONS, Migration, current_version, migrate
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = duckdb.connect(str(tmp_path / "investments.db"))
+    yield conn
+    conn.close()
+
+
+def test_new_database_gets_every_migration_once(conn):
+    assert migrate(conn) == [migration.version for migration in MIGRATIONS]
+    assert current_version(conn) == MIGRATIONS[-1].version
+
+    assert migrate(conn) == []
+    assert conn.execute("SELECT count(*) FROM schema_version").fetchone()[0] == len(MIGRATIONS)
+
+
+def test_failed_migration_is_rolled_back(conn, monkeypatch):
+    migrate(conn)
+    latest = MIGRATIONS[-1].version
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS + [
+        Migration(latest + 1, "Broken", ["CREATE TABLE half_done (id INTEGER)", "SELECT * FROM missing_table"]),
+    ])
+
+    with pytest.raises(duckdb.CatalogException):
+        migrate(conn)
+
+    assert current_version(conn) == latest
+    assert conn.execute("SELECT count(*) FROM duckdb_tables() WHERE table_name = 'half_done'").fetchone()[0] == 0
+
+
+def test_rollup_tables_are_indexed_by_their_lookup_keys(conn):
+    migrate(conn)
+
+    indexes = conn.execute("SELECT index_name, table_name FROM duckdb_indexes() ORDER BY index_name").fetchall()
+    assert indexes == [
+        ("idx_daily_balances_account_date", "daily_balances"),
+        ("idx_networth_grain_period", "networth"),
+    ]
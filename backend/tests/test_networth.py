@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.database import networth
+from app.database.networth import refresh_networth
+
+YESTERDAY = date(2024, 3, 1)
+TODAY = YESTERDAY + timedelta(days=1)
+
+
+class FakeDate(date):
+    today_value = YESTERDAY
+
+    @classmethod
+    def today(cls):
+        return cls.today_value
+
+
+@pytest.fixture
+def conn(database, monkeypatch):
+    monkeypatch.setattr(networth, "date", FakeDate)
+    conn = database.conn
+    conn.execute("INSERT INTO accounts (account_id, account_name) VALUES (1, 'Brokerage'), (2, 'Savings')")
+    conn.execute("INSERT INTO tickers (ticker_id, ticker_symbol) VALUES (1, 'Cash')")
+    conn.execute("""
+        INSERT INTO holdings (holding_id, account_id, date, ticker_id, number_of_shares, value, ownership)
+        VALUES (1, 1, ?, 1, 1000, 1000, 'Owned'), (2, 2, ?, 1, 500, 500, 'Owned')
+    """, [YESTERDAY, YESTERDAY])
+    return conn
+
+
+def _net_worth(conn, day):
+    return conn.execute(
+        "SELECT net_worth FROM networth WHERE grain = 'day' AND period = ?", [day]
+    ).fetchone()[0]
+
+
+def test_edit_the_day_after_the_last_refresh_extends_every_account(conn):
+    refresh_networth(conn)
+    assert _net_worth(conn, YESTERDAY) == 1500
+
+    FakeDate.today_value = TODAY
+    try:
+        conn.execute("""
+            INSERT INTO holdings (holding_id, account_id, date, ticker_id, number_of_shares, value, ownership)
+            VALUES (3, 1, ?, 1, 1100, 1100, 'Owned')
+        """, [TODAY])
+        refresh_networth(conn, TODAY, {1: TODAY})
+    finally:
+        FakeDate.today_value = YESTERDAY
+
+    assert _net_worth(conn, YESTERDAY) == 1500
+    assert _net_worth(conn, TODAY) == 1600
+    balances = conn.execute(
+        "SELECT account_id, investments FROM daily_balances WHERE date = ? ORDER BY account_id", [TODAY]
+    ).fetchall()
+    assert balances == [(1, 1100), (2, 500)]
@@ -0,0 +1,50 @@
+from app.database.backup import backup_to_json, restore_from_json
+
+
+def _holding(client, account_id, symbol):
+    return client.post("/api/holdings/", json={
+        "account_id": account_id, "date": "2024-01-02", "ticker_symbol": symbol,
+        "number_of_shares": 1, "value": 1, "ownership": "Owned",
+    }).json()
+
+
+def test_first_sync_sends_every_table_whole(client):
+    account = client.post("/api/accounts/", json={"account_name": "Brokerage"}).json()["account_id"]
+    _holding(client, account, "VTI")
+
+    tables = client.get("/api/sync").json()["tables"]
+
+    assert set(tables) == {"account_holdings", "ticker_prices", "property_values"}
+    assert tables["account_holdings"]["reset"]
+    assert len(tables["account_holdings"]["rows"]) == 1
+
+
+def test_deleted_rows_come_back_as_tombstones(client):
+    account = client.post("/api/accounts/", json={"account_name": "Brokerage"}).json()["account_id"]
+    kept = _holding(client, account, "VTI")
+    deleted = _holding(client, account, "AAPL")
+    since = client.get("/api/sync").json()["as_of"]
+
+    client.delete(f"/api/holdings/{deleted['holding_id']}")
+
+    holdings = client.get("/api/sync", params={"since": since, "tables": "account_holdings"}).json()["tables"]["account_holdings"]
+    assert not holdings["reset"]
+    assert holdings["deleted"] == [deleted["holding_id"]]
+    assert kept["holding_id"] not in holdings["deleted"]
+
+
+def test_sync_rejects_unknown_tables(client):
+    assert client.get("/api/sync", params={"tables": "accounts"}).status_code == 400
+
+
+def test_restore_resets_synced_tables(client, tmp_path):
+    account = client.post("/api/accounts/", json={"account_name": "Brokerage"}).json()["account_id"]
+    _holding(client, account, "VTI")
+    backup_to_json(str(tmp_path))
+    since = client.get("/api/sync").json()["as_of"]
+
+    restore_from_json(str(tmp_path))
+
+    holdings = client.get("/api/sync", params={"since": since, "tables": "account_holdings"}).json()["tables"]["account_holdings"]
+    assert holdings["reset"]
+    assert len(holdings["rows"]) == 1
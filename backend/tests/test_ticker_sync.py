@@ -0,0 +1,68 @@
+import sys
+import types
+from datetime import date
+
+import pyarrow as pa
+
+from app.database.changes import tracker
+from app.database.instrumented import query_log
+from app.database.ticker_sync import refresh_prices, sync_ticker_prices
+
+PRICE_SCHEMA = pa.schema([("ticker", pa.string()), ("date", pa.string()), ("price", pa.float64())])
+
+
+def _prices(rows):
+    return pa.Table.from_pylist(
+        [{"ticker": ticker, "date": day, "price": price} for ticker, day, price in rows], PRICE_SCHEMA
+    )
+
+
+def test_refresh_prices_runs_on_its_own_cursor(database, monkeypatch, tmp_path):
+    fetched = [{"ticker": "VTI", "date": "2024-01-02", "price": 101.0}]
+    module = types.ModuleType("fetch_ticker_data")
+    module.fetch_ticker_data = lambda input_file, output_file, db_path: fetched
+    monkeypatch.setitem(sys.modules, "fetch_ticker_data", module)
+    open_cursors = query_log.open_cursors
+
+    result = refresh_prices(database.conn, str(tmp_path))
+
+    assert result["rows_changed"] == 1
+    assert query_log.open_cursors == open_cursors
+    assert database.conn.execute("SELECT price FROM ticker_prices").fetchall() == [(101.0,)]
+
+
+def test_sync_recomputes_only_from_changed_prices(database, monkeypatch):
+    applied = []
+    monkeypatch.setattr(tracker, "apply", lambda conn, accounts, tickers, properties: applied.append(tickers))
+    history = [("VTI", f"2024-01-{day:02d}", 100.0 + day) for day in range(1, 11)]
+
+    sync_ticker_prices(database.conn, _prices(history))
+    result = sync_ticker_prices(database.conn, _prices(history))
+    assert result["rows_changed"] == 0
+    assert len(applied) == 1
+
+    history[6] = ("VTI", "2024-01-07", 999.0)
+    sync_ticker_prices(database.conn, _prices(history + [("VTI", "2024-01-11", 111.0)]))
+    ticker_id = database.conn.execute("SELECT ticker_id FROM tickers WHERE ticker_symbol = 'VTI'").fetchone()[0]
+    assert applied[-1] == {ticker_id: date(2024, 1, 7)}
+
+
+def test_refresh_prices_reads_the_configured_data_dir(database, monkeypatch, tmp_path):
+    files = []
+    module = types.ModuleType("fetch_ticker_data")
+    module.fetch_ticker_data = lambda input_file, output_file, db_path: files.extend([input_file, output_file]) or []
+    monkeypatch.setitem(sys.modules, "fetch_ticker_data", module)
+    monkeypatch.setenv("PRICE_DATA_PATH", str(tmp_path))
+
+    refresh_prices(database.conn)
+
+    assert files == [str(tmp_path / "account_balances.json"), str(tmp_path / "tickers.json")]
+
+
+def test_sync_keeps_the_last_price_of_a_repeated_day(database):
+    history = [("VTI", f"2024-01-{day % 28 + 1:02d}", float(day)) for day in range(10000)]
+
+    sync_ticker_prices(database.conn, _prices(history))
+
+    stored = dict(database.conn.execute("SELECT strftime(date, '%Y-%m-%d'), price FROM ticker_prices").fetchall())
+    assert stored == {day: price for _, day, price in history}
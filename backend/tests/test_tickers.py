@@ -0,0 +1,51 @@
+def _ticker(client, symbol):
+    return client.post("/api/tickers/", json={"ticker_symbol": symbol}).json()["ticker_id"]
+
+
+def test_duplicate_symbol_is_rejected(client):
+    vti = _ticker(client, "VTI")
+    aapl = _ticker(client, "AAPL")
+
+    assert client.post("/api/tickers/", json={"ticker_symbol": "VTI"}).status_code == 400
+    response = client.put(f"/api/tickers/{aapl}", json={"ticker_symbol": "VTI"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Ticker VTI already exists"
+    assert client.get(f"/api/tickers/{vti}").json()["ticker_symbol"] == "VTI"
+
+
+def test_referenced_ticker_cannot_be_renamed_or_deleted(client):
+    vti = _ticker(client, "VTI")
+    client.post("/api/ticker-prices/", json={"ticker_id": vti, "date": "2024-01-02", "price": 100})
+
+    assert client.put(f"/api/tickers/{vti}", json={"ticker_symbol": "VTSAX"}).status_code == 409
+    assert client.delete(f"/api/tickers/{vti}").status_code == 409
+    assert client.get(f"/api/tickers/{vti}").json()["ticker_symbol"] == "VTI"
+
+
+def test_held_ticker_cannot_be_deleted(client):
+    account = client.post("/api/accounts/", json={"account_name": "Brokerage"}).json()["account_id"]
+    client.post("/api/holdings/", json={
+        "account_id": account, "date": "2024-01-02", "ticker_symbol": "Cash",
+        "number_of_shares": 500, "value": 500, "ownership": "Owned",
+    })
+    cash = client.get("/api/tickers/").json()[0]["ticker_id"]
+
+    assert client.delete(f"/api/tickers/{cash}").status_code == 409
+
+
+def test_unreferenced_ticker_can_be_deleted(client):
+    vti = _ticker(client, "VTI")
+
+    assert client.delete(f"/api/tickers/{vti}").status_code == 204
+    assert client.get(f"/api/tickers/{vti}").status_code == 404
+
+
+def test_price_cannot_take_another_prices_date(client):
+    vti = _ticker(client, "VTI")
+    aapl = _ticker(client, "AAPL")
+    client.post("/api/ticker-prices/", json={"ticker_id": vti, "date": "2024-01-02", "price": 100})
+    price = client.post("/api/ticker-prices/", json={"ticker_id": aapl, "date": "2024-01-02", "price": 200}).json()
+
+    response = client.put(f"/api/ticker-prices/{price['price_id']}", json={"ticker_id": vti})
+    assert response.status_code == 400
+    assert client.put(f"/api/ticker-prices/{price['price_id']}", json={"ticker_id": 99}).status_code == 404
@@ -1,25 +1,87 @@
-import React from 'react';
+import React, { useState, useEffect } from 'react';
+import { dashboardService } from '../services';
+import { DashboardSummary } from '../types';
+
+const cardStyle = { padding: '20px', border: '1px solid #ddd', borderRadius: '8px' };
+
+const formatCurrency = (value: number | null) =>
+  value === null ? '—' : value.toLocaleString('en-US', { style: 'currency', currency: 'USD', maximumFractionDigits: 0 });
+
+const formatChange = (value: number | null) =>
+  value === null ? '—' : `${value >= 0 ? '+' : ''}${formatCurrency(value)}`;
+
+const formatPercent = (value: number | null) =>
+  value === null ? '—' : `${(value * 100).toFixed(1)}%`;
 
 const Dashboard: React.FC = () => {
+  const [summary, setSummary] = useState<DashboardSummary | null>(null);
+  const [loading, setLoading] = useState(true);
+  const [error, setError] = useState<string>('');
+
+  useEffect(() => {
+    fetchSummary();
+  }, []);
+
+  // One request for the whole dashboard; the server answers 304 while nothing changed
+  const fetchSummary = async () => {
+    try {
+      setLoading(true);
+      const response = await dashboardService.getSummary();
+      setSummary(response.data);
+      setError('');
+    } catch (err: any) {
+      console.error('Error fetching dashboard summary:', err);
+      if (err.code === 'ERR_NETWORK' || err.message === 'Network Error') {
+        setError('Cannot connect to backend server. Make sure it is running at http://localhost:8000');
+      } else {
+        setError('Failed to load the dashboard. Please try again.');
+      }
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  if (loading) {
+    return <p>Loading...</p>;
+  }
+
+  if (error || !summary) {
+    return <p style={{ color: '#c00' }}>{error}</p>;
+  }
+
   return (
     <div>
       <h1>Investment Tracker Dashboard</h1>
       <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fit, minmax(250px, 1fr))', gap: '20px', marginTop: '20px' }}>
-        <div style={{ padding: '20px', border: '1px solid #ddd', borderRadius: '8px' }}>
-          <h2>Accounts</h2>
-          <p>Manage your investment accounts</p>
+        <div style={cardStyle}>
+          <h2>Net Worth</h2>
+          <p style={{ fontSize: '1.5em', margin: '10px 0' }}>{formatCurrency(summary.change.net_worth)}</p>
+          <p>1 day: {formatChange(summary.change.change_1d)}</p>
+          <p>30 days: {formatChange(summary.change.change_30d)}</p>
         </div>
-        <div style={{ padding: '20px', border: '1px solid #ddd', borderRadius: '8px' }}>
-          <h2>Holdings</h2>
-          <p>Track your stock holdings</p>
+        <div style={cardStyle}>
+          <h2>Accounts</h2>
+          {summary.accounts.map(account => (
+            <p key={account.account_id}>
+              {account.account_name}: {formatCurrency(account.total)} ({formatChange(account.change_30d)} 30d)
+            </p>
+          ))}
         </div>
-        <div style={{ padding: '20px', border: '1px solid #ddd', borderRadius: '8px' }}>
+        <div style={cardStyle}>
           <h2>Properties</h2>
-          <p>Monitor real estate investments</p>
+          {summary.properties.map(property => (
+            <p key={property.property_id}>
+              {property.name}: {formatCurrency(property.equity)} equity, LTV {formatPercent(property.ltv)}
+            </p>
+          ))}
         </div>
-        <div style={{ padding: '20px', border: '1px solid #ddd', borderRadius: '8px' }}>
-          <h2>Analytics</h2>
-          <p>View portfolio analytics</p>
+        <div style={cardStyle}>
+          <h2>Allocation</h2>
+          {summary.allocation.map(ticker => (
+            <p key={ticker.ticker_symbol}>
+              {ticker.ticker_symbol}: {formatCurrency(ticker.market_value)} ({formatPercent(ticker.share)})
+            </p>
+          ))}
         </div>
       </div>
     </div>
@@ -9,18 +9,27 @@ import {
   TickerPrice,
   TickerPriceCreate,
   TickerPriceUpdate,
+  TickerPriceMatrix,
   AccountHolding,
   AccountHoldingCreate,
   AccountHoldingUpdate,
   Property,
   PropertyCreate,
   PropertyUpdate,
+  PropertyEquity,
+  PortfolioEquity,
+  EquityParams,
   PropertyValue,
   PropertyValueCreate,
   PropertyValueUpdate,
   PropertyMortgage,
   PropertyMortgageCreate,
   PropertyMortgageUpdate,
+  NetWorth,
+  NetWorthGrain,
+  DashboardSummary,
+  Job,
+  JobStatus,
 } from '../types';
 
 // Account Services
@@ -45,6 +54,8 @@ export const tickerService = {
 export const tickerPriceService = {
   getAll: () => apiClient.get<TickerPrice[]>('/ticker-prices'),
   getByTickerId: (tickerId: number) => apiClient.get<TickerPrice[]>(`/ticker-prices/ticker/${tickerId}`),
+  getBatch: (tickerIds: number[], params?: { start?: string; end?: string }) =>
+    apiClient.get<TickerPriceMatrix>('/ticker-prices/batch', { params: { ids: tickerIds.join(','), ...params } }),
   getById: (id: number) => apiClient.get<TickerPrice>(`/ticker-prices/${id}`),
   create: (data: TickerPriceCreate) => apiClient.post<TickerPrice>('/ticker-prices', data),
   update: (id: number, data: TickerPriceUpdate) => apiClient.put<TickerPrice>(`/ticker-prices/${id}`, data),
@@ -66,6 +77,10 @@ export const propertyService = {
   getById: (id: number) => apiClient.get<Property>(`/properties/${id}`),
   create: (data: PropertyCreate) => apiClient.post<Property>('/properties', data),
   update: (id: number, data: PropertyUpdate) => apiClient.put<Property>(`/properties/${id}`, data),
+  getEquity: (id: number, params?: EquityParams) =>
+    apiClient.get<PropertyEquity[]>(`/properties/${id}/equity`, { params }),
+  getPortfolioEquity: (params?: EquityParams) =>
+    apiClient.get<PortfolioEquity[]>('/properties/equity', { params }),
   delete: (id: number) => apiClient.delete(`/properties/${id}`),
 };
 
@@ -87,8 +102,26 @@ export const propertyMortgageService = {
   delete: (id: number) => apiClient.delete(`/property-mortgages/${id}`),
 };
 
-// Backup Services
+// Net Worth Services
+export const networthService = {
+  get: (grain: NetWorthGrain = 'day', params?: { start_date?: string; end_date?: string }) =>
+    apiClient.get<NetWorth[]>('/networth', { params: { grain, ...params } }),
+};
+
+// Dashboard Services
+export const dashboardService = {
+  getSummary: () => apiClient.get<DashboardSummary>('/dashboard/summary'),
+};
+
+// Job Services
+export const jobService = {
+  getAll: (status?: JobStatus) => apiClient.get<Job[]>('/jobs', { params: { status } }),
+  getById: (id: number) => apiClient.get<Job>(`/jobs/${id}`),
+  refreshPrices: () => apiClient.post<Job>('/jobs/price-refresh'),
+};
+
+// Backup Services (run as jobs; poll jobService.getById for progress)
 export const backupService = {
-  backup: (backupDir: string = '../data') => apiClient.post('/backup/backup', null, { params: { backup_dir: backupDir } }),
-  restore: (backupDir: string = '../data') => apiClient.post('/backup/restore', null, { params: { backup_dir: backupDir } }),
+  backup: (backupDir: string = '../data') => apiClient.post<Job>('/backup/backup', null, { params: { backup_dir: backupDir } }),
+  restore: (backupDir: string = '../data') => apiClient.post<Job>('/backup/restore', null, { params: { backup_dir: backupDir } }),
 };
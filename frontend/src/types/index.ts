@@ -40,6 +40,18 @@ export interface TickerPrice {
   updated_at: string;
 }
 
+export interface TickerPriceSeries {
+  ticker_id: number;
+  ticker_symbol: string;
+  prices: (number | null)[];
+}
+
+// Prices of several tickers aligned to one shared dates array
+export interface TickerPriceMatrix {
+  dates: string[];
+  tickers: TickerPriceSeries[];
+}
+
 export interface TickerPriceCreate {
   ticker_id: number;
   date: string;
@@ -59,6 +71,7 @@ export interface AccountHolding {
   account_id: number;
   date: string;
   ticker_symbol: string;
+  ticker_id: number;
   number_of_shares: number;
   value: number;
   ownership: OwnershipStatus;
@@ -99,6 +112,30 @@ export interface PropertyUpdate {
   name?: string;
 }
 
+export interface PropertyEquity {
+  property_id: number;
+  date: string;
+  valuation: number;
+  mortgage: number;
+  equity: number;
+  ltv: number | null;
+}
+
+export interface PortfolioEquity {
+  date: string;
+  valuation: number;
+  mortgage: number;
+  equity: number;
+  ltv: number | null;
+  property_count: number;
+}
+
+export interface EquityParams {
+  monthly?: boolean;
+  start_date?: string;
+  end_date?: string;
+}
+
 export interface PropertyValue {
   property_value_id: number;
   property_id: number;
@@ -140,3 +177,74 @@ export interface PropertyMortgageUpdate {
   date?: string;
   mortgage?: number;
 }
+
+export type NetWorthGrain = 'day' | 'week' | 'month';
+
+export interface NetWorth {
+  grain: NetWorthGrain;
+  period: string;
+  as_of: string;
+  investments: number;
+  unvested: number;
+  real_estate: number;
+  mortgages: number;
+  net_worth: number;
+  updated_at: string;
+}
+
+export type JobStatus = 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled';
+
+export interface Job {
+  job_id: number;
+  name: string;
+  status: JobStatus;
+  coalesced: number;
+  submitted_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+  wait_ms: number | null;
+  duration_ms: number | null;
+  progress: Record<string, any>;
+  result: any;
+  error: string | null;
+}
+
+export interface AccountTotal {
+  account_id: number;
+  account_name: string;
+  investments: number;
+  unvested: number;
+  total: number;
+  change_30d: number | null;
+}
+
+export interface PropertyTotal {
+  property_id: number;
+  name: string;
+  valuation_date: string | null;
+  valuation: number | null;
+  mortgage: number;
+  equity: number | null;
+  ltv: number | null;
+}
+
+export interface TickerAllocation {
+  ticker_symbol: string;
+  market_value: number;
+  share: number | null;
+}
+
+export interface NetWorthChange {
+  date: string | null;
+  net_worth: number | null;
+  change_1d: number | null;
+  change_30d: number | null;
+}
+
+export interface DashboardSummary {
+  as_of: string;
+  accounts: AccountTotal[];
+  properties: PropertyTotal[];
+  allocation: TickerAllocation[];
+  change: NetWorthChange;
+}
@@ -3,12 +3,13 @@ import pandas as pd
 from datetime import timedelta
 from datetime import datetime
 import os
-import subprocess
-import pytz
 import time
 import argparse
 import numpy as np
 
+from fetch_ticker_data import fetch_ticker_data
+from app.market import MARKET_CLOSE, MARKET_TZ, market_close
+
 def convert_numpy_types(obj):
     """Convert numpy types to native Python types for JSON serialization"""
     if isinstance(obj, np.integer):
@@ -468,7 +469,7 @@ def check_missing_balance_data_for_today(existing_balances, target_date):
     return target_date_str not in existing_dates
 
 def update_ticker_data_with_retry(max_retries=3):
-    """Update ticker data by running the fetch script with retry logic"""
+    """Update ticker data by running the fetch in process with retry logic"""
     
     for attempt in range(max_retries):
         if attempt > 0:
@@ -477,17 +478,11 @@ def update_ticker_data_with_retry(max_retries=3):
         
         print("Updating ticker data...")
         try:
-            result = subprocess.run(['python', 'scripts/fetch_ticker_data.py'], 
-                                  capture_output=True, text=True, cwd=os.getcwd())
-            if result.returncode != 0:
-                print(f"Error updating ticker data (attempt {attempt + 1}): {result.stderr}")
-                if attempt == max_retries - 1:
-                    return False
-            else:
-                print("Ticker data updated successfully")
-                return True
+            fetch_ticker_data()
+            print("Ticker data updated successfully")
+            return True
         except Exception as e:
-            print(f"Error running ticker fetch script (attempt {attempt + 1}): {str(e)}")
+            print(f"Error updating ticker data (attempt {attempt + 1}): {str(e)}")
             if attempt == max_retries - 1:
                 return False
     
@@ -506,9 +501,8 @@ def update_daily_balances(target_end_date=None, target_account=None):
     existing_balances, last_calculated_date = load_existing_balances()
     
     # Set up time variables
-    pst_tz = pytz.timezone('US/Pacific')
-    current_pst = pd.Timestamp.now(tz=pst_tz)
-    market_close_time = current_pst.replace(hour=16, minute=0, second=0, microsecond=0)  # 4 PM PST
+    current_pst = pd.Timestamp.now(tz=MARKET_TZ)
+    market_close_time = market_close(current_pst)
     today = pd.to_datetime('today').normalize()
     
     # Determine the date range to calculate
@@ -529,7 +523,7 @@ def update_daily_balances(target_end_date=None, target_account=None):
         if not include_today:
             end_date = today - timedelta(days=1)
             print(f"Current time: {current_pst.strftime('%I:%M %p PST')}")
-            print(f"Market closes at 4:00 PM PST - calculating through {end_date.date()}")
+            print(f"Market closes at {MARKET_CLOSE:%I:%M %p} PST - calculating through {end_date.date()}")
         else:
             end_date = today
             print(f"Current time: {current_pst.strftime('%I:%M %p PST')}")
@@ -550,7 +544,7 @@ def update_daily_balances(target_end_date=None, target_account=None):
             if not include_today:
                 end_date = today - timedelta(days=1)
                 print(f"Current time: {current_pst.strftime('%I:%M %p PST')}")
-                print(f"Market closes at 4:00 PM PST - calculating through {end_date.date()}")
+                print(f"Market closes at {MARKET_CLOSE:%I:%M %p} PST - calculating through {end_date.date()}")
             else:
                 end_date = today
                 print(f"Current time: {current_pst.strftime('%I:%M %p PST')}")
@@ -2,11 +2,20 @@ import json
 import yfinance as yf
 from datetime import datetime, timedelta
 import os
-import pytz
 import time
 import argparse
+import sys
 import pandas as pd
 
+# The backend owns the DuckDB schema; prices are merged into its ticker_prices table
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+DEFAULT_DB_PATH = 'backend/data/investments.db'
+
+# The market close cutoff is shared with the backend's price refresh scheduler
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+from app.market import MARKET_CLOSE, MARKET_TZ, market_close
+
 def fill_date_gaps(ticker_records):
     """
     Fill missing dates (weekends/holidays) with the last known price for each ticker
@@ -252,9 +261,8 @@ def fetch_ticker_data_with_retry(tickers, start_date, end_date, max_retries=3):
     
     return all_ticker_data, failed_tickers
 
-def load_existing_ticker_data():
+def load_existing_ticker_data(ticker_file='data/tickers.json'):
     """Load existing ticker data and get the last fetched date"""
-    ticker_file = 'data/tickers.json'
     
     if not os.path.exists(ticker_file):
         return [], None
@@ -288,7 +296,42 @@ def load_existing_ticker_data():
     
     return existing_data, last_date
 
-def fetch_ticker_data(input_file='data/account_balances.json', output_file='data/tickers.json', period='2y'):
+def sync_prices_to_database(price_records, db_path=DEFAULT_DB_PATH):
+    """
+    Merge price records into the backend's ticker_prices table
+    
+    Records are registered with DuckDB as a DataFrame and merged on (ticker_id, date) in one
+    statement; tickers missing from the tickers table are created. Returns False if the
+    database could not be opened (e.g. it is locked by a running backend).
+    """
+    if not price_records:
+        return True
+    
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    from app.database.connection import Database
+    from app.database.ticker_sync import sync_ticker_prices
+    
+    database = Database(db_path)
+    try:
+        database.connect()
+    except Exception as e:
+        print(f"Warning: could not open {db_path} ({e}); skipping database sync")
+        return False
+    
+    try:
+        start = time.perf_counter()
+        result = sync_ticker_prices(database.conn, pd.DataFrame(price_records, columns=['ticker', 'date', 'price']))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    finally:
+        database.close()
+    
+    print(f"Synced {result['rows_received']} price records to {db_path} in {elapsed_ms:.1f} ms "
+          f"({result['rows_changed']} inserted or changed, {result['tickers_created']} new tickers)")
+    return True
+
+def fetch_ticker_data(input_file='data/account_balances.json', output_file='data/tickers.json', period='2y',
+                      db_path=DEFAULT_DB_PATH):
     """
     Fetch historical stock data for unique tickers from account_balances.json and unvested_balances.json 
     with incremental updates and retry logic
@@ -297,20 +340,25 @@ def fetch_ticker_data(input_file='data/account_balances.json', output_file='data
         input_file: Path to account balances JSON file
         output_file: Path to output ticker data JSON file
         period: Period for historical data ('1y', '2y', '5y', 'max', etc.) - used only for initial fetch
+        db_path: DuckDB database to merge prices into (None to skip)
+    
+    Returns the full list of price records written to output_file.
     """
     
     # Get current unique tickers from account balances (most recent month)
     account_tickers = get_current_tickers_from_balances(input_file)
     
     # Get current unique tickers from unvested balances (most recent month)
-    unvested_tickers = get_current_tickers_from_unvested('data/unvested_balances.json')
+    unvested_tickers = get_current_tickers_from_unvested(
+        os.path.join(os.path.dirname(input_file), 'unvested_balances.json')
+    )
     
     # Combine and deduplicate tickers
     unique_tickers = sorted(list(set(account_tickers + unvested_tickers)))
     
     if not unique_tickers:
         print("No tickers found in account balances or unvested balances files!")
-        return
+        return []
     
     print(f"Found {len(account_tickers)} tickers from account balances: {account_tickers}")
     print(f"Found {len(unvested_tickers)} tickers from unvested balances: {unvested_tickers}")
@@ -318,22 +366,21 @@ def fetch_ticker_data(input_file='data/account_balances.json', output_file='data
     
     # Load existing ticker data
     print("Loading existing ticker data...")
-    existing_data, last_fetched_date = load_existing_ticker_data()
+    existing_data, last_fetched_date = load_existing_ticker_data(output_file)
     
     # Determine date range to fetch
     today = datetime.now().date()
     
-    # Check if we should fetch today's data (only after 4 PM PST)
-    pst_tz = pytz.timezone('US/Pacific')
-    current_pst = datetime.now(pst_tz)
-    market_close_time = current_pst.replace(hour=16, minute=0, second=0, microsecond=0)  # 4 PM PST
+    # Check if we should fetch today's data (only after the market close)
+    current_pst = datetime.now(MARKET_TZ)
+    market_close_time = market_close(current_pst)
     
-    # If it's before 4 PM PST today, don't fetch today's data
+    # If it's before the close today, don't fetch today's data
     fetch_today = current_pst >= market_close_time
     if not fetch_today:
         today = today - timedelta(days=1)  # Use yesterday as the latest date
         print(f"Current time: {current_pst.strftime('%I:%M %p PST')}")
-        print(f"Market closes at 4:00 PM PST - using {today} as latest date")
+        print(f"Market closes at {MARKET_CLOSE:%I:%M %p} PST - using {today} as latest date")
     else:
         print(f"Current time: {current_pst.strftime('%I:%M %p PST')}")
         print(f"After market close - including today's data: {today}")
@@ -425,8 +472,13 @@ def fetch_ticker_data(input_file='data/account_balances.json', output_file='data
     
     print(f"Data saved to: {output_file}")
     print(f"Total price records saved: {len(all_data)}")
+    
+    if db_path:
+        sync_prices_to_database(all_data, db_path)
+    
+    return all_data
 
-def backfill_ticker_data(ticker_symbol, start_date_str, output_file='data/tickers.json'):
+def backfill_ticker_data(ticker_symbol, start_date_str, output_file='data/tickers.json', db_path=DEFAULT_DB_PATH):
     """
     Backfill historical data for a specific ticker from a given date to today
     
@@ -434,6 +486,7 @@ def backfill_ticker_data(ticker_symbol, start_date_str, output_file='data/ticker
         ticker_symbol: The ticker symbol to fetch data for
         start_date_str: Start date in format 'M/D/YY' or 'YYYY-MM-DD'
         output_file: Path to output ticker data JSON file
+        db_path: DuckDB database to merge prices into (None to skip)
     """
     
     # Parse the start date
@@ -457,17 +510,16 @@ def backfill_ticker_data(ticker_symbol, start_date_str, output_file='data/ticker
     # Determine end date (today, but respect market hours)
     today = datetime.now().date()
     
-    # Check if we should include today's data (only after 4 PM PST)
-    pst_tz = pytz.timezone('US/Pacific')
-    current_pst = datetime.now(pst_tz)
-    market_close_time = current_pst.replace(hour=16, minute=0, second=0, microsecond=0)  # 4 PM PST
+    # Check if we should include today's data (only after the market close)
+    current_pst = datetime.now(MARKET_TZ)
+    market_close_time = market_close(current_pst)
     
-    # If it's before 4 PM PST today, don't include today's data
+    # If it's before the close today, don't include today's data
     fetch_today = current_pst >= market_close_time
     if not fetch_today:
         today = today - timedelta(days=1)  # Use yesterday as the latest date
         print(f"Current time: {current_pst.strftime('%I:%M %p PST')}")
-        print(f"Market closes at 4:00 PM PST - fetching through {today}")
+        print(f"Market closes at {MARKET_CLOSE:%I:%M %p} PST - fetching through {today}")
     else:
         print(f"Current time: {current_pst.strftime('%I:%M %p PST')}")
         print(f"After market close - including today's data: {today}")
@@ -522,20 +574,27 @@ def backfill_ticker_data(ticker_symbol, start_date_str, output_file='data/ticker
     print(f"New records added: {len(new_data)}")
     print(f"Total records in file: {len(all_data)}")
     print(f"Data saved to: {output_file}")
+    
+    if db_path:
+        sync_prices_to_database(new_data, db_path)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Fetch ticker data with optional backfill for specific ticker")
     parser.add_argument('--ticker', type=str, help="Specific ticker symbol to backfill")
     parser.add_argument('--date', type=str, help="Start date for backfill (M/D/YY or YYYY-MM-DD format)")
+    parser.add_argument('--db-path', type=str, default=DEFAULT_DB_PATH,
+                        help=f"DuckDB database to merge prices into (default: {DEFAULT_DB_PATH})")
+    parser.add_argument('--skip-db', action='store_true', help="Only update the JSON file")
     
     args = parser.parse_args()
+    db_path = None if args.skip_db else args.db_path
     
     if args.ticker and args.date:
         # Backfill mode for specific ticker
-        backfill_ticker_data(args.ticker, args.date)
+        backfill_ticker_data(args.ticker, args.date, db_path=db_path)
     elif args.ticker or args.date:
         print("Error: Both --ticker and --date must be provided for backfill mode")
         print("Usage: python fetch_ticker_data.py --ticker CART --date 4/13/25")
     else:
         # Regular mode - fetch all tickers
-        fetch_ticker_data()
\ No newline at end of file
+        fetch_ticker_data(db_path=db_path)
\ No newline at end of file